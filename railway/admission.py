@@ -0,0 +1,130 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from ortools_optimizer import DEFAULT_TIME_LIMIT_SECONDS, OptimizationCancelled
+
+# Çözüm kabul kontrolü (admission control)
+# Senkron endpoint'ler uvicorn thread pool'unda (~40 thread) çalışır; sınır olmadan 40 eşzamanlı
+# CPU-yoğun çözüm birkaç çekirdeği paylaşır ve hepsi zaman aşımına düşer. Aynı anda en fazla
+# MAX_CONCURRENT_SOLVES çözüm çalışır, fazlası sınırlı bir FIFO kuyrukta bekler; kuyruk doluysa
+# 429, kuyrukta bekleme süresi dolarsa 503 döner (ikisi de Retry-After ile).
+MAX_CONCURRENT_SOLVES = int(os.environ.get("VRP_MAX_CONCURRENT_SOLVES", os.cpu_count() or 1))  # 0 = sınırsız
+MAX_QUEUED_SOLVES = int(os.environ.get("VRP_MAX_QUEUED_SOLVES", 2 * MAX_CONCURRENT_SOLVES))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("VRP_SOLVE_QUEUE_TIMEOUT_SECONDS", 60))
+# Bekleme tahmini için son çözüm sürelerinin penceresi
+RECENT_SOLVES = 20
+
+
+class AdmissionRejected(Exception):
+    """Çözüm kabul edilmedi (kuyruk dolu ya da bekleme süresi doldu)"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int, queue_depth: int):
+        self.status_code = status_code
+        self.reason = reason  # queue_full | queue_timeout
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+        super().__init__(f"Solver busy ({reason}): {queue_depth} requests queued, "
+                         f"estimated wait {retry_after}s")
+
+
+class AdmissionController:
+    """Eşzamanlı çözüm sınırı + sınırlı bekleme kuyruğu (thread'ler arası, tek süreç)"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_SOLVES, max_queued: int = MAX_QUEUED_SOLVES,
+                 queue_timeout_seconds: float = QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.running = 0
+        self._queue = deque()  # bekleyen biletler (FIFO)
+        self._durations = deque(maxlen=RECENT_SOLVES)
+        self._changed = threading.Condition()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _average_duration(self) -> float:
+        """Son çözümlerin ortalama süresi; henüz ölçüm yoksa varsayılan zaman limiti"""
+        if not self._durations:
+            return float(DEFAULT_TIME_LIMIT_SECONDS)
+        return sum(self._durations) / len(self._durations)
+
+    def _estimate(self, position: int) -> float:
+        """
+        Kuyrukta position'ıncı sıradaki isteğin tahmini bekleme süresi (lock altında çağrılır)
+        Her slot ortalama çözüm süresinde bir boşalır: ⌈sıra / slot sayısı⌉ × ortalama süre
+        """
+        return math.ceil(position / max(1, self.max_concurrent)) * self._average_duration()
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        """Kuyruğun sonuna girecek istek için tahminle red (lock altında çağrılır)"""
+        wait = self._estimate(len(self._queue) + 1)
+        return AdmissionRejected(status_code, reason, max(1, math.ceil(wait)), len(self._queue))
+
+    @contextmanager
+    def slot(self, cancel_event=None, bounded: bool = True):
+        """
+        Çözüm slotu: sıra gelene kadar bekler (bloğa bekleme süresi verilir), blok bitince
+        slotu bırakır ve çözüm süresini kaydeder
+        bounded=False: kuyruk sınırı ve bekleme süresi uygulanmaz (ör. zaten kuyruklanmış /jobs işleri)
+        cancel_event set edilirse beklerken OptimizationCancelled fırlatılır
+        """
+        if self.max_concurrent <= 0:
+            yield 0.0
+            return
+
+        ticket = object()
+        waited = time.perf_counter()
+        with self._changed:
+            if self.running < self.max_concurrent and not self._queue:
+                self.running += 1
+            else:
+                if bounded and len(self._queue) >= self.max_queued:
+                    raise self._reject(429, "queue_full")
+                self._queue.append(ticket)
+                deadline = time.monotonic() + self.queue_timeout_seconds if bounded else None
+                try:
+                    while self._queue[0] is not ticket or self.running >= self.max_concurrent:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise OptimizationCancelled("Optimization cancelled while queued")
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self._queue.remove(ticket)
+                            raise self._reject(503, "queue_timeout")
+                        # İptal kontrolü için kısa aralıklarla uyan
+                        self._changed.wait(0.5 if remaining is None else min(remaining, 0.5))
+                except OptimizationCancelled:
+                    self._queue.remove(ticket)
+                    raise
+                finally:
+                    self._changed.notify_all()
+                self._queue.popleft()
+                self.running += 1
+        waited = time.perf_counter() - waited
+
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            with self._changed:
+                self.running -= 1
+                self._durations.append(time.perf_counter() - started)
+                self._changed.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._changed:
+            return {
+                "running": self.running,
+                "max_concurrent": self.max_concurrent,
+                "queue_depth": len(self._queue),
+                "max_queued": self.max_queued,
+                "estimated_wait_seconds": round(
+                    self._estimate(len(self._queue) + 1) if self.running >= self.max_concurrent else 0.0, 1
+                ),
+            }
@@ -0,0 +1,178 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Sütunlu müşteri girdisi: {"id": [...], "lat": [...], "lng": [...], "demand": [...], ...}
+# Büyük günlerde satır başına tekrarlanan anahtarlar ve müşteri başına Pydantic nesneleri
+# (Customer + Location) yerine sütunlar tek seferde NumPy dizilerine çevrilip doğrulanır.
+REQUIRED_COLUMNS = ("id", "lat", "lng", "demand")
+DEFAULT_SERVICE_DURATION = 15  # Customer.service_duration ile aynı varsayılan (dakika)
+
+
+class ColumnarCustomers(list):
+    """
+    Müşteri sözlükleri + hizalı koordinat sütunları (lat, lng; float64)
+    Depo ataması, kümeleme ve mesafe matrisi koordinatları sözlüklerden toplamak yerine sütunlardan alır;
+    sözlükler rota çıktısı (id, ad, talep) için kalır
+    """
+
+    def __init__(self, customers: List[dict], lat: np.ndarray, lng: np.ndarray):
+        super().__init__(customers)
+        self.lat = lat
+        self.lng = lng
+
+
+def _has_columns(customers: list) -> bool:
+    # Liste sonradan değiştirildiyse sütunlar hizalı değildir
+    return isinstance(customers, ColumnarCustomers) and len(customers.lat) == len(customers)
+
+
+def customer_coordinates(customers: list) -> Tuple[np.ndarray, np.ndarray]:
+    """Müşterilerin (lat, lng) sütunları; ColumnarCustomers ise kopyalanmadan"""
+    if _has_columns(customers):
+        return customers.lat, customers.lng
+    return (np.array([c["location"]["lat"] for c in customers], dtype=np.float64),
+            np.array([c["location"]["lng"] for c in customers], dtype=np.float64))
+
+
+def take_customers(customers: list, indices) -> list:
+    """Sıralarıyla müşteri alt kümesi; ColumnarCustomers ise koordinat sütunları da alınır"""
+    indices = np.asarray(indices, dtype=np.int64)
+    taken = [customers[i] for i in indices.tolist()]
+    if _has_columns(customers):
+        return ColumnarCustomers(taken, customers.lat[indices], customers.lng[indices])
+    return taken
+
+
+def customers_from_columns(columns: dict) -> ColumnarCustomers:
+    """
+    Sütunları optimizer'ın müşteri sözlüklerine çevir (Customer.dict() ile aynı anahtarlar);
+    doğrulanmış koordinat dizileri listeyle birlikte taşınır
+    Opsiyonel sütunlar: name, business_type, service_duration, depot_id
+    Uzunluk ve koordinat kontrolleri vektörel; hata ValueError
+    """
+    missing = [name for name in REQUIRED_COLUMNS if columns.get(name) is None]
+    if missing:
+        raise ValueError(f"Columnar customers missing columns: {', '.join(missing)}")
+
+    ids = [str(i) for i in columns["id"]]
+    n = len(ids)
+    lat = np.asarray(columns["lat"], dtype=np.float64)
+    lng = np.asarray(columns["lng"], dtype=np.float64)
+    demand = np.asarray(columns["demand"], dtype=np.int64)
+    service_duration = np.asarray(
+        columns["service_duration"] if columns.get("service_duration") is not None
+        else np.full(n, DEFAULT_SERVICE_DURATION), dtype=np.int64
+    )
+    names = columns.get("name") or ids
+    business_types = columns.get("business_type") or ["default"] * n
+    depot_ids = columns.get("depot_id") or [None] * n
+
+    for name, column in (("lat", lat), ("lng", lng), ("demand", demand), ("service_duration", service_duration),
+                         ("name", names), ("business_type", business_types), ("depot_id", depot_ids)):
+        if len(column) != n:
+            raise ValueError(f"Columnar customers: column '{name}' has {len(column)} values, expected {n}")
+
+    invalid = np.nonzero(~((lat >= -90) & (lat <= 90) & (lng >= -180) & (lng <= 180)))[0]
+    if len(invalid):
+        raise ValueError(f"Columnar customers: invalid coordinates for {len(invalid)} customers "
+                         f"(first: {ids[invalid[0]]})")
+    if n and demand.min() < 0:
+        raise ValueError("Columnar customers: demand must be non-negative")
+
+    return ColumnarCustomers([
+        {
+            "id": customer_id,
+            "name": name,
+            "location": {"lat": la, "lng": ln},
+            "demand_pallets": d,
+            "business_type": business_type,
+            "service_duration": duration,
+            "has_time_constraint": False,
+            "constraint_start_time": None,
+            "constraint_end_time": None,
+            "required_vehicle_types": None,
+            "required_vehicle_type": None,
+            "depot_id": depot_id,
+        }
+        for customer_id, name, la, ln, d, business_type, duration, depot_id in zip(
+            ids, names, lat.tolist(), lng.tolist(), demand.tolist(), business_types,
+            service_duration.tolist(), depot_ids
+        )
+    ], lat, lng)
+
+
+# Süreçler arası aktarım (solver_pool.py): sayısal alanlar NumPy sütunları, metin alanları tek UTF-8
+# tampon (NUL ayraçlı), işletme tipi kategori kodu; varsayılandan farklı seyrek alanlar (zaman kısıtı,
+# araç tipi, depo) indeksli sözlükte gider. Müşteri başına sözlük/anahtar pickle edilmez.
+PACKED_TEXT_FIELDS = ("id", "name")
+PACKED_OPTIONAL_DEFAULTS = {
+    "has_time_constraint": False,
+    "constraint_start_time": None,
+    "constraint_end_time": None,
+    "required_vehicle_types": None,
+    "required_vehicle_type": None,
+    "depot_id": None,
+}
+_PACKED_DENSE_FIELDS = {"id", "name", "location", "demand_pallets", "business_type", "service_duration"}
+
+
+def _pack_text(values: List[str]) -> np.ndarray:
+    text = "\0".join(values)
+    if text.count("\0") != max(len(values) - 1, 0):
+        raise ValueError("Customer text fields must not contain NUL characters")
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack_text(buffer: np.ndarray, n: int) -> List[str]:
+    return buffer.tobytes().decode("utf-8").split("\0") if n else []
+
+
+def pack_customers(customers: List[dict]) -> dict:
+    """Müşteri sözlüklerini NumPy tamponlarına paketle (unpack_customers'ın tersi)"""
+    business_types, business_codes = np.unique(
+        np.array([str(c["business_type"]) for c in customers], dtype=object), return_inverse=True
+    )
+    lat, lng = customer_coordinates(customers)
+    packed = {
+        "n": len(customers),
+        "lat": lat,
+        "lng": lng,
+        "demand_pallets": np.array([c["demand_pallets"] for c in customers], dtype=np.int64),
+        "service_duration": np.array([c["service_duration"] for c in customers], dtype=np.int64),
+        "business_types": business_types.tolist(),
+        "business_type": business_codes.astype(np.int32),
+        "extras": {},
+    }
+    for field in PACKED_TEXT_FIELDS:
+        packed[field] = _pack_text([str(c[field]) for c in customers])
+    for i, customer in enumerate(customers):
+        extras = {key: value for key, value in customer.items()
+                  if key not in _PACKED_DENSE_FIELDS and value != PACKED_OPTIONAL_DEFAULTS.get(key)}
+        if extras:
+            packed["extras"][i] = extras
+    return packed
+
+
+def unpack_customers(packed: dict) -> ColumnarCustomers:
+    """pack_customers çıktısını optimizer'ın müşteri sözlüklerine çevir (koordinat sütunlarıyla)"""
+    n = packed["n"]
+    ids, names = (_unpack_text(packed[field], n) for field in PACKED_TEXT_FIELDS)
+    business_types = packed["business_types"]
+    extras = packed["extras"]
+    return ColumnarCustomers([
+        {
+            "id": customer_id,
+            "name": name,
+            "location": {"lat": lat, "lng": lng},
+            "demand_pallets": demand,
+            "business_type": business_types[code],
+            "service_duration": duration,
+            **PACKED_OPTIONAL_DEFAULTS,
+            **extras.get(i, {}),
+        }
+        for i, (customer_id, name, lat, lng, demand, code, duration) in enumerate(zip(
+            ids, names, packed["lat"].tolist(), packed["lng"].tolist(), packed["demand_pallets"].tolist(),
+            packed["business_type"].tolist(), packed["service_duration"].tolist()
+        ))
+    ], packed["lat"], packed["lng"])
@@ -0,0 +1,91 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Rota maliyet modeli: optimizer, /routes/insert ve /routes/cost aynı formülü kullanır
+# yakıt = km / 100 × tüketim (L/100 km, araç tipine göre) × yakıt fiyatı
+# toplam = yakıt + km × km ücreti + sabit maliyet + km × otoyol ücreti
+# Maliyetler çözümden sonra hesaplanır; fiyat değişince rotalar yeniden çözülmeden güncellenebilir.
+
+# Araç tipleri: kapasite ve yakıt tüketimi
+VEHICLE_TYPES = {
+    0: {"name": "Kamyonet", "capacity": 10, "fuel": 15},
+    1: {"name": "Kamyon-1", "capacity": 14, "fuel": 20},
+    2: {"name": "Kamyon-2", "capacity": 18, "fuel": 30},
+    3: {"name": "TIR", "capacity": 32, "fuel": 35},
+    4: {"name": "Romork", "capacity": 36, "fuel": 40}
+}
+
+DISTANCE_COST_PER_KM = float(os.environ.get("VRP_DISTANCE_COST_PER_KM", 2.5))
+TOLL_COST_PER_KM = float(os.environ.get("VRP_TOLL_COST_PER_KM", 0.5))
+FIXED_ROUTE_COST = float(os.environ.get("VRP_FIXED_ROUTE_COST", 500.0))
+
+COST_FIELDS = ("fuel_cost", "distance_cost", "fixed_cost", "toll_cost", "total_cost")
+
+
+def _fuel_table(fuel_consumption: Optional[Dict[int, float]]) -> np.ndarray:
+    """Araç tipi → L/100 km arama tablosu (VEHICLE_TYPES, fuel_consumption ile ezilebilir); bilinmeyen tip NaN"""
+    consumption = {vehicle_type: spec["fuel"] for vehicle_type, spec in VEHICLE_TYPES.items()}
+    consumption.update({int(vehicle_type): fuel for vehicle_type, fuel in (fuel_consumption or {}).items()})
+    table = np.full(max(consumption) + 1, np.nan)
+    for vehicle_type, fuel in consumption.items():
+        if vehicle_type >= 0:
+            table[vehicle_type] = fuel
+    return table
+
+
+def route_costs(distance_km, vehicle_types, fuel_price: float, fuel_consumption: Optional[Dict[int, float]] = None,
+                distance_cost_per_km: Optional[float] = None, toll_cost_per_km: Optional[float] = None,
+                fixed_cost: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Rota dizileri için maliyet kalemleri (yuvarlanmamış)
+    distance_km / vehicle_types: rota başına km ve VEHICLE_TYPES anahtarı
+    Verilmeyen ücretler VRP_DISTANCE_COST_PER_KM / VRP_TOLL_COST_PER_KM / VRP_FIXED_ROUTE_COST
+    """
+    distance_km = np.asarray(distance_km, dtype=np.float64)
+    vehicle_types = np.asarray(vehicle_types, dtype=np.int64)
+    table = _fuel_table(fuel_consumption)
+    known = (vehicle_types >= 0) & (vehicle_types < len(table))
+    fuel = np.full(len(vehicle_types), np.nan)
+    fuel[known] = table[vehicle_types[known]]
+    if np.isnan(fuel).any():
+        unknown = sorted(set(vehicle_types[np.isnan(fuel)].tolist()))
+        raise ValueError(f"Unknown vehicle type(s): {unknown}")
+
+    fuel_cost = (distance_km / 100) * fuel * fuel_price
+    distance_cost = distance_km * (DISTANCE_COST_PER_KM if distance_cost_per_km is None else distance_cost_per_km)
+    fixed = np.full(len(distance_km), FIXED_ROUTE_COST if fixed_cost is None else fixed_cost)
+    toll_cost = distance_km * (TOLL_COST_PER_KM if toll_cost_per_km is None else toll_cost_per_km)
+    return {
+        "fuel_cost": fuel_cost,
+        "distance_cost": distance_cost,
+        "fixed_cost": fixed,
+        "toll_cost": toll_cost,
+        "total_cost": fuel_cost + distance_cost + fixed + toll_cost,
+    }
+
+
+def route_cost_fields(distance_km: float, vehicle_type: int, fuel_price: float, **rates) -> Dict[str, float]:
+    """Tek rota için yuvarlanmış maliyet alanları (rota sözlüğüne eklenir)"""
+    costs = route_costs([distance_km], [vehicle_type], fuel_price, **rates)
+    return {field: round(float(costs[field][0]), 2) for field in COST_FIELDS}
+
+
+def apply_route_costs(routes: List[dict], fuel_price: float, **rates) -> List[dict]:
+    """
+    Rotaların maliyet alanlarını distance_km ve vehicle_type üzerinden yeniden hesapla (yerinde)
+    rates: fuel_consumption, distance_cost_per_km, toll_cost_per_km, fixed_cost
+    """
+    if not routes:
+        return routes
+    incomplete = [i for i, route in enumerate(routes) if "distance_km" not in route or "vehicle_type" not in route]
+    if incomplete:
+        raise ValueError(f"Routes missing distance_km/vehicle_type: {incomplete[:10]}")
+    costs = route_costs([route["distance_km"] for route in routes], [route["vehicle_type"] for route in routes],
+                        fuel_price, **rates)
+    columns = {field: costs[field].tolist() for field in COST_FIELDS}
+    for i, route in enumerate(routes):
+        for field in COST_FIELDS:
+            route[field] = round(columns[field][i], 2)
+    return routes
@@ -0,0 +1,131 @@
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from columnar import customer_coordinates, take_customers
+from matrix_cache import get_matrix_cache
+from osrm_client import fetch_table
+
+# depot_id'si olmayan müşterilerin depoya atanması
+# haversine: en yakın depo (kuş uçuşu), vektörel; on binlerce müşteri milisaniyeler içinde
+# road: kuş uçuşu en yakın ROAD_CANDIDATES depo arasından yol mesafesi en kısa olanı
+# (önce mesafe önbelleği, eksik depo → müşteri çiftleri OSRM'den; ikisi de yoksa kuş uçuşu)
+DEPOT_ASSIGNMENT_METHOD = os.environ.get("VRP_DEPOT_ASSIGNMENT", "haversine")  # haversine | road
+DEPOT_ASSIGNMENT_METHODS = ("haversine", "road")
+ROAD_CANDIDATES = int(os.environ.get("VRP_DEPOT_ASSIGNMENT_CANDIDATES", 3))
+
+EARTH_RADIUS_M = 6371000
+_CHUNK = 65536  # Bellek sınırı: müşteri × depo matrisi bu kadar satırlık parçalarla
+
+
+def _unit_vectors(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Enlem/boylamı birim küre üzerinde 3B vektöre çevir (büyük daire sırası = iç çarpım sırası)"""
+    lat, lng = np.radians(lat), np.radians(lng)
+    return np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=1)
+
+
+def nearest_depots(lat: np.ndarray, lng: np.ndarray, depots: list, k: int = 1):
+    """
+    Her nokta için kuş uçuşu en yakın k depo
+    Returns: (depo sıraları [n × k], mesafeler metre [n × k]), yakından uzağa
+    """
+    points = _unit_vectors(np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64))
+    depot_points = _unit_vectors(
+        np.array([d["location"]["lat"] for d in depots], dtype=np.float64),
+        np.array([d["location"]["lng"] for d in depots], dtype=np.float64)
+    )
+    k = min(k, len(depots))
+    indices = np.empty((len(points), k), dtype=np.int64)
+    distances = np.empty((len(points), k), dtype=np.float64)
+    for start in range(0, len(points), _CHUNK):
+        # Büyük iç çarpım = küçük açı; açı = arccos(iç çarpım)
+        dots = points[start:start + _CHUNK] @ depot_points.T
+        if k < len(depots):
+            candidates = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(len(depots)), (len(dots), 1))
+        candidate_dots = np.take_along_axis(dots, candidates, axis=1)
+        order = np.argsort(-candidate_dots, axis=1)
+        indices[start:start + _CHUNK] = np.take_along_axis(candidates, order, axis=1)
+        distances[start:start + _CHUNK] = EARTH_RADIUS_M * np.arccos(
+            np.clip(np.take_along_axis(candidate_dots, order, axis=1), -1.0, 1.0)
+        )
+    return indices, distances
+
+
+def _road_distances(depots: list, customers: list, candidates: np.ndarray, fallback: np.ndarray,
+                    osrm_url: str, stats: dict) -> np.ndarray:
+    """Aday depo → müşteri yol mesafeleri (önbellek, sonra OSRM; bulunamayan kuş uçuşu kalır)"""
+    lat, lng = customer_coordinates(customers)
+    locations = np.concatenate([
+        np.array([(d["location"]["lat"], d["location"]["lng"]) for d in depots], dtype=np.float64).reshape(-1, 2),
+        np.column_stack([lat, lng]),
+    ])
+    num_depots = len(depots)
+    distances = fallback.copy()
+    known = np.zeros(candidates.shape, dtype=bool)
+
+    cache = get_matrix_cache()
+    if cache is not None:
+        found = cache.lookup_pairs(osrm_url, locations, list(range(num_depots)),
+                                   list(range(num_depots, len(locations))))
+        for (depot, node), distance in found.items():
+            rows = np.nonzero(candidates[node - num_depots] == depot)[0]
+            if len(rows):
+                distances[node - num_depots, rows[0]] = distance
+                known[node - num_depots, rows[0]] = True
+    stats["cache_hits"] = int(known.sum())
+
+    # Eksik çiftler: depo başına bir OSRM isteği grubu (depo satırı × eksik müşteriler)
+    for depot in range(num_depots):
+        missing = np.nonzero((candidates == depot) & ~known)
+        if not len(missing[0]):
+            continue
+        destinations = [int(i) + num_depots for i in missing[0]]
+        sub = fetch_table(locations, osrm_url, [depot], destinations, stats=stats)
+        if cache is not None:
+            cache.store(osrm_url, locations, [depot], destinations, sub)
+        for (row, column), distance in zip(zip(*missing), sub[0]):
+            if distance is not None:
+                distances[row, column] = distance
+                known[row, column] = True
+    stats["fallback_pairs"] = int((~known).sum())
+    return distances
+
+
+def assign_depots(customers: list, depots: list, method: Optional[str] = None,
+                  osrm_url: Optional[str] = None, stats: Optional[dict] = None) -> List[str]:
+    """
+    Müşteri başına depo id'si: geçerli depot_id korunur, diğerleri en yakın depoya atanır
+    stats: verilirse yöntem, atanan müşteri sayısı ve süre bu sözlüğe yazılır
+    """
+    method = method or DEPOT_ASSIGNMENT_METHOD
+    if method not in DEPOT_ASSIGNMENT_METHODS:
+        raise ValueError(f"Unknown depot assignment: {method} (expected one of {', '.join(DEPOT_ASSIGNMENT_METHODS)})")
+    if stats is None:
+        stats = {}
+    start = time.perf_counter()
+
+    depot_ids = {d["id"] for d in depots}
+    assignment = [c.get("depot_id") if c.get("depot_id") in depot_ids else None for c in customers]
+    unassigned = [i for i, depot_id in enumerate(assignment) if depot_id is None]
+    stats.update({"method": method, "assigned": len(unassigned)})
+
+    if unassigned and depots:
+        unassigned_customers = take_customers(customers, unassigned)
+        lat, lng = customer_coordinates(unassigned_customers)
+        if method == "road" and len(depots) > 1:
+            candidates, distances = nearest_depots(lat, lng, depots, ROAD_CANDIDATES)
+            distances = _road_distances(depots, unassigned_customers, candidates, distances,
+                                        osrm_url or os.environ.get('OSRM_URL', 'https://router.project-osrm.org'),
+                                        stats)
+            nearest = np.take_along_axis(candidates, np.argmin(distances, axis=1)[:, None], axis=1)[:, 0]
+        else:
+            nearest = nearest_depots(lat, lng, depots)[0][:, 0]
+        for i, depot_index in zip(unassigned, nearest):
+            assignment[i] = depots[int(depot_index)]["id"]
+
+    stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return assignment
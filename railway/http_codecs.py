@@ -0,0 +1,111 @@
+import gzip
+import os
+
+import brotli
+import msgpack
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+
+# İstek/yanıt kodlamaları
+# - msgpack gövdeler (Content-Type: application/msgpack) JSON ile aynı şemaya çözülür
+# - Yanıtlar Accept-Encoding'e göre brotli ya da gzip ile sıkıştırılır; akışlar (SSE) dokunulmadan geçer
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+COMPRESSION_MIN_BYTES = int(os.environ.get("VRP_COMPRESSION_MIN_BYTES", 1024))
+BROTLI_QUALITY = int(os.environ.get("VRP_COMPRESSION_BROTLI_QUALITY", 4))  # 0-11; yanıt gecikmesi için düşük
+GZIP_LEVEL = int(os.environ.get("VRP_COMPRESSION_GZIP_LEVEL", 6))
+
+
+class MsgpackRoute(APIRoute):
+    """msgpack gövdeyi çözer ve isteği JSON gövdesi gibi FastAPI doğrulamasına verir"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type in MSGPACK_CONTENT_TYPES:
+                body = await request.body()
+                try:
+                    payload = msgpack.unpackb(body, raw=False)
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid msgpack body: {type(e).__name__} {e}".strip())
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (key, value) for key, value in request.scope["headers"] if key != b"content-type"
+                ] + [(b"content-type", b"application/json")]
+                request = Request(scope, request.receive)
+                request._body = body
+                request._json = payload
+            return await handler(request)
+
+        return route_handler
+
+
+def _accepted_encoding(accept_encoding: str):
+    """Accept-Encoding'den tercih: br > gzip (q=0 olanlar hariç)"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Tek parça yanıtları sıkıştıran ASGI middleware
+    Parçalı (streaming) yanıtlar, zaten kodlanmış gövdeler ve COMPRESSION_MIN_BYTES altı olduğu gibi gider
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body", False) or "content-encoding" in headers \
+                    or len(body) < self.minimum_size:
+                # Akış (SSE vb.) ya da küçük/kodlanmış gövde: dokunma
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,158 @@
+from typing import List, Optional, Sequence, Tuple
+
+# En ucuz ekleme (cheapest insertion) yardımcıları
+# Rotalar araç başına düğüm listesi olarak tutulur (depo hariç; başlangıç/bitiş = rotanın depo düğümü)
+
+
+def route_load(route: Sequence[int], demands: Sequence[int]) -> int:
+    return sum(demands[node] for node in route)
+
+
+def route_duration(route: Sequence[int], time_matrix, depot: int = 0) -> int:
+    """Depodan çıkıp rotayı tamamlayıp depoya dönüş süresi (transit matrisinden)"""
+    duration = 0
+    prev = depot
+    for node in route:
+        duration += int(time_matrix[prev][node])
+        prev = node
+    if route:
+        duration += int(time_matrix[prev][depot])
+    return duration
+
+
+def best_insertion(route: Sequence[int], node: int, distance_matrix, depot: int = 0, time_matrix=None,
+                   duration: int = 0, max_route_minutes: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Tek rota için en ucuz uygun ekleme noktası: (pozisyon, ek mesafe)
+    max_route_minutes verilirse süreyi aşan pozisyonlar atlanır; uygun pozisyon yoksa (None, None)
+    """
+    best_position, best_delta = None, None
+    prev = depot
+    for position in range(len(route) + 1):
+        nxt = route[position] if position < len(route) else depot
+        if time_matrix is not None and max_route_minutes is not None:
+            extra = int(time_matrix[prev][node]) + int(time_matrix[node][nxt]) - int(time_matrix[prev][nxt])
+            if duration + extra > max_route_minutes:
+                prev = nxt
+                continue
+        delta = int(distance_matrix[prev][node]) + int(distance_matrix[node][nxt]) - int(distance_matrix[prev][nxt])
+        if best_delta is None or delta < best_delta:
+            best_position, best_delta = position, delta
+        prev = nxt
+    return best_position, best_delta
+
+
+def removal_saving(route: Sequence[int], position: int, distance_matrix, depot: int = 0) -> int:
+    """route[position] çıkarılınca kazanılan mesafe"""
+    prev = route[position - 1] if position > 0 else depot
+    nxt = route[position + 1] if position + 1 < len(route) else depot
+    node = route[position]
+    return int(distance_matrix[prev][node]) + int(distance_matrix[node][nxt]) - int(distance_matrix[prev][nxt])
+
+
+def cheapest_insertion(routes: List[List[int]], nodes: Sequence[int], distance_matrix, demands: Sequence[int],
+                       capacities: Sequence[int], time_matrix=None, max_route_minutes: Optional[int] = None,
+                       fixed_vehicle_cost: int = 0, depot: int = 0,
+                       route_depots: Optional[Sequence[int]] = None) -> Tuple[List[List[int]], List[int]]:
+    """
+    Düğümleri mevcut rotalara en ucuz uygun noktaya ekle (kapasite + rota süresi limitleri)
+    Boş bir araca ekleme fixed_vehicle_cost kadar pahalıdır.
+    route_depots: rota başına depo düğümü (verilmezse hepsi depot)
+    Returns: (güncellenmiş rotalar, yerleştirilemeyen düğümler)
+    """
+    routes = [list(route) for route in routes]
+    depots = list(route_depots) if route_depots is not None else [depot] * len(routes)
+    loads = [route_load(route, demands) for route in routes]
+    durations = [
+        route_duration(route, time_matrix, depots[vehicle]) if time_matrix is not None else 0
+        for vehicle, route in enumerate(routes)
+    ]
+    unplaced = []
+
+    # Büyük talepler önce: kapasitesi sıkışık rotalarda yer bulma şansı yüksek olsun
+    for node in sorted(nodes, key=lambda n: -demands[n]):
+        best = None  # (maliyet, araç, pozisyon)
+        for vehicle, route in enumerate(routes):
+            if loads[vehicle] + demands[node] > capacities[vehicle]:
+                continue
+            position, delta = best_insertion(
+                route, node, distance_matrix, depots[vehicle], time_matrix, durations[vehicle], max_route_minutes
+            )
+            if position is None:
+                continue
+            cost = delta + (fixed_vehicle_cost if not route else 0)
+            if best is None or cost < best[0]:
+                best = (cost, vehicle, position)
+
+        if best is None:
+            unplaced.append(node)
+            continue
+
+        _, vehicle, position = best
+        routes[vehicle].insert(position, node)
+        loads[vehicle] += demands[node]
+        if time_matrix is not None:
+            durations[vehicle] = route_duration(routes[vehicle], time_matrix, depots[vehicle])
+
+    return routes, unplaced
+
+
+def relocate_and_insert(routes: List[List[int]], node: int, distance_matrix, demands: Sequence[int],
+                        capacities: Sequence[int], time_matrix=None, max_route_minutes: Optional[int] = None,
+                        route_depots: Optional[Sequence[int]] = None,
+                        max_moves: int = 5000) -> Tuple[List[List[int]], bool]:
+    """
+    Doğrudan ekleme mümkün değilse sınırlı yerel arama: A rotasından bir durağı B rotasına taşıyıp
+    A'da yeni düğüme yer aç. En fazla max_moves taşıma denenir; en ucuz uygun hamle uygulanır.
+    Returns: (güncellenmiş rotalar, yerleştirildi mi)
+    """
+    depots = list(route_depots) if route_depots is not None else [0] * len(routes)
+    loads = [route_load(route, demands) for route in routes]
+    durations = [
+        route_duration(route, time_matrix, depots[vehicle]) if time_matrix is not None else 0
+        for vehicle, route in enumerate(routes)
+    ]
+
+    best = None  # (maliyet, a, çıkarılan pozisyon, yeni düğüm pozisyonu, b, taşınan düğüm pozisyonu)
+    moves = 0
+    for a, route_a in enumerate(routes):
+        for removed_position, moved in enumerate(route_a):
+            if loads[a] - demands[moved] + demands[node] > capacities[a]:
+                continue
+            reduced = route_a[:removed_position] + route_a[removed_position + 1:]
+            reduced_duration = route_duration(reduced, time_matrix, depots[a]) if time_matrix is not None else 0
+            node_position, node_delta = best_insertion(
+                reduced, node, distance_matrix, depots[a], time_matrix, reduced_duration, max_route_minutes
+            )
+            if node_position is None:
+                continue
+            saving = removal_saving(route_a, removed_position, distance_matrix, depots[a])
+
+            for b, route_b in enumerate(routes):
+                if b == a or loads[b] + demands[moved] > capacities[b]:
+                    continue
+                moves += 1
+                if moves > max_moves:
+                    break
+                moved_position, moved_delta = best_insertion(
+                    route_b, moved, distance_matrix, depots[b], time_matrix, durations[b], max_route_minutes
+                )
+                if moved_position is None:
+                    continue
+                cost = node_delta + moved_delta - saving
+                if best is None or cost < best[0]:
+                    best = (cost, a, removed_position, node_position, b, moved_position)
+            if moves > max_moves:
+                break
+        if moves > max_moves:
+            break
+
+    if best is None:
+        return routes, False
+
+    _, a, removed_position, node_position, b, moved_position = best
+    routes = [list(route) for route in routes]
+    moved = routes[a].pop(removed_position)
+    routes[a].insert(node_position, node)
+    routes[b].insert(moved_position, moved)
+    return routes, True
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ortools_optimizer import OptimizationCancelled
+
+# Asenkron optimizasyon işleri (POST /jobs, GET /jobs/{id}, DELETE /jobs/{id},
+# GET /jobs/{id}/events, POST /jobs/{id}/stop)
+# Çözücü uzun sürdüğü için HTTP worker'ları yerine sınırlı bir executor üzerinde çalışır
+JOB_WORKERS = int(os.environ.get("VRP_JOB_WORKERS", 2))
+JOB_TTL_SECONDS = int(os.environ.get("VRP_JOB_TTL_SECONDS", 3600))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class Job:
+    """Tek bir optimizasyon işinin durumu"""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.stop_event = threading.Event()  # Aramayı bitir, en iyi çözümü döndür
+        self.future = None
+        # İlerleme olayları (SSE): durum değişiklikleri ve iyileşen çözümler
+        self.events: List[dict] = []
+        self._events_changed = threading.Condition()
+
+    def publish(self, event: dict, event_type: str = "solution"):
+        """Olayı listeye ekle ve bekleyen akışları uyandır"""
+        with self._events_changed:
+            self.events.append({"type": event_type, "time": time.time(), **event})
+            self._events_changed.notify_all()
+
+    def wait_events(self, start: int, timeout: float) -> Tuple[List[dict], bool]:
+        """start'tan sonraki olaylar (yoksa timeout kadar bekler) ve işin bitip bitmediği"""
+        with self._events_changed:
+            if len(self.events) <= start and self.status not in FINISHED_STATES:
+                self._events_changed.wait(timeout)
+            return self.events[start:], self.status in FINISHED_STATES
+
+    def _set_status(self, status: str, **fields):
+        """Durum değişikliği + status olayı (JobManager lock'u altında çağrılır)
+        Akışlar bitmiş durumu son status olayıyla birlikte görsün diye ikisi aynı kilit altında"""
+        with self._events_changed:
+            self.status = status
+            self.publish({"status": status, **fields}, event_type="status")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Optimizasyon işlerini sınırlı bir thread pool üzerinde çalıştırır"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl_seconds: int = JOB_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vrp-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ttl_seconds = ttl_seconds
+
+    def submit(self, fn: Callable[[Job], dict]) -> Job:
+        """fn(job) -> result dict; iş kuyruğa alınır ve hemen döner
+        fn job.cancel_event / job.stop_event'i çözücüye iletir, ilerlemeyi job.publish ile yayınlar"""
+        job = Job(uuid.uuid4().hex)
+        job.publish({"status": JOB_QUEUED}, event_type="status")
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Kuyruktaki işi iptal eder; çalışan iş için çözücüye durma sinyali gönderir"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                job.finished_at = time.time()
+                job._set_status(JOB_CANCELLED)
+        return job
+
+    def stop(self, job_id: str) -> Optional[Job]:
+        """Çalışan işin aramasını bitirir; iş o ana kadarki en iyi çözümle tamamlanır"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        with self._lock:
+            if job.status not in FINISHED_STATES:
+                job.stop_event.set()
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], dict]):
+        with self._lock:
+            if job.cancel_event.is_set():
+                job.finished_at = time.time()
+                job._set_status(JOB_CANCELLED)
+                return
+            job.started_at = time.time()
+            job._set_status(JOB_RUNNING)
+
+        print(f"[Jobs] Job {job.id} started")
+        try:
+            result = fn(job)
+            status, error = JOB_COMPLETED, None
+        except OptimizationCancelled:
+            result, status, error = None, JOB_CANCELLED, None
+        except Exception as e:
+            print(f"[Jobs] Job {job.id} failed: {e}")
+            result, status, error = None, JOB_FAILED, str(e)
+
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            job._set_status(status, error=error)
+        print(f"[Jobs] Job {job.id} {status} in {job.finished_at - job.started_at:.1f}s")
+
+    def _prune(self):
+        """TTL süresi dolmuş bitmiş işleri bellekten sil (lock altında çağrılır)"""
+        cutoff = time.time() - self._ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
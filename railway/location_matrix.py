@@ -0,0 +1,142 @@
+import glob
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from matrix_cache import coord_key
+
+# Önceden kurulmuş mesafe matrisi: koordinat → satır indeksi
+# - /optimize/batch: senaryolar istekte bir kez kurulan matrisi paylaşır
+# - Gece hesaplanan bölge matrisleri (precompute_matrix.py): VRP_PRECOMPUTED_MATRIX_DIR altında
+#   <bölge>.index.json + int32 .npy dosyaları; np.load(mmap_mode="r") ile açılır, böylece tüm
+#   uvicorn worker'ları ve depo süreçleri aynı sayfaları işletim sistemi önbelleğinden paylaşır.
+# Her çözüm kendi konumlarının alt matrisini NumPy indekslemeyle alır; kapsanmayan konumlar için
+# yalnızca eksik satır/sütunlar OSRM'den istenir. Süre matrisi varsa Time dimension onu kullanır.
+PRECOMPUTED_MATRIX_DIR = os.environ.get("VRP_PRECOMPUTED_MATRIX_DIR", "")  # boş = kapalı
+UNKNOWN = -1  # Matriste bilinmeyen (OSRM'in ulaşamadığı ya da başarısız karo) çift
+
+
+class LocationMatrix:
+    """Konum listesi üzerinde kare mesafe (metre) ve opsiyonel süre (saniye) matrisi"""
+
+    def __init__(self, locations: List[tuple], distances, durations=None, ids: Optional[Dict[str, int]] = None,
+                 meta: Optional[dict] = None):
+        # np.asarray memmap'i kopyalamaz (dtype aynıysa)
+        self.distances = np.asarray(distances, dtype=np.int32)
+        if self.distances.shape != (len(locations), len(locations)):
+            raise ValueError(f"Distance matrix shape {self.distances.shape} does not match {len(locations)} locations")
+        self.durations = np.asarray(durations, dtype=np.int32) if durations is not None else None
+        self.ids = ids or {}  # id → satır
+        self.meta = meta or {}
+        self.index = {}
+        for row, (lat, lng) in enumerate(locations):
+            self.index.setdefault(coord_key(lat, lng), row)
+
+    def __len__(self):
+        return len(self.distances)
+
+    def covers(self, lat: float, lng: float) -> bool:
+        return coord_key(lat, lng) in self.index
+
+    def lookup(self, locations: List[tuple], values: str = "distances") -> np.ndarray:
+        """
+        locations sırasıyla n×n mesafe (values="durations": süre) matrisi; matriste olmayan
+        konumların satır/sütunları ve bilinmeyen çiftler UNKNOWN (-1)
+        """
+        matrix = self.distances if values == "distances" else self.durations
+        rows = np.array([self.index.get(coord_key(lat, lng), -1) for lat, lng in locations], dtype=np.int64)
+        known = np.full((len(locations), len(locations)), UNKNOWN, dtype=np.int64)
+        covered = np.nonzero(rows >= 0)[0]
+        if len(covered):
+            # Fancy indexing: memmap'ten yalnızca ilgili satırların sayfaları okunur
+            known[np.ix_(covered, covered)] = matrix[np.ix_(rows[covered], rows[covered])]
+        return known
+
+    def lookup_durations(self, locations: List[tuple]) -> Optional[np.ndarray]:
+        """lookup ile aynı, süreler (saniye); matriste süre yoksa None"""
+        if self.durations is None:
+            return None
+        return self.lookup(locations, "durations")
+
+
+def matrix_file(directory: str, region: str, version: str, name: str) -> str:
+    """Sürüm damgalı dizi dosyası: <bölge>.<sürüm>.<distances|durations>.npy"""
+    return os.path.join(directory, f"{region}.{version}.{name}.npy")
+
+
+def publish_location_matrix(directory: str, region: str, locations: List[tuple], files: Dict[str, str],
+                            ids: Dict[str, int], meta: dict):
+    """
+    Yazılmış dizileri index.json ile yayınla (atomik rename, en son adım)
+    Okuyucular index.json'un işaret ettiği dosyaları açar; eski sürümü mmap etmiş süreçler etkilenmez.
+    """
+    index_path = os.path.join(directory, f"{region}.index.json")
+    previous = _read_index(index_path)
+    filenames = {name: os.path.basename(path) for name, path in files.items()}
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**meta, "region": region, "size": len(locations), "files": filenames,
+                   "locations": [list(location) for location in locations], "ids": ids}, f)
+    os.replace(tmp_path, index_path)
+
+    # Eski sürümün dizileri (açık mmap'ler inode üzerinden çalışmaya devam eder)
+    for filename in (previous or {}).get("files", {}).values():
+        if filename not in filenames.values():
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def _read_index(index_path: str) -> Optional[dict]:
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_location_matrix(index_path: str) -> LocationMatrix:
+    """index.json ve dizileri salt okunur mmap olarak aç"""
+    index = _read_index(index_path)
+    if index is None:
+        raise ValueError(f"Cannot read matrix index: {index_path}")
+    directory = os.path.dirname(index_path)
+    files = index["files"]
+    distances = np.load(os.path.join(directory, files["distances"]), mmap_mode="r")
+    durations = np.load(os.path.join(directory, files["durations"]), mmap_mode="r") if "durations" in files else None
+    meta = {key: index[key] for key in ("region", "osrm_url", "created_at", "size") if key in index}
+    return LocationMatrix([tuple(location) for location in index["locations"]], distances, durations,
+                          ids=index.get("ids"), meta=meta)
+
+
+_precomputed: Dict[str, tuple] = {}  # index yolu → (mtime, LocationMatrix)
+_precomputed_lock = threading.Lock()
+
+
+def precomputed_matrix_for(location: tuple, osrm_url: str) -> Optional[LocationMatrix]:
+    """
+    location'ı (ör. depo) içeren ve aynı OSRM sunucusuyla hesaplanmış gece matrisi
+    index.json değiştiyse (yeni gece çalıştırması) yeniden açılır
+    """
+    if not PRECOMPUTED_MATRIX_DIR:
+        return None
+    with _precomputed_lock:
+        for index_path in sorted(glob.glob(os.path.join(PRECOMPUTED_MATRIX_DIR, "*.index.json"))):
+            try:
+                mtime = os.stat(index_path).st_mtime
+                cached = _precomputed.get(index_path)
+                if cached is None or cached[0] != mtime:
+                    matrix = load_location_matrix(index_path)
+                    _precomputed[index_path] = (mtime, matrix)
+                    print(f"[Matrix] Precomputed matrix loaded: {matrix.meta.get('region')} ({len(matrix)} locations)")
+                matrix = _precomputed[index_path][1]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Matrix] Precomputed matrix unavailable ({index_path}): {e}")
+                continue
+            if matrix.meta.get("osrm_url") == osrm_url and matrix.covers(*location):
+                return matrix
+    return None
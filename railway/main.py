@@ -1,15 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Union
+import json
 import sys
+import time
 import os
 
 # OR-Tools optimizer scriptini import et
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from ortools_optimizer import optimize_routes
+from ortools_optimizer import NoSolutionFound, OptimizationCancelled, optimize_routes
+from scenario_batch import SCENARIO_SOLVE_OPTIONS, optimize_batch
+from columnar import customers_from_columns
+from cost_model import COST_FIELDS, apply_route_costs
+from http_codecs import CompressionMiddleware, MsgpackRoute
+from order_insertion import insert_customers
+from jobs import JobManager
+from result_cache import ResultCache, request_cache_key
+from admission import AdmissionController, AdmissionRejected
+from solver_pool import SolverPool, SolverWorkerError
+from metrics import (ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_RUNNING, ADMISSION_WAIT_SECONDS,
+                     COST_SECONDS, INSERT_SECONDS, OPTIMIZATIONS, SOLVES_IN_FLIGHT, record_failure, record_optimization,
+                     render_metrics)
 
 app = FastAPI(title="VRP Optimizer API")
+# msgpack istek gövdeleri (Content-Type: application/msgpack) JSON ile aynı modellere çözülür
+app.router.route_class = MsgpackRoute
 
 # CORS - Vercel'den gelen isteklere izin ver
 app.add_middleware(
@@ -20,6 +37,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Yanıt sıkıştırma: Accept-Encoding'e göre brotli ya da gzip (SSE akışları hariç)
+app.add_middleware(CompressionMiddleware)
+
 # Request/Response modelleri
 class Location(BaseModel):
     lat: float
@@ -37,23 +57,50 @@ class Customer(BaseModel):
     constraint_end_time: Optional[str] = None    # Format: "HH:MM" - end of CLOSED period
     required_vehicle_types: Optional[List[int]] = None
     required_vehicle_type: Optional[str] = None  # Single required vehicle type (kamyonet, kamyon_1, etc.)
+    depot_id: Optional[str] = None  # Assigned depot; missing/unknown -> nearest depot (see depot_assignment)
+
+class CustomerColumns(BaseModel):
+    """Columnar customers for large days: one array per field, same length"""
+    id: List[str]
+    lat: List[float]
+    lng: List[float]
+    demand: List[int]
+    name: Optional[List[str]] = None  # Default: id
+    business_type: Optional[List[str]] = None  # Default: "default" service time
+    service_duration: Optional[List[int]] = None  # Default: 15
+    depot_id: Optional[List[Optional[str]]] = None  # Default: nearest depot
 
 class Vehicle(BaseModel):
     id: str
     type: int
     capacity_pallets: int
     fuel_consumption: float
+    depot_id: Optional[str] = None  # Home depot for the joint multi-depot mode (default: split by demand)
 
 class Depot(BaseModel):
     id: str
     location: Location
 
 class OptimizeRequest(BaseModel):
-    customers: List[Customer]
+    customers: Union[List[Customer], CustomerColumns]  # Row objects or columnar arrays
     vehicles: List[Vehicle]
     depots: List[Depot]
     fuel_price: float = 47.50
     osrm_url: Optional[str] = None  # OSRM API URL for real road distances
+    time_limit_seconds: Optional[int] = None  # Per-depot solver budget (default: VRP_TIME_LIMIT_SECONDS)
+    plateau_window_seconds: Optional[float] = None  # Stop after this long without improvement (0 = off)
+    plateau_min_improvement: Optional[float] = None  # Relative improvement that resets the window (e.g. 0.001)
+    # Warm start: previous plan as {vehicle_id: [customer_id, ...]} or the "routes" list of a previous response
+    initial_routes: Optional[Union[Dict[str, List[str]], List[dict]]] = None
+    # Cluster-first: depots with more customers are split into clusters (default: VRP_DECOMPOSITION_THRESHOLD, 0 = off)
+    decomposition_threshold: Optional[int] = None
+    cluster_method: Optional[Literal["sweep", "kmeans"]] = None
+    # per_depot: each depot solved separately with its fleet share; joint: one solve, shared fleet
+    multi_depot_mode: Optional[Literal["per_depot", "joint"]] = None
+    depot_assignment: Optional[Literal["haversine", "road"]] = None  # For customers without depot_id
+    knn_k: Optional[int] = None  # Keep only the k nearest customer arcs per customer (default: VRP_KNN_K, 0 = off)
+    # Race this many strategy/metaheuristic combinations per depot on separate cores (default: VRP_PORTFOLIO_SIZE)
+    portfolio_size: Optional[int] = None
 
 class OptimizeResponse(BaseModel):
     success: bool
@@ -61,6 +108,89 @@ class OptimizeResponse(BaseModel):
     summary: dict
     error: Optional[str] = None
 
+class BatchScenario(BaseModel):
+    """What-if overrides on the base problem; omitted fields come from the base request"""
+    name: str
+    fuel_price: Optional[float] = None
+    vehicles: Optional[List[Vehicle]] = None  # Fleet mix replacing the base fleet
+    depot_ids: Optional[List[str]] = None  # Depot subset; customers of closed depots go to the nearest open one
+    time_limit_seconds: Optional[int] = None
+    multi_depot_mode: Optional[Literal["per_depot", "joint"]] = None
+    knn_k: Optional[int] = None
+    portfolio_size: Optional[int] = None
+
+class OptimizeBatchRequest(BaseModel):
+    base: OptimizeRequest
+    scenarios: List[BatchScenario]  # First scenario is the baseline for cost deltas
+
+class OptimizeBatchResponse(BaseModel):
+    success: bool
+    scenarios: List[dict]  # name, success, routes, summary, totals, delta (vs baseline), error
+    summary: dict  # baseline, best (lowest total_cost), shared matrix stats, timings
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str  # queued | running | completed | failed | cancelled
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[OptimizeResponse] = None
+    error: Optional[str] = None
+
+class InsertRequest(BaseModel):
+    routes: List[dict]  # "routes" list of a previous /optimize response
+    customers: List[Customer]  # New customers to insert
+    vehicles: List[Vehicle]  # Full fleet; vehicles without a route may be opened
+    depots: List[Depot]
+    fuel_price: float = 47.50
+    osrm_url: Optional[str] = None
+
+class InsertResponse(BaseModel):
+    success: bool
+    routes: List[dict]
+    inserted: List[dict]  # customer_id, vehicle_id, depot_id, method (insertion | relocate | new_vehicle)
+    unplaced: List[str]  # Customers with no feasible position
+    summary: dict
+
+class CostRequest(BaseModel):
+    routes: List[dict]  # "routes" list of a previous response (distance_km + vehicle_type are used)
+    fuel_price: float
+    fuel_consumption: Optional[Dict[int, float]] = None  # L/100 km per vehicle type (default: VEHICLE_TYPES)
+    distance_cost_per_km: Optional[float] = None  # Default: VRP_DISTANCE_COST_PER_KM
+    toll_cost_per_km: Optional[float] = None  # Default: VRP_TOLL_COST_PER_KM
+    fixed_cost: Optional[float] = None  # Per route (default: VRP_FIXED_ROUTE_COST)
+
+class CostResponse(BaseModel):
+    success: bool
+    routes: List[dict]
+    summary: dict  # Cost totals, change against the submitted totals, elapsed_ms
+
+# Uzun süren çözümler için asenkron iş yöneticisi
+job_manager = JobManager()
+
+# Aynı istek tekrar gönderildiğinde (ör. "optimize" butonuna tekrar basılması) çözüm yeniden yapılmaz
+result_cache = ResultCache()
+
+# Eşzamanlı çözüm sınırı ve bekleme kuyruğu; fazlası 429/503 + Retry-After alır
+admission = AdmissionController()
+ADMISSION_QUEUE_DEPTH.set_function(lambda: admission.queue_depth)
+ADMISSION_RUNNING.set_function(lambda: admission.running)
+
+# /optimize ve /jobs çözümleri önceden başlatılmış işçi süreçlerinde (süre/bellek sınırlı, çökme yalıtımlı)
+solver_pool = SolverPool()
+
+@app.on_event("startup")
+def start_solver_pool():
+    if solver_pool.size > 0:
+        solver_pool.start()
+
+@app.on_event("shutdown")
+def stop_solver_pool():
+    solver_pool.shutdown()
+
+# SSE bağlantısını proxy'lerde canlı tutmak için yorum satırı aralığı (saniye)
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("VRP_SSE_KEEPALIVE_SECONDS", 15))
+
 @app.get("/")
 def root():
     return {
@@ -71,48 +201,302 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "admission": admission.snapshot()}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrikleri (faz süreleri, OSRM/önbellek sayaçları, çözücü durumları)"""
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+def request_customers(request: OptimizeRequest) -> List[dict]:
+    """Satır ya da sütunlu müşteri girdisini optimizer'ın sözlük listesine çevir"""
+    if isinstance(request.customers, CustomerColumns):
+        return customers_from_columns(request.customers.dict())
+    return [c.dict() for c in request.customers]
+
+def admitted(solve, cancel_event=None, bounded: bool = True):
+    """solve()'u bir çözüm slotunda çalıştır; slot yoksa kuyrukta bekler ya da AdmissionRejected"""
+    try:
+        with admission.slot(cancel_event, bounded) as waited:
+            ADMISSION_WAIT_SECONDS.observe(waited)
+            if waited >= 1:
+                print(f"[Railway] Waited {waited:.1f}s for a solver slot")
+            return solve()
+    except AdmissionRejected as e:
+        ADMISSION_REJECTIONS.labels(e.reason).inc()
+        print(f"[Railway] Rejected: {e}")
+        raise
+
+def busy_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def record_solve_failure(e: Exception):
+    """Başarısız çözümü nedeniyle metriklere işle (çözümsüz arama, işçi sınırı / çökmesi, geçersiz istek)"""
+    if isinstance(e, NoSolutionFound):
+        record_failure("no_solution", e.solver_status, e.matrix)
+    elif isinstance(e, SolverWorkerError):
+        record_failure(e.reason)
+    elif isinstance(e, ValueError):
+        record_failure("invalid_request")
+    else:
+        record_failure("error")
+
+def run_optimization(request: OptimizeRequest, cancel_event=None, stop_event=None,
+                     progress_callback=None, bounded_wait: bool = True) -> OptimizeResponse:
+    """
+    /optimize ve /jobs tarafından paylaşılan optimizasyon akışı
+    bounded_wait=False: çözüm slotu için kuyruk sınırı olmadan bekle (/jobs zaten kuyrukta)
+    """
+    print(f"[Railway] ========== OPTIMIZATION REQUEST ==========")
+    print(f"[Railway] Depots: {len(request.depots)}")
+    customers = request_customers(request)
+    print(f"[Railway] Customers: {len(customers)}")
+    print(f"[Railway] Vehicles: {len(request.vehicles)}")
+    print(f"[Railway] Fuel price: {request.fuel_price}")
+    
+    # Calculate total demand and capacity
+    total_demand = sum(c["demand_pallets"] for c in customers)
+    total_capacity = sum(v.capacity_pallets for v in request.vehicles)
+    print(f"[Railway] Total demand: {total_demand} pallets")
+    print(f"[Railway] Total capacity: {total_capacity} pallets")
+    print(f"[Railway] Demand/Capacity ratio: {total_demand/total_capacity:.2f}" if total_capacity > 0 else "[Railway] WARNING: Total capacity is 0!")
+    
+    # OSRM URL'yi doğrudan optimizer'a ilet (eşzamanlı işler ortam değişkenini paylaşmasın)
+    if request.osrm_url:
+        print(f"[Railway] Using OSRM URL: {request.osrm_url}")
+    
+    # OR-Tools optimizer'ı çağır (özdeş istekler önbellekten ya da çalışan çözümden cevaplanır)
+    solve = solver_pool.solve if solver_pool.size > 0 else optimize_routes
+    try:
+        with SOLVES_IN_FLIGHT.track_inprogress():
+            result = result_cache.get_or_compute(
+                request_cache_key({**request.dict(exclude={"customers"}), "customers": customers}),
+                lambda: admitted(lambda: solve(
+                    customers=customers,
+                    vehicles=[v.dict() for v in request.vehicles],
+                    depots=[d.dict() for d in request.depots],
+                    fuel_price=request.fuel_price,
+                    osrm_url=request.osrm_url,
+                    cancel_event=cancel_event,
+                    time_limit_seconds=request.time_limit_seconds,
+                    plateau_window_seconds=request.plateau_window_seconds,
+                    plateau_min_improvement=request.plateau_min_improvement,
+                    initial_routes=request.initial_routes,
+                    decomposition_threshold=request.decomposition_threshold,
+                    cluster_method=request.cluster_method,
+                    multi_depot_mode=request.multi_depot_mode,
+                    knn_k=request.knn_k,
+                    depot_assignment=request.depot_assignment,
+                    portfolio_size=request.portfolio_size,
+                    stop_event=stop_event,
+                    progress_callback=progress_callback
+                ), cancel_event, bounded_wait),
+                cancel_event=cancel_event
+            )
+    except OptimizationCancelled:
+        OPTIMIZATIONS.labels("cancelled").inc()
+        raise
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        OPTIMIZATIONS.labels("failed").inc()
+        record_solve_failure(e)
+        raise
+    OPTIMIZATIONS.labels("success").inc()
+    record_optimization(result["summary"])
+    print(f"[Railway] Timings: {result['summary'].get('timings')}")
+    
+    print(f"[Railway] Optimization successful: {len(result['routes'])} routes generated ({result['summary']['result_cache']})")
+    
+    return OptimizeResponse(
+        success=True,
+        routes=result["routes"],
+        summary=result["summary"]
+    )
 
 @app.post("/optimize", response_model=OptimizeResponse)
 def optimize(request: OptimizeRequest):
     try:
-        print(f"[Railway] ========== OPTIMIZATION REQUEST ==========")
-        print(f"[Railway] Depots: {len(request.depots)}")
-        print(f"[Railway] Customers: {len(request.customers)}")
-        print(f"[Railway] Vehicles: {len(request.vehicles)}")
-        print(f"[Railway] Fuel price: {request.fuel_price}")
-        
-        # Calculate total demand and capacity
-        total_demand = sum(c.demand_pallets for c in request.customers)
-        total_capacity = sum(v.capacity_pallets for v in request.vehicles)
-        print(f"[Railway] Total demand: {total_demand} pallets")
-        print(f"[Railway] Total capacity: {total_capacity} pallets")
-        print(f"[Railway] Demand/Capacity ratio: {total_demand/total_capacity:.2f}" if total_capacity > 0 else "[Railway] WARNING: Total capacity is 0!")
-        
-        # OSRM URL'yi environment variable'a kaydet (optimizer içinde kullanılacak)
-        if request.osrm_url:
-            os.environ['OSRM_URL'] = request.osrm_url
-            print(f"[Railway] Using OSRM URL: {request.osrm_url}")
-        
-        # OR-Tools optimizer'ı çağır
-        result = optimize_routes(
-            customers=[c.dict() for c in request.customers],
-            vehicles=[v.dict() for v in request.vehicles],
-            depots=[d.dict() for d in request.depots],
-            fuel_price=request.fuel_price
-        )
-        
-        print(f"[Railway] Optimization successful: {len(result['routes'])} routes generated")
-        
-        return OptimizeResponse(
-            success=True,
-            routes=result["routes"],
-            summary=result["summary"]
+        return run_optimization(request)
+    except AdmissionRejected as e:
+        raise busy_error(e)
+    except ValueError as e:
+        # Geçersiz girdi (ör. sütun uzunlukları, koordinatlar, kapasite): /jobs ve /optimize/batch ile aynı
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Railway] ERROR: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/optimize/batch", response_model=OptimizeBatchResponse)
+def optimize_scenarios(request: OptimizeBatchRequest):
+    """Aynı problemin senaryolarını tek mesafe matrisiyle paralel çözer ve baseline ile karşılaştırır"""
+    base = request.base
+    print(f"[Railway] ========== BATCH REQUEST: {len(request.scenarios)} scenarios ==========")
+    rejections = []
+
+    def batch(**pool_options):
+        return optimize_batch(
+            depots=[d.dict() for d in base.depots],
+            customers=request_customers(base),
+            vehicles=[v.dict() for v in base.vehicles],
+            scenarios=[scenario.dict() for scenario in request.scenarios],
+            fuel_price=base.fuel_price,
+            osrm_url=base.osrm_url,
+            solve_options={key: value for key, value in base.dict(include=set(SCENARIO_SOLVE_OPTIONS)).items()
+                           if value is not None},
+            on_failure=record_solve_failure,
+            **pool_options
         )
+
+    def solve_scenario(**kwargs):
+        # Eşzamanlı her senaryo kendi slotunda, kendi işçisinde (sınırlar ve çökme yalıtımıyla)
+        try:
+            return admitted(lambda: solver_pool.solve(**kwargs))
+        except AdmissionRejected as e:
+            rejections.append(e)
+            raise
+
+    try:
+        with SOLVES_IN_FLIGHT.track_inprogress():
+            if solver_pool.size > 0:
+                result = batch(solve=solve_scenario, max_workers=solver_pool.size)
+                # Hiçbir senaryo slot alamadıysa toplu istek meşgul yanıtı alır; kısmi redler senaryo hatasıdır
+                if rejections and not result["summary"]["solved"]:
+                    raise rejections[0]
+            else:
+                result = admitted(batch)
+    except AdmissionRejected as e:
+        raise busy_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Railway] ERROR: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
     
+    for scenario in result["scenarios"]:
+        OPTIMIZATIONS.labels("success" if scenario["success"] else "failed").inc()
+        if scenario["success"]:
+            record_optimization(scenario["summary"])
+    print(f"[Railway] Batch finished: {result['summary']['solved']} solved, {result['summary']['failed']} failed, "
+          f"best: {result['summary']['best']}")
+    return OptimizeBatchResponse(success=result["summary"]["solved"] > 0, **result)
+
+@app.post("/routes/insert", response_model=InsertResponse)
+def insert_into_routes(request: InsertRequest):
+    """Yeni siparişleri mevcut plana tam çözüm yapmadan ekler"""
+    try:
+        with INSERT_SECONDS.time():
+            result = insert_customers(
+                routes=request.routes,
+                new_customers=[c.dict() for c in request.customers],
+                vehicles=[v.dict() for v in request.vehicles],
+                depots=[d.dict() for d in request.depots],
+                fuel_price=request.fuel_price,
+                osrm_url=request.osrm_url
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[Railway] ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    return InsertResponse(success=True, **result)
+
+@app.post("/routes/cost", response_model=CostResponse)
+def recompute_route_costs(request: CostRequest):
+    """Rotaların maliyet alanlarını yeni fiyat/ücretlerle yeniden hesaplar (çözücü çalışmaz)"""
+    start = time.perf_counter()
+    routes = [dict(route) for route in request.routes]
+    previous_total = round(sum(route.get("total_cost") or 0 for route in routes), 2)
+    try:
+        with COST_SECONDS.time():
+            apply_route_costs(
+                routes, request.fuel_price, fuel_consumption=request.fuel_consumption,
+                distance_cost_per_km=request.distance_cost_per_km, toll_cost_per_km=request.toll_cost_per_km,
+                fixed_cost=request.fixed_cost
+            )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    summary = {field: round(sum(route[field] for route in routes), 2) for field in COST_FIELDS}
+    summary.update({
+        "total_routes": len(routes),
+        "total_distance_km": round(sum(route["distance_km"] for route in routes), 2),
+        "previous_total_cost": previous_total,
+        "total_cost_change": round(summary["total_cost"] - previous_total, 2),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    })
+    return CostResponse(success=True, routes=routes, summary=summary)
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+def submit_job(request: OptimizeRequest):
+    """Optimizasyonu arka planda başlatır, iş ID'sini hemen döner"""
+    # Sütunlu müşteriler iş kuyruğa girmeden doğrulanır (hatalı gövde 400, iş oluşmaz)
+    try:
+        customer_count = len(request_customers(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = job_manager.submit(
+        lambda job: run_optimization(request, job.cancel_event, job.stop_event, job.publish, bounded_wait=False).dict()
+    )
+    print(f"[Railway] Job {job.id} queued ({customer_count} customers)")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+def job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events: durum değişiklikleri (event: status) ve iyileşen çözümler (event: solution)
+    Yeniden bağlanan istemci Last-Event-ID ile kaldığı yerden devam eder; iş bitince akış kapanır
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    
+    last_event_id = request.headers.get("last-event-id")
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    
+    def stream():
+        index = start
+        while True:
+            events, finished = job.wait_events(index, SSE_KEEPALIVE_SECONDS)
+            if not events and not finished:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"id: {index}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                index += 1
+            if finished:
+                return
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs/{job_id}/stop", response_model=JobResponse)
+def stop_job(job_id: str):
+    """Aramayı erken bitirir; iş o ana kadarki en iyi planla tamamlanır (DELETE sonucu atar)"""
+    job = job_manager.stop(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    print(f"[Railway] Job {job_id} stop requested (status: {job.status})")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    print(f"[Railway] Job {job_id} cancel requested (status: {job.status})")
+    return job.to_dict()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# OSRM yol mesafesi önbelleği (SQLite)
+# Anahtar: yuvarlanmış koordinat çifti (kaynak, hedef) + OSRM sunucusu
+# Depo ve müşteri koordinatları günden güne pek değişmediği için çoğu çift tekrar kullanılır
+CACHE_PATH = os.environ.get(
+    "VRP_MATRIX_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "vrp_matrix_cache.sqlite3")
+)
+CACHE_TTL_SECONDS = int(os.environ.get("VRP_MATRIX_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("VRP_MATRIX_CACHE_MAX_ENTRIES", 2_000_000))
+COORD_PRECISION = 5  # ~1 m
+# Silme her yazımda değil: satır sayısı tahmini sınırı aşınca ya da bu aralıkta bir (TTL)
+EVICT_INTERVAL_SECONDS = float(os.environ.get("VRP_MATRIX_CACHE_EVICT_INTERVAL_SECONDS", 300))
+# Boyut sınırı aşılınca sınırın bu oranına kadar silinir (sınırda her yazımda yeniden silmemek için)
+EVICT_LOW_WATER = 0.9
+
+
+def coord_key(lat: float, lng: float) -> str:
+    """Koordinatı önbellek anahtarına çevir (5 ondalık basamak)"""
+    lat, lng = float(lat), float(lng)  # NumPy skalerleri de Python yuvarlamasıyla aynı anahtar
+    return f"{round(lat, COORD_PRECISION):.{COORD_PRECISION}f},{round(lng, COORD_PRECISION):.{COORD_PRECISION}f}"
+
+
+class DistanceMatrixCache:
+    """Koordinat çiftleri için kalıcı mesafe önbelleği (TTL + boyut tabanlı silme)"""
+
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Satır sayısı tahmini: evict'te COUNT(*) ile kesinleşir, yazımlarda eklenen satırlar kadar artar
+        # (üzerine yazılan çiftler de sayıldığından gerçek sayıdan büyük olabilir, küçük olmaz)
+        self._row_count: Optional[int] = None
+        self._next_evict = 0.0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL: paralel depo süreçleri ve uvicorn worker'ları aynı dosyayı okuyup yazabilir
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS distances (
+                namespace TEXT NOT NULL,
+                src TEXT NOT NULL,
+                dst TEXT NOT NULL,
+                distance INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, src, dst)
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_distances_created ON distances (created_at)")
+        # Sorgu anahtarları (bağlantıya özel): kaynak ve hedef SQL'de süzülür, IN (...) parametre sınırı yok
+        for table in ("lookup_src", "lookup_dst"):
+            self._conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._conn.commit()
+
+    def _select(self, namespace: str, src_keys: List[str], dst_keys: List[str]) -> List[Tuple[str, str, int]]:
+        """src_keys × dst_keys çiftlerinin geçerli (TTL) kayıtları (lock altında çağrılır)"""
+        try:
+            self._conn.executemany("INSERT OR IGNORE INTO lookup_src (key) VALUES (?)", ((k,) for k in src_keys))
+            self._conn.executemany("INSERT OR IGNORE INTO lookup_dst (key) VALUES (?)", ((k,) for k in dst_keys))
+            return self._conn.execute(
+                "SELECT src, dst, distance FROM distances "
+                "WHERE namespace = ? AND created_at >= ? "
+                "AND src IN (SELECT key FROM lookup_src) AND dst IN (SELECT key FROM lookup_dst)",
+                (namespace, time.time() - self.ttl_seconds)
+            ).fetchall()
+        finally:
+            self._conn.execute("DELETE FROM lookup_src")
+            self._conn.execute("DELETE FROM lookup_dst")
+            self._conn.commit()
+
+    def lookup(self, namespace: str, locations: List[tuple]) -> List[List[Optional[int]]]:
+        """N×N matris döndürür; önbellekte olmayan çiftler None"""
+        keys = [coord_key(lat, lng) for lat, lng in locations]
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            rows = self._select(namespace, unique_keys, unique_keys)
+        found: Dict[Tuple[str, str], int] = {(src, dst): distance for src, dst, distance in rows}
+
+        return [[found.get((src, dst)) for dst in keys] for src in keys]
+
+    def lookup_pairs(self, namespace: str, locations: List[tuple], sources: List[int],
+                     destinations: List[int]) -> Dict[Tuple[int, int], int]:
+        """
+        Yalnızca sources × destinations çiftleri (N×N matris kurmadan)
+        Returns: {(kaynak sırası, hedef sırası): mesafe}; önbellekte olmayanlar yok
+        """
+        keys = [coord_key(lat, lng) for lat, lng in locations]
+        destinations_by_key: Dict[str, List[int]] = {}
+        for j in destinations:
+            destinations_by_key.setdefault(keys[j], []).append(j)
+        source_keys = list(dict.fromkeys(keys[i] for i in sources))
+
+        with self._lock:
+            rows = self._select(namespace, source_keys, list(destinations_by_key))
+        found_by_key: Dict[Tuple[str, str], int] = {(src, dst): distance for src, dst, distance in rows}
+
+        found: Dict[Tuple[int, int], int] = {}
+        for i in sources:
+            for dst_key, dst_indices in destinations_by_key.items():
+                distance = found_by_key.get((keys[i], dst_key))
+                if distance is not None:
+                    for j in dst_indices:
+                        found[(i, j)] = distance
+        return found
+
+    def store(self, namespace: str, locations: List[tuple], sources: List[int],
+              destinations: List[int], distances: List[List[int]]):
+        """sources × destinations alt matrisini önbelleğe yaz (None olan çiftler atlanır)"""
+        keys = [coord_key(lat, lng) for lat, lng in locations]
+        now = time.time()
+        rows = [
+            (namespace, keys[i], keys[j], int(distances[si][dj]), now)
+            for si, i in enumerate(sources)
+            for dj, j in enumerate(destinations)
+            if distances[si][dj] is not None
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO distances (namespace, src, dst, distance, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            if self._row_count is not None:
+                self._row_count += len(rows)
+            due = (self._row_count is None or self._row_count > self.max_entries
+                   or time.monotonic() >= self._next_evict)
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Süresi dolan kayıtları sil; boyut sınırı aşıldıysa en eskileri sınırın EVICT_LOW_WATER oranına kadar sil"""
+        with self._lock:
+            self._conn.execute("DELETE FROM distances WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            count = self._conn.execute("SELECT COUNT(*) FROM distances").fetchone()[0]
+            if count > self.max_entries:
+                overflow = count - int(self.max_entries * EVICT_LOW_WATER)
+                self._conn.execute(
+                    "DELETE FROM distances WHERE (namespace, src, dst) IN "
+                    "(SELECT namespace, src, dst FROM distances ORDER BY created_at LIMIT ?)",
+                    (overflow,)
+                )
+                count -= overflow
+            self._conn.commit()
+            self._row_count = count
+            self._next_evict = time.monotonic() + EVICT_INTERVAL_SECONDS
+
+
+_cache: Optional[DistanceMatrixCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_matrix_cache() -> Optional[DistanceMatrixCache]:
+    """Süreç başına tek önbellek örneği; VRP_MATRIX_CACHE_PATH=off ile kapatılır"""
+    global _cache
+    if CACHE_PATH.lower() in ("", "off", "none"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DistanceMatrixCache()
+            except sqlite3.Error as e:
+                print(f"[MatrixCache] Önbellek açılamadı ({CACHE_PATH}): {e}")
+                return None
+        return _cache
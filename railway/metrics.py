@@ -0,0 +1,107 @@
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Prometheus metrikleri (GET /metrics)
+# Depo çözümleri alt süreçlerde çalışabildiği için metrikler ana süreçte, dönen
+# summary (timings / matrix / search) üzerinden kaydedilir.
+
+# Saniyelerden dakikalara kadar: doğrulama ms, arama 120 sn mertebesinde
+PHASE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+OPTIMIZATION_SECONDS = Histogram(
+    "vrp_optimization_seconds", "End-to-end optimization latency (solver runs only)", buckets=PHASE_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    "vrp_phase_seconds", "Optimization latency per phase, summed over depots", ["phase"], buckets=PHASE_BUCKETS
+)
+OPTIMIZATIONS = Counter(
+    "vrp_optimizations_total", "Optimization requests by outcome", ["outcome"]  # success | failed | cancelled
+)
+RESULT_CACHE = Counter(
+    "vrp_result_cache_total", "Result cache lookups", ["result"]  # hit | shared | miss
+)
+SOLVES_IN_FLIGHT = Gauge("vrp_solves_in_flight", "Optimizations currently running or waiting on a shared solve")
+SOLVER_STATUS = Counter("vrp_solver_status_total", "OR-Tools routing status per depot solve", ["status"])
+SEARCH_STOPS = Counter("vrp_search_stop_total", "Why the depot search stopped", ["reason"])
+PORTFOLIO_WINS = Counter(
+    "vrp_portfolio_wins_total", "Portfolio races won per strategy", ["strategy"]  # FIRST_SOLUTION/METAHEURISTIC
+)
+MATRIX_PAIRS = Counter(
+    "vrp_matrix_pairs_total", "Distance matrix pairs by source", ["source"]  # cache | osrm | fallback
+)
+OSRM_TILES = Counter("vrp_osrm_tiles_total", "OSRM Table API tiles requested")
+OSRM_TILE_FAILURES = Counter("vrp_osrm_tile_failures_total", "OSRM Table API tiles that failed after retries")
+# Kabul kontrolü (admission.py): otomatik ölçekleme için kuyruk derinliği ve reddedilen istekler
+ADMISSION_QUEUE_DEPTH = Gauge("vrp_admission_queue_depth", "Solves waiting for a solver slot")
+ADMISSION_RUNNING = Gauge("vrp_admission_running", "Solves holding a solver slot")
+ADMISSION_REJECTIONS = Counter(
+    "vrp_admission_rejections_total", "Solves rejected by admission control", ["reason"]  # queue_full | queue_timeout
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "vrp_admission_wait_seconds", "Time spent waiting for a solver slot", buckets=PHASE_BUCKETS
+)
+SOLVE_FAILURES = Counter(
+    "vrp_solve_failures_total", "Failed optimizations by reason",
+    ["reason"]  # no_solution | invalid_request | deadline | memory | crashed | error
+)
+SOLVER_WORKER_RESTARTS = Counter(
+    "vrp_solver_worker_restarts_total", "Solver worker processes killed and respawned",
+    ["reason"]  # deadline | memory | crashed | cancelled | abandoned
+)
+INSERT_SECONDS = Histogram("vrp_insert_seconds", "POST /routes/insert latency", buckets=PHASE_BUCKETS)
+COST_SECONDS = Histogram(
+    "vrp_cost_seconds", "POST /routes/cost latency", buckets=(0.0005, 0.001, 0.0025) + PHASE_BUCKETS
+)
+
+
+def record_optimization(summary: dict):
+    """Tamamlanan bir optimizasyonun summary'sini metriklere işle"""
+    cache_result = summary.get("result_cache")
+    if cache_result:
+        RESULT_CACHE.labels(cache_result).inc()
+    if cache_result in ("hit", "shared"):
+        # Çözüm başka bir istek tarafından yapıldı; fazlar bir kez sayılır
+        return
+
+    timings = summary.get("timings", {})
+    if "total_s" in timings:
+        OPTIMIZATION_SECONDS.observe(timings["total_s"])
+    for phase, seconds in timings.items():
+        if phase != "total_s":
+            PHASE_SECONDS.labels(phase[:-2] if phase.endswith("_s") else phase).observe(seconds)
+
+    _record_matrix(summary.get("matrix", {}))
+
+    for stats in summary.get("search", []):
+        if stats.get("solver_status"):
+            SOLVER_STATUS.labels(stats["solver_status"]).inc()
+        if stats.get("stop_reason"):
+            SEARCH_STOPS.labels(stats["stop_reason"]).inc()
+        if stats.get("portfolio"):
+            PORTFOLIO_WINS.labels(stats["portfolio"]["winner"]).inc()
+
+
+def _record_matrix(matrix: dict):
+    MATRIX_PAIRS.labels("cache").inc(matrix.get("cache_hits", 0))
+    MATRIX_PAIRS.labels("osrm").inc(matrix.get("osrm_pairs", 0))
+    MATRIX_PAIRS.labels("fallback").inc(matrix.get("fallback_pairs", 0))
+    OSRM_TILES.inc(matrix.get("osrm_tiles", 0))
+    OSRM_TILE_FAILURES.inc(matrix.get("osrm_failed_tiles", 0))
+
+
+def record_failure(reason: str, solver_status: Optional[str] = None, matrix: Optional[dict] = None):
+    """
+    Başarısız bir optimizasyonu metriklere işle (summary yok)
+    solver_status / matrix: arama çözüm bulamadıysa OR-Tools durumu ve matris istatistikleri
+    """
+    SOLVE_FAILURES.labels(reason).inc()
+    if solver_status:
+        SOLVER_STATUS.labels(solver_status).inc()
+    if matrix:
+        _record_matrix(matrix)
+
+
+def render_metrics():
+    """Prometheus text exposition: (gövde, content type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
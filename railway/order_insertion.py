@@ -0,0 +1,228 @@
+import os
+import time
+from typing import List, Optional
+
+from cost_model import VEHICLE_TYPES, route_cost_fields
+from depot_assignment import assign_depots
+from insertion import cheapest_insertion, relocate_and_insert, route_duration
+from ortools_optimizer import (
+    SERVICE_TIMES, _build_time_matrix, _clamp_distance_matrix,
+    get_osrm_distance_matrix, haversine_distance
+)
+
+# Artımlı sipariş ekleme (POST /routes/insert)
+# Mevcut plan yeniden çözülmez: yeni müşteriler kapasite ve Time dimension limitlerine uyan
+# en ucuz noktaya eklenir. Matris için yalnızca yeni noktaların satır/sütunları OSRM'den istenir.
+MAX_ROUTE_MINUTES = 1440  # Time dimension üst sınırı ile aynı (24 saat)
+FIXED_VEHICLE_COST = 10000  # Boş araç açma cezası (SetFixedCostOfAllVehicles ile aynı)
+RELOCATE_MAX_MOVES = int(os.environ.get("VRP_INSERT_RELOCATE_MAX_MOVES", 5000))
+
+
+def _vehicle_capacity(vehicle: Optional[dict], route: dict) -> int:
+    if vehicle is not None:
+        return vehicle.get("capacity_pallets", 26)
+    return VEHICLE_TYPES.get(route.get("vehicle_type"), {}).get("capacity", 26)
+
+
+def _build_route(template: dict, nodes: List[int], depot_node: int, depot: dict, stops_by_node: dict,
+                 locations: List[tuple], distance_matrix, time_matrix, fuel_price: float) -> dict:
+    """Değişen rotanın duraklarını, mesafe/süre ve maliyet alanlarını yeniden hesapla"""
+    route_stops = []
+    cumulative_load = 0
+    prev = depot_node
+    route_distance = 0
+    for stop_order, node in enumerate(nodes, start=1):
+        stop = dict(stops_by_node[node])
+        cumulative_load += stop["demand"]
+        stop["stopOrder"] = stop_order
+        stop["cumulativeLoad"] = cumulative_load
+        stop["distanceFromPrev"] = round(haversine_distance(
+            locations[prev][0], locations[prev][1], locations[node][0], locations[node][1]
+        ), 2)
+        route_stops.append(stop)
+        route_distance += int(distance_matrix[prev][node])
+        prev = node
+    route_distance += int(distance_matrix[prev][depot_node])
+
+    route_distance_km = route_distance / 1000
+    duration = route_duration(nodes, time_matrix, depot_node)
+
+    route = dict(template)
+    route.update({
+        "depot_id": depot["id"],
+        "depot_name": depot.get("name", depot["id"]),
+        "stops": route_stops,
+        "distance_km": round(route_distance_km, 2),
+        "duration_minutes": round(min(duration, MAX_ROUTE_MINUTES), 2),
+        **route_cost_fields(route_distance_km, template["vehicle_type"], fuel_price),
+        "total_pallets": cumulative_load
+    })
+    return route
+
+
+def insert_customers(routes: list, new_customers: list, vehicles: list, depots: list,
+                     fuel_price: float = 47.50, osrm_url: str = None) -> dict:
+    """
+    Yeni müşterileri mevcut rotalara ekle (tam çözüm yok)
+    1. Doğrudan en ucuz uygun ekleme (gerekirse kullanılmayan bir araç açılır)
+    2. Olmazsa sınırlı relocate araması: bir durağı başka rotaya taşıyıp yer aç
+    Müşteri depot_id vermezse en yakın depoya atanır (VRP_DEPOT_ASSIGNMENT); sadece o deponun rotaları denenir.
+    Returns: {"routes", "inserted", "unplaced", "summary"}
+    """
+    start_time = time.perf_counter()
+    if not depots:
+        raise ValueError("At least one depot is required")
+
+    depot_nodes = {d["id"]: i for i, d in enumerate(depots)}
+    locations = [(d["location"]["lat"], d["location"]["lng"]) for d in depots]
+    demands = [0] * len(depots)
+    service_minutes = [0] * len(depots)
+    stops_by_node = {}
+
+    # Mevcut rotalar: her durak kendi düğümü
+    vehicle_by_id = {str(v["id"]): v for v in vehicles}
+    route_nodes, route_depots, capacities = [], [], []
+    for route in routes:
+        depot_id = route.get("depot_id", depots[0]["id"])
+        if depot_id not in depot_nodes:
+            raise ValueError(f"Route {route.get('vehicle_id')} references unknown depot: {depot_id}")
+        nodes = []
+        for stop in route.get("stops", []):
+            nodes.append(len(locations))
+            stops_by_node[len(locations)] = stop
+            locations.append((stop["location"]["lat"], stop["location"]["lng"]))
+            demands.append(int(stop.get("demand", 0)))
+            service_minutes.append(int(stop.get("service_time", SERVICE_TIMES["default"])))
+        route_nodes.append(nodes)
+        route_depots.append(depot_nodes[depot_id])
+        capacities.append(_vehicle_capacity(vehicle_by_id.get(str(route.get("vehicle_id"))), route))
+
+    used_vehicle_ids = {str(route.get("vehicle_id")) for route in routes}
+    unused_vehicles = [v for v in vehicles if str(v["id"]) not in used_vehicle_ids]
+
+    # Yeni müşteriler (depot_id'si olmayanlar en yakın depoya)
+    new_nodes, customer_depots = [], {}
+    new_customer_depots = assign_depots(new_customers, depots, osrm_url=osrm_url)
+    for customer, depot_id in zip(new_customers, new_customer_depots):
+        location = (customer["location"]["lat"], customer["location"]["lng"])
+        node = len(locations)
+        new_nodes.append(node)
+        stops_by_node[node] = {
+            "customer_id": customer["id"],
+            "customer_name": customer["name"],
+            "location": customer["location"],
+            "demand": customer["demand_pallets"],
+            "service_time": SERVICE_TIMES.get(customer.get("business_type", "default"), SERVICE_TIMES["default"])
+        }
+        locations.append(location)
+        demands.append(customer["demand_pallets"])
+        service_minutes.append(stops_by_node[node]["service_time"])
+        customer_depots[node] = depot_nodes[depot_id]
+
+    print(f"[Insert] {len(new_nodes)} new customers into {len(routes)} routes ({len(unused_vehicles)} unused vehicles)")
+
+    # Sadece yeni satır/sütunlar çekilir; mevcut duraklar arası mesafeler önbellekten gelir
+    matrix_start = time.perf_counter()
+    distance_matrix = _clamp_distance_matrix(
+        get_osrm_distance_matrix(locations, osrm_url, fetch_indices=new_nodes)
+    )
+    time_matrix = _build_time_matrix(distance_matrix, service_minutes)
+    matrix_time = time.perf_counter() - matrix_start
+
+    inserted, unplaced = [], []
+    changed_routes = set()
+    opened_routes = []  # (araç, düğümler, depo düğümü)
+
+    for node in sorted(new_nodes, key=lambda n: -demands[n]):
+        depot_node = customer_depots[node]
+        candidates = [i for i, d in enumerate(route_depots) if d == depot_node]
+        candidate_routes = [route_nodes[i] for i in candidates] + [[] for _ in unused_vehicles]
+        candidate_capacities = [capacities[i] for i in candidates] + [
+            v.get("capacity_pallets", 26) for v in unused_vehicles
+        ]
+        candidate_depots = [depot_node] * len(candidate_routes)
+
+        updated, missing = cheapest_insertion(
+            candidate_routes, [node], distance_matrix, demands, candidate_capacities,
+            time_matrix=time_matrix, max_route_minutes=MAX_ROUTE_MINUTES,
+            fixed_vehicle_cost=FIXED_VEHICLE_COST, route_depots=candidate_depots
+        )
+        method = "insertion"
+        if missing and candidates:
+            existing, placed = relocate_and_insert(
+                updated[:len(candidates)], node, distance_matrix, demands, candidate_capacities[:len(candidates)],
+                time_matrix=time_matrix, max_route_minutes=MAX_ROUTE_MINUTES,
+                route_depots=candidate_depots[:len(candidates)], max_moves=RELOCATE_MAX_MOVES
+            )
+            if placed:
+                updated = existing + updated[len(candidates):]
+                method = "relocate"
+                missing = []
+
+        customer_id = stops_by_node[node]["customer_id"]
+        if missing:
+            print(f"[Insert] ✗ No feasible position for customer {customer_id}")
+            unplaced.append(customer_id)
+            continue
+
+        for position, route_index in enumerate(candidates):
+            if updated[position] != route_nodes[route_index]:
+                route_nodes[route_index] = updated[position]
+                changed_routes.add(route_index)
+                if node in updated[position]:
+                    vehicle_id = routes[route_index].get("vehicle_id")
+
+        for offset, vehicle in enumerate(unused_vehicles):
+            if updated[len(candidates) + offset]:
+                # Yeni araç açıldı: sonraki müşteriler için normal rota olarak devam eder
+                method = "new_vehicle"
+                vehicle_id = vehicle["id"]
+                opened_routes.append(len(route_nodes))
+                route_nodes.append(updated[len(candidates) + offset])
+                route_depots.append(depot_node)
+                capacities.append(vehicle.get("capacity_pallets", 26))
+                routes = routes + [{
+                    "vehicle_id": vehicle["id"],
+                    "plate": vehicle.get("plate", f"Araç {len(routes) + 1}"),
+                    "vehicle_type": vehicle["type"]
+                }]
+                changed_routes.add(len(route_nodes) - 1)
+                unused_vehicles = unused_vehicles[:offset] + unused_vehicles[offset + 1:]
+                break
+
+        inserted.append({
+            "customer_id": customer_id,
+            "vehicle_id": vehicle_id,
+            "depot_id": depots[depot_node]["id"],
+            "method": method
+        })
+
+    result_routes = []
+    for route_index, route in enumerate(routes):
+        if route_index in changed_routes:
+            depot_node = route_depots[route_index]
+            route = _build_route(
+                route, route_nodes[route_index], depot_node, depots[depot_node], stops_by_node,
+                locations, distance_matrix, time_matrix, fuel_price
+            )
+        result_routes.append(route)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"[Insert] ✓ {len(inserted)} inserted, {len(unplaced)} unplaced, "
+          f"{len(changed_routes)} routes changed ({len(opened_routes)} new) in {elapsed * 1000:.0f} ms")
+
+    return {
+        "routes": result_routes,
+        "inserted": inserted,
+        "unplaced": unplaced,
+        "summary": {
+            "total_routes": len(result_routes),
+            "total_distance_km": round(sum(r.get("distance_km", 0) for r in result_routes), 2),
+            "total_vehicles_used": len(result_routes),
+            "changed_routes": len(changed_routes),
+            "opened_routes": len(opened_routes),
+            "algorithm": "cheapest-insertion",
+            "matrix_time_s": round(matrix_time, 3),
+            "elapsed_s": round(elapsed, 3)
+        }
+    }
@@ -1,10 +1,21 @@
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
 import math
+import multiprocessing
 import os
-import requests
+import time
+import numpy as np
 from typing import List, Dict
 
+from columnar import customer_coordinates, take_customers
+from cost_model import route_cost_fields
+from depot_assignment import assign_depots
+from insertion import cheapest_insertion, route_load
+from location_matrix import precomputed_matrix_for
+from matrix_cache import get_matrix_cache
+from osrm_client import fetch_table
+
 # Multi-depot VRP optimization with OR-Tools
 # Business tiplerine göre servis süreleri (dakika)
 SERVICE_TIMES = {
@@ -15,14 +26,180 @@ SERVICE_TIMES = {
     "default": 30
 }
 
-# Araç tipleri: kapasite ve yakıt tüketimi
-VEHICLE_TYPES = {
-    0: {"name": "Kamyonet", "capacity": 10, "fuel": 15},
-    1: {"name": "Kamyon-1", "capacity": 14, "fuel": 20},
-    2: {"name": "Kamyon-2", "capacity": 18, "fuel": 30},
-    3: {"name": "TIR", "capacity": 32, "fuel": 35},
-    4: {"name": "Romork", "capacity": 36, "fuel": 40}
-}
+# Depo başına arama süresi (saniye) ve paralel depo çözümünde kullanılacak süreç sayısı
+DEFAULT_TIME_LIMIT_SECONDS = int(os.environ.get("VRP_TIME_LIMIT_SECONDS", 120))
+DEFAULT_DEPOT_WORKERS = int(os.environ.get("VRP_DEPOT_WORKERS", os.cpu_count() or 1))
+
+# Plato tespiti: son PLATEAU_WINDOW saniyede amaç değeri PLATEAU_MIN_IMPROVEMENT oranından
+# fazla iyileşmediyse arama erken durdurulur (0 = kapalı, tam süre kullanılır)
+DEFAULT_PLATEAU_WINDOW_SECONDS = float(os.environ.get("VRP_PLATEAU_WINDOW_SECONDS", 20))
+DEFAULT_PLATEAU_MIN_IMPROVEMENT = float(os.environ.get("VRP_PLATEAU_MIN_IMPROVEMENT", 0.001))
+
+# İlerleme olayları (SSE): iyileşen çözümler en fazla bu sıklıkta yayınlanır
+PROGRESS_MIN_INTERVAL_SECONDS = float(os.environ.get("VRP_PROGRESS_MIN_INTERVAL_SECONDS", 0.5))
+# Yeni çözüm gelmese de iptal / erken bitirme / plato kontrol aralığı (arama limiti saniyede yüz binlerce çağrılır)
+SEARCH_CHECK_INTERVAL_SECONDS = 0.1
+
+# Büyük depolar için önce kümele, sonra çöz: müşteri sayısı eşiği aşarsa depo talebe göre
+# dengeli coğrafi kümelere bölünür (0 = kapalı), kümeler paralel çözülür ve komşu kümeler
+# arasında kısa bir sınır onarımı yapılır
+DEFAULT_DECOMPOSITION_THRESHOLD = int(os.environ.get("VRP_DECOMPOSITION_THRESHOLD", 300))
+DEFAULT_CLUSTER_SIZE = int(os.environ.get("VRP_CLUSTER_SIZE", 150))  # Küme başına hedef müşteri
+DEFAULT_CLUSTER_METHOD = os.environ.get("VRP_CLUSTER_METHOD", "sweep")  # sweep | kmeans
+DEFAULT_BOUNDARY_REPAIR_SECONDS = int(os.environ.get("VRP_BOUNDARY_REPAIR_SECONDS", 10))
+
+# Çok depolu istekler: per_depot = her depo kendi filo payıyla ayrı çözülür,
+# joint = tüm depolar tek modelde (araçlar kendi depolarından çıkar, filo paylaşılır)
+DEFAULT_MULTI_DEPOT_MODE = os.environ.get("VRP_MULTI_DEPOT_MODE", "per_depot")
+MULTI_DEPOT_MODES = ("per_depot", "joint")
+
+# K en yakın komşu ark budaması: her müşteri yalnızca yola göre en yakın k müşteriye
+# (ve depolara) gidebilir; uzak arklar NextVar domain'inden çıkarılır (0 = kapalı)
+DEFAULT_KNN_K = int(os.environ.get("VRP_KNN_K", 0))
+
+# Çözücü portföyü: aynı görev için farklı başlangıç stratejisi + metasezgisel kombinasyonları
+# ayrı süreçlerde aynı süreyle yarışır, amaç değeri en düşük olan kazanır (0/1 = kapalı).
+# Eşzamanlı aday sayısı boştaki çekirdeklerle sınırlıdır (süre bütçesi aşılmaz).
+DEFAULT_PORTFOLIO_SIZE = int(os.environ.get("VRP_PORTFOLIO_SIZE", 0))
+DEFAULT_FIRST_SOLUTION_STRATEGY = "PARALLEL_CHEAPEST_INSERTION"
+DEFAULT_LOCAL_SEARCH_METAHEURISTIC = "GUIDED_LOCAL_SEARCH"
+PORTFOLIO_CONFIGS = [
+    ("PARALLEL_CHEAPEST_INSERTION", "GUIDED_LOCAL_SEARCH"),  # Varsayılan çözüm
+    ("PATH_CHEAPEST_ARC", "GUIDED_LOCAL_SEARCH"),
+    ("SAVINGS", "GUIDED_LOCAL_SEARCH"),
+    ("PARALLEL_CHEAPEST_INSERTION", "SIMULATED_ANNEALING"),
+    ("PATH_CHEAPEST_ARC", "TABU_SEARCH"),
+    ("LOCAL_CHEAPEST_INSERTION", "GUIDED_LOCAL_SEARCH"),
+    ("GLOBAL_CHEAPEST_ARC", "SIMULATED_ANNEALING"),
+    ("SAVINGS", "TABU_SEARCH"),
+]
+
+class OptimizationCancelled(Exception):
+    """Optimizasyon dışarıdan (ör. iş iptali) durduruldu"""
+
+class NoSolutionFound(Exception):
+    """Arama çözüm bulamadı; metrikler için OR-Tools durumu ve matris istatistikleri taşınır"""
+
+    def __init__(self, message: str, solver_status: str, matrix: dict = None):
+        self.solver_status = solver_status
+        self.matrix = matrix or {}
+        super().__init__(message)
+
+    def __reduce__(self):
+        # Depo havuzundan / çözücü işçisinden pickle ile döner
+        return type(self), (str(self), self.solver_status, self.matrix)
+
+class _SearchMonitor:
+    """
+    attach() ile modele bağlanır:
+    - her çözümde (AddAtSolutionCallback) en iyi amaç değerini ve bulunduğu anı kaydeder,
+      progress_callback verilirse iyileşen çözümleri (amaç, araç, km, süre) yayınlar
+    - iptal (cancel_event), erken bitirme (stop_event) ve plato durumunda aramayı bitirir; kontrol
+      yeni çözüme bağlı değil, arama limiti (CustomLimit) olarak SEARCH_CHECK_INTERVAL_SECONDS'ta bir
+      çalışır (GLS yeni çözüm bulamadan dönerken de)
+    """
+
+    def __init__(self, routing, cancel_event=None, plateau_window_seconds: float = 0,
+                 plateau_min_improvement: float = 0, stop_event=None, progress_callback=None,
+                 fixed_vehicle_cost: int = 0):
+        self.routing = routing
+        self.cancel_event = cancel_event
+        self.stop_event = stop_event
+        self.plateau_window_seconds = plateau_window_seconds
+        self.plateau_min_improvement = plateau_min_improvement
+        self.progress_callback = progress_callback
+        self.fixed_vehicle_cost = fixed_vehicle_cost
+        self.start_time = time.monotonic()
+        self.best_objective = None
+        self.best_time = None
+        self.last_improvement_time = 0.0  # Son anlamlı (eşik üstü) iyileşme
+        self.last_progress_time = None
+        self.solutions = 0
+        self.stop_reason = None
+        self._next_check = 0.0
+        self._limit = None
+
+    def attach(self):
+        """Çözüm callback'ini ve zamana bağlı durdurma limitini modele ekle"""
+        self.routing.AddAtSolutionCallback(self)
+        # SWIG nesnesi arama boyunca canlı kalmalı
+        self._limit = self.routing.solver().CustomLimit(self.should_stop)
+        self.routing.AddSearchMonitor(self._limit)
+
+    def _check_stop(self, elapsed: float):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.stop_reason = "cancelled"
+        elif self.best_objective is None:
+            return  # Erken bitirme ve plato en iyi çözümü döndürür: ilk çözüm beklenir
+        elif self.stop_event is not None and self.stop_event.is_set():
+            self.stop_reason = "stopped"
+        elif self.plateau_window_seconds and elapsed - self.last_improvement_time >= self.plateau_window_seconds:
+            self.stop_reason = "plateau"
+
+    def should_stop(self) -> bool:
+        """Arama limiti: True dönünce arama biter (en iyi çözüm korunur)"""
+        if self.stop_reason is None:
+            now = time.monotonic()
+            if now < self._next_check:
+                return False
+            self._next_check = now + SEARCH_CHECK_INTERVAL_SECONDS
+            self._check_stop(now - self.start_time)
+        return self.stop_reason is not None
+
+    def __call__(self):
+        elapsed = time.monotonic() - self.start_time
+        objective = self.routing.CostVar().Value()
+        self.solutions += 1
+        
+        if self.best_objective is None or objective < self.best_objective:
+            if self.best_objective is None or \
+                    (self.best_objective - objective) > self.plateau_min_improvement * self.best_objective:
+                self.last_improvement_time = elapsed
+            self.best_objective = objective
+            self.best_time = elapsed
+            if self.progress_callback is not None and (
+                    self.last_progress_time is None
+                    or elapsed - self.last_progress_time >= PROGRESS_MIN_INTERVAL_SECONDS):
+                self.last_progress_time = elapsed
+                self._publish_progress(objective, elapsed)
+        
+        if self.stop_reason is None:
+            self._check_stop(elapsed)
+        if self.stop_reason:
+            self.routing.solver().FinishCurrentSearch()
+
+    def _publish_progress(self, objective: int, elapsed: float):
+        """Mevcut çözümün özeti; amaç = metre + kullanılan araç başına sabit maliyet"""
+        routing = self.routing
+        vehicles_used = sum(
+            1 for vehicle in range(routing.vehicles())
+            if not routing.IsEnd(routing.NextVar(routing.Start(vehicle)).Value())
+        )
+        try:
+            self.progress_callback({
+                "objective": objective,
+                "vehicles_used": vehicles_used,
+                "total_km": round((objective - vehicles_used * self.fixed_vehicle_cost) / 1000, 2),
+                "elapsed_s": round(elapsed, 2),
+                "solutions": self.solutions,
+            })
+        except Exception as e:
+            # İlerleme yayını aramayı asla bozmasın
+            print(f"[OR-Tools] Progress callback failed: {e}")
+
+    def stats(self, time_limit_seconds: int) -> dict:
+        """Response summary için arama istatistikleri"""
+        solve_time = time.monotonic() - self.start_time
+        stop_reason = self.stop_reason
+        if stop_reason is None:
+            stop_reason = "time_limit" if solve_time >= time_limit_seconds * 0.99 else "search_completed"
+        return {
+            "stop_reason": stop_reason,
+            "best_solution_time_s": round(self.best_time, 2) if self.best_time is not None else None,
+            "solve_time_s": round(solve_time, 2),
+            "solutions": self.solutions,
+            "objective": self.best_objective,
+        }
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Haversine formula ile iki nokta arası mesafe (km)"""
@@ -41,52 +218,229 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     
     return R * c
 
-def get_osrm_distance_matrix(locations: List[tuple], osrm_url: str = None) -> List[List[int]]:
+def _valid_coordinates(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Geçerli enlem/boylam maskesi"""
+    return (lat >= -90) & (lat <= 90) & (lng >= -180) & (lng <= 180)
+
+def haversine_matrix(locations) -> np.ndarray:
+    """Vektörel Haversine mesafe matrisi (metre, int32); locations: (lat, lng) listesi ya da n×2 dizi
+
+    haversine_distance ile aynı formül; N×N çift için Python döngüsü yerine NumPy broadcast.
+    """
+    coords = np.radians(np.asarray(locations, dtype=np.float64).reshape(-1, 2))
+    lat = coords[:, 0]
+    lng = coords[:, 1]
+    
+    dlat = lat[None, :] - lat[:, None]
+    dlng = lng[None, :] - lng[:, None]
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    
+    # km -> metre, int() ile aynı şekilde aşağı yuvarla
+    matrix = (6371 * c * 1000).astype(np.int32)
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+def get_osrm_distance_matrix(locations: List[tuple], osrm_url: str = None,
+                             fetch_indices: List[int] = None, stats: dict = None,
+                             known: np.ndarray = None) -> List[List[int]]:
     """
     OSRM Table API kullanarak gerçek yol mesafesi matrisi hesapla
+    Önbellekte (matrix_cache) bulunan çiftler tekrar istenmez; eksikler karolar halinde
+    eşzamanlı çekilir (osrm_client). Yalnızca başarısız karolar Haversine'e düşer.
+    fetch_indices: verilirse OSRM'den sadece bu noktaların satır/sütunları istenir,
+    diğer eksik çiftler Haversine ile doldurulur (artımlı ekleme için)
+    stats: verilirse çiftlerin kaynağı (cache_hits / osrm_pairs / fallback_pairs) ve
+    OSRM karo sayıları (osrm_tiles / osrm_failed_tiles) bu sözlüğe yazılır
+    known: önceden bilinen çiftler (n×n, negatif = bilinmiyor; ör. gece matrisi); shared_pairs olarak sayılır
     Returns: Mesafe matrisi (metre cinsinden)
     """
     if not osrm_url:
         osrm_url = os.environ.get('OSRM_URL', 'https://router.project-osrm.org')
-    
-    try:
-        # Koordinatları OSRM formatına çevir: lng,lat
-        coords_str = ';'.join([f"{loc[1]},{loc[0]}" for loc in locations])
-        url = f"{osrm_url}/table/v1/driving/{coords_str}?annotations=distance"
-        
-        print(f"[OR-Tools] OSRM Table API çağrılıyor: {len(locations)} nokta")
-        print(f"[OR-Tools] OSRM URL: {osrm_url}")
-        
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data.get('code') != 'Ok':
-            raise Exception(f"OSRM error: {data.get('code')}")
-        
-        # OSRM distance matrix'i döndür (zaten metre cinsinden)
-        distance_matrix = data['distances']
+    if stats is None:
+        stats = {}
+
+    n = len(locations)
+    cache = get_matrix_cache()
+    if cache is not None:
+        matrix = cache.lookup(osrm_url, locations)
+    else:
+        matrix = [[None] * n for _ in range(n)]
+
+    shared_pairs = 0
+    if known is not None:
+        for i, known_row in enumerate(known.tolist()):
+            matrix[i] = [k if k >= 0 else d for k, d in zip(known_row, matrix[i])]
+        shared_pairs = int((known >= 0).sum())
+
+    cached_pairs = sum(1 for row in matrix for d in row if d is not None)
+    print(f"[OR-Tools] Mesafe önbelleği: {cached_pairs}/{n * n} çift bulundu")
+    stats.update({"pairs": n * n, "cache_hits": cached_pairs - shared_pairs, "osrm_pairs": 0, "fallback_pairs": 0,
+                  "osrm_tiles": 0, "osrm_failed_tiles": 0})
+    if known is not None:
+        stats["shared_pairs"] = shared_pairs
+
+    if cached_pairs == n * n:
+        print(f"[OR-Tools] ✓ Mesafe matrisi tamamen önbellekten geldi")
+        return matrix
+
+    print(f"[OR-Tools] OSRM Table API çağrılıyor: {len(locations)} nokta")
+    print(f"[OR-Tools] OSRM URL: {osrm_url}")
+
+    # 1. adım: hiç bilinmeyen noktaların satırları (yeni konum -> tüm konumlar)
+    if fetch_indices is not None:
+        new_rows = [i for i in sorted(set(fetch_indices)) if any(d is None for d in matrix[i])]
+    else:
+        new_rows = [i for i in range(n) if all(d is None for d in matrix[i])]
+    new_row_set = set(new_rows)
+    # 2. adım: kalan eksik çiftler (bilinen satırlardaki yeni sütunlar)
+    known_missing_rows = [i for i in range(n) if i not in new_row_set and any(d is None for d in matrix[i])]
+    if fetch_indices is not None:
+        fetch_cols = sorted(set(fetch_indices))
+        known_missing_rows = [i for i in known_missing_rows if any(matrix[i][j] is None for j in fetch_cols)]
+
+    blocks = []
+    if new_rows:
+        blocks.append((new_rows, list(range(n))))
+    if known_missing_rows:
+        candidate_cols = fetch_cols if fetch_indices is not None else range(n)
+        missing_cols = sorted({j for i in known_missing_rows for j in candidate_cols if matrix[i][j] is None})
+        blocks.append((known_missing_rows, missing_cols))
+
+    for sources, destinations in blocks:
+        sub = fetch_table(locations, osrm_url, sources, destinations, stats=stats)
+        for si, i in enumerate(sources):
+            row = matrix[i]
+            for dj, j in enumerate(destinations):
+                row[j] = sub[si][dj]
+        if cache is not None:
+            cache.store(osrm_url, locations, sources, destinations, sub)
+
+    missing_pairs = sum(1 for row in matrix for d in row if d is None)
+    stats["fallback_pairs"] = missing_pairs
+    stats["osrm_pairs"] = n * n - cached_pairs - missing_pairs
+    if missing_pairs == 0:
         print(f"[OR-Tools] ✓ OSRM Table API başarılı - Gerçek yol mesafesi kullanılıyor")
-        return [[int(d) for d in row] for row in distance_matrix]
-        
-    except Exception as e:
-        print(f"[OR-Tools] ✗ OSRM Table API hatası: {str(e)}")
-        print(f"[OR-Tools] → Fallback: Haversine (kuş uçuşu) mesafe kullanılıyor")
-        
-        # Fallback: Haversine ile hesapla
-        matrix = []
-        for i, loc1 in enumerate(locations):
-            row = []
-            for j, loc2 in enumerate(locations):
-                if i == j:
-                    row.append(0)
-                else:
-                    dist = haversine_distance(loc1[0], loc1[1], loc2[0], loc2[1])
-                    row.append(int(dist * 1000))  # km'den metreye
-            matrix.append(row)
         return matrix
 
+    print(f"[OR-Tools] ✗ OSRM {missing_pairs}/{n * n} çift için mesafe döndüremedi")
+    print(f"[OR-Tools] → Fallback: bu çiftler için Haversine (kuş uçuşu) mesafe kullanılıyor")
+
+    # Fallback: eksik kalan çiftleri Haversine ile doldur
+    fallback = haversine_matrix(locations)
+    if missing_pairs == n * n:
+        return fallback.tolist()
+    for i in range(n):
+        row = matrix[i]
+        for j in range(n):
+            if row[j] is None:
+                row[j] = int(fallback[i, j])
+    return matrix
+
+def _distance_matrix(locations, osrm_url: str, stats: dict, shared_matrix=None):
+    """
+    Çözüm matrisi: önce shared_matrix (LocationMatrix; verilmezse ilk konumu (depo) içeren gece
+    matrisi, VRP_PRECOMPUTED_MATRIX_DIR), eksik kalan satır/sütunlar önbellek + OSRM
+    locations: n×2 (lat, lng) dizisi ya da tuple listesi
+    Returns: (mesafe matrisi, süre matrisi (saniye, bilinmeyen -1) ya da None)
+    """
+    if shared_matrix is None:
+        shared_matrix = precomputed_matrix_for(locations[0], osrm_url)
+    durations = None
+    if shared_matrix is not None:
+        durations = shared_matrix.lookup_durations(locations)
+        if durations is not None:
+            stats["duration_pairs"] = int((durations >= 0).sum())
+        known = shared_matrix.lookup(locations)
+        n = len(locations)
+        # Eksik noktalar: matriste olmayan konumlar + kapsanan konumlar arasında bilinmeyen çifti olanlar
+        covered = known.diagonal() >= 0
+        missing = np.nonzero(~covered | (known[:, covered] < 0).any(axis=1))[0]
+        if not len(missing):
+            stats.update({"pairs": n * n, "cache_hits": 0, "osrm_pairs": 0, "fallback_pairs": 0,
+                          "osrm_tiles": 0, "osrm_failed_tiles": 0, "shared_pairs": n * n})
+            print(f"[OR-Tools] ✓ Mesafe matrisi paylaşılan matristen alındı ({n} nokta)")
+            return known, durations
+        if len(missing) < n:
+            print(f"[OR-Tools] Paylaşılan matris {n - len(missing)}/{n} noktayı kapsıyor, eksikler OSRM'den")
+            return get_osrm_distance_matrix(locations, osrm_url, fetch_indices=missing.tolist(), stats=stats,
+                                            known=known), durations
+        print(f"[OR-Tools] Paylaşılan matris konumları kapsamıyor, OSRM kullanılıyor")
+    return get_osrm_distance_matrix(locations, osrm_url, stats=stats), None
+
+def _clamp_distance_matrix(distance_matrix: List[List[int]]) -> np.ndarray:
+    """Negatif mesafeleri 0'a, 20,000 km üzerini 20,000 km'ye sabitle"""
+    return np.clip(np.asarray(distance_matrix, dtype=np.int64), 0, 20000000)
+
+def _build_time_matrix(distance_matrix: np.ndarray, service_minutes: List[int],
+                       durations: np.ndarray = None) -> np.ndarray:
+    """
+    Time dimension transit matrisi (dakika)
+    Seyahat süresi + varış noktasının servis süresi (depolarda 0)
+    durations: önceden hesaplanmış OSRM süreleri (saniye, bilinmeyen -1); bilinen çiftlerde
+    kullanılır, diğerleri 60 km/h ortalama hızla mesafeden hesaplanır
+    """
+    # Formula: (distance_km / speed_kmh) * 60 minutes = travel time in minutes
+    travel_minutes = (distance_matrix / 1000.0 / 60.0) * 60.0
+    if durations is not None:
+        durations = np.asarray(durations)
+        travel_minutes = np.where(durations >= 0, durations / 60.0, travel_minutes)
+    return (travel_minutes + np.asarray(service_minutes, dtype=np.float64)[None, :]).astype(np.int64)
+
+def _knn_neighbors(distance_matrix: np.ndarray, first_customer: int, k: int) -> np.ndarray:
+    """
+    Müşteri düğümleri için izin verilen arklar (bool matris, müşteri × müşteri)
+    i -> j, j i'nin en yakın k komşusundaysa ya da i j'ninkindeyse açık kalır (simetrik)
+    Komşular koordinat yerine zaten hesaplanmış yol mesafesi matrisinden seçilir.
+    """
+    customer_distances = distance_matrix[first_customer:, first_customer:].astype(np.float64)
+    num_customers = len(customer_distances)
+    np.fill_diagonal(customer_distances, np.inf)
+    nearest = np.argpartition(customer_distances, k - 1, axis=1)[:, :k]
+    allowed = np.zeros((num_customers, num_customers), dtype=bool)
+    allowed[np.arange(num_customers)[:, None], nearest] = True
+    return allowed | allowed.T
+
+def _apply_knn_pruning(routing, manager, search_parameters, distance_matrix: np.ndarray,
+                       first_customer: int, k: int) -> dict:
+    """
+    Müşteriler arası arkları k en yakın komşuya indir (depo arkları her zaman açık)
+    Yerel arama ve ilk çözüm operatörleri de aynı komşulukla sınırlandırılır.
+    Model kapanmadan (CloseModelWithParameters / Solve) önce çağrılmalı.
+    """
+    num_customers = len(distance_matrix) - first_customer
+    if not k or k >= num_customers - 1:
+        return {"k": k, "applied": False}
+    
+    allowed = _knn_neighbors(distance_matrix, first_customer, k)
+    customer_indices = np.array([manager.NodeToIndex(node) for node in range(first_customer, len(distance_matrix))])
+    for i in range(num_customers):
+        pruned = customer_indices[~allowed[i]]
+        routing.NextVar(int(customer_indices[i])).RemoveValues([int(index) for index in pruned if index != customer_indices[i]])
+    
+    neighbors_ratio = min(1.0, (k + 1) / num_customers)
+    search_parameters.ls_operator_neighbors_ratio = neighbors_ratio
+    search_parameters.ls_operator_min_neighbors = k
+    search_parameters.cheapest_insertion_first_solution_neighbors_ratio = neighbors_ratio
+    search_parameters.cheapest_insertion_first_solution_min_neighbors = k
+    
+    arcs_kept = int(allowed.sum())
+    arcs_total = num_customers * (num_customers - 1)
+    print(f"[OR-Tools] KNN arc pruning: k={k}, {arcs_kept}/{arcs_total} customer arcs kept "
+          f"({arcs_kept / arcs_total:.1%})")
+    return {"k": k, "applied": True, "arcs_kept": arcs_kept, "arcs_total": arcs_total}
+
+def _set_search_strategy(search_parameters, first_solution_strategy: str, local_search_metaheuristic: str) -> str:
+    """Başlangıç stratejisi ve metasezgiseli isimle ayarla; "STRATEJİ/METASEZGİSEL" etiketini döndür"""
+    search_parameters.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy
+    )
+    search_parameters.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic
+    )
+    return f"{first_solution_strategy}/{local_search_metaheuristic}"
+
 def time_to_minutes(time_str: str) -> int:
     """Convert HH:MM time string to minutes from start of day"""
     if not time_str:
@@ -123,30 +477,74 @@ def parse_time_constraint(constraint: str) -> tuple:
     
     return (0, 24 * 60)
 
-def optimize_routes(depots: list, customers: list, vehicles: list, fuel_price: float = 47.50) -> dict:
-    """Multi-depot VRP optimizer"""
-    # Group customers by depot
-    customers_by_depot = {}
+def optimize_routes(depots: list, customers: list, vehicles: list, fuel_price: float = 47.50,
+                    osrm_url: str = None, cancel_event=None, time_limit_seconds: int = None,
+                    max_workers: int = None, plateau_window_seconds: float = None,
+                    plateau_min_improvement: float = None, initial_routes=None,
+                    stop_event=None, progress_callback=None, decomposition_threshold: int = None,
+                    cluster_method: str = None, multi_depot_mode: str = None, knn_k: int = None,
+                    depot_assignment: str = None, portfolio_size: int = None, shared_matrix=None,
+                    plan_callback=None) -> dict:
+    """Multi-depot VRP optimizer
+
+    cancel_event: is_set() metodu olan nesne (ör. threading.Event); set edildiğinde
+    arama bir sonraki çözümde durdurulur ve OptimizationCancelled fırlatılır.
+    time_limit_seconds: depo başına çözüm süresi (varsayılan VRP_TIME_LIMIT_SECONDS)
+    max_workers: paralel depo çözümü için süreç sayısı (varsayılan VRP_DEPOT_WORKERS)
+    plateau_window_seconds / plateau_min_improvement: erken durdurma penceresi ve göreli
+    iyileşme eşiği (varsayılan VRP_PLATEAU_WINDOW_SECONDS / VRP_PLATEAU_MIN_IMPROVEMENT)
+    initial_routes: önceki plan ({vehicle_id: [customer_id, ...]} ya da bu fonksiyonun "routes"
+    çıktısı); verilirse arama bu plandan başlar (warm start)
+    stop_event: set edildiğinde arama bitirilir ve o ana kadarki en iyi çözüm döner
+    progress_callback: iyileşen her çözümde (en fazla PROGRESS_MIN_INTERVAL_SECONDS'de bir)
+    {"depot_id", "strategy", "objective", "vehicles_used", "total_km", "elapsed_s", "solutions"} ile çağrılır
+    decomposition_threshold / cluster_method: bu sayıdan fazla müşterisi olan depolar kümelere
+    bölünerek çözülür (varsayılan VRP_DECOMPOSITION_THRESHOLD / VRP_CLUSTER_METHOD, 0 = kapalı)
+    multi_depot_mode: per_depot | joint (varsayılan VRP_MULTI_DEPOT_MODE); joint modda müşterisi olan
+    tüm depolar tek aramada çözülür, time_limit_seconds bu tek aramanın süresidir
+    knn_k: müşteri başına açık bırakılan en yakın komşu arkı (varsayılan VRP_KNN_K, 0 = budama yok)
+    depot_assignment: depot_id'si olmayan müşteriler için haversine | road (varsayılan VRP_DEPOT_ASSIGNMENT)
+    portfolio_size: görev başına paralel yarışan strateji sayısı (varsayılan VRP_PORTFOLIO_SIZE, 0/1 = kapalı);
+    kazanan strateji summary.search[].portfolio.winner'da
+    shared_matrix: önceden kurulmuş LocationMatrix; çözümün konumlarını kapsıyorsa OSRM çağrılmaz
+    (ör. /optimize/batch senaryoları aynı matrisi paylaşır)
+    plan_callback: görevler belli olunca aramadan önce bir kez {"tasks", "workers", "search_budget_s"} ile
+    çağrılır; search_budget_s depo/küme turları, portföy ve sınır onarımı dahil en kötü arama süresidir
+    (ör. solver_pool duvar saati sınırını buna göre ayarlar)
+    """
+    multi_depot_mode = multi_depot_mode or DEFAULT_MULTI_DEPOT_MODE
+    if multi_depot_mode not in MULTI_DEPOT_MODES:
+        raise ValueError(f"Unknown multi-depot mode: {multi_depot_mode} (expected one of {', '.join(MULTI_DEPOT_MODES)})")
+    request_start = time.perf_counter()
+    phase_start = request_start
+    timings = {"validation_s": 0.0, "grouping_s": 0.0}
+    
+    # Group customers by depot (sıralarıyla; koordinat sütunları gruplara taşınır)
+    customer_indices_by_depot = {}
     for depot in depots:
-        customers_by_depot[depot["id"]] = []
+        customer_indices_by_depot[depot["id"]] = []
     
     print(f"[OR-Tools] ========== MULTI-DEPOT GROUPING DEBUG ==========")
     print(f"[OR-Tools] Total customers to group: {len(customers)}")
     
-    # Assign each customer to their assigned depot
-    for customer in customers:
-        depot_id = customer.get("depot_id")
-        print(f"[OR-Tools] Customer {customer.get('id')} ({customer.get('name')}): depot_id={depot_id}")
-        if depot_id and depot_id in customers_by_depot:
-            customers_by_depot[depot_id].append(customer)
-        else:
-            # Fallback: assign to first depot if no depot_id
-            print(f"[OR-Tools] WARNING: Customer {customer.get('id')} has no depot_id, assigning to first depot")
-            customers_by_depot[depots[0]["id"]].append(customer)
+    # Assign each customer to their assigned depot; customers without a (known) depot_id
+    # go to the nearest depot (haversine or cached road distance)
+    assignment_stats = {}
+    customer_depots = assign_depots(customers, depots, depot_assignment, osrm_url, stats=assignment_stats)
+    for i, depot_id in enumerate(customer_depots):
+        customer_indices_by_depot[depot_id].append(i)
+    customers_by_depot = {
+        depot_id: take_customers(customers, indices) for depot_id, indices in customer_indices_by_depot.items()
+    }
+    if assignment_stats["assigned"]:
+        print(f"[OR-Tools] {assignment_stats['assigned']} customers without depot_id assigned to nearest depot "
+              f"({assignment_stats['method']}, {assignment_stats['elapsed_ms']} ms)")
     
     print(f"[OR-Tools] Customers grouped by depot:")
     for depot_id, depot_custs in customers_by_depot.items():
         print(f"[OR-Tools]   {depot_id}: {len(depot_custs)} customers")
+    timings["grouping_s"] += time.perf_counter() - phase_start
+    phase_start = time.perf_counter()
     
     # Calculate total demand per depot
     depot_demands = {}
@@ -164,9 +562,11 @@ def optimize_routes(depots: list, customers: list, vehicles: list, fuel_price: f
     
     if total_demand > total_capacity:
         raise ValueError(f"Insufficient capacity: {total_demand} > {total_capacity}")
+    timings["validation_s"] += time.perf_counter() - phase_start
+    phase_start = time.perf_counter()
     
-    # Optimize each depot separately
-    all_routes = []
+    # Assign vehicles to each depot based on demand proportion
+    depot_tasks = []
     vehicle_offset = 0
     
     for depot in depots:
@@ -191,29 +591,579 @@ def optimize_routes(depots: list, customers: list, vehicles: list, fuel_price: f
         
         depot_vehicles = vehicles[vehicle_offset:vehicle_offset + vehicles_for_depot]
         
-        print(f"[OR-Tools] Optimizing depot {depot['id']}: {len(depot_customers)} customers, {depot_demand} pallets, {len(depot_vehicles)} vehicles")
-        
-        # Optimize this depot
-        depot_result = _optimize_single_depot(depot, depots, depot_customers, depot_vehicles, fuel_price)
+        print(f"[OR-Tools] Depot {depot['id']}: {len(depot_customers)} customers, {depot_demand} pallets, {len(depot_vehicles)} vehicles")
         
-        # Add depot routes to all routes
-        all_routes.extend(depot_result["routes"])
+        depot_tasks.append((depot, depot_customers, depot_vehicles))
         vehicle_offset += vehicles_for_depot
+    timings["grouping_s"] += time.perf_counter() - phase_start
+    
+    # Depolar birbirinden bağımsız: birden fazla depo varsa ayrı süreçlerde paralel çöz
+    solve_kwargs = {
+        "osrm_url": osrm_url,
+        "time_limit_seconds": time_limit_seconds or DEFAULT_TIME_LIMIT_SECONDS,
+        "plateau_window_seconds": (
+            DEFAULT_PLATEAU_WINDOW_SECONDS if plateau_window_seconds is None else plateau_window_seconds
+        ),
+        "plateau_min_improvement": (
+            DEFAULT_PLATEAU_MIN_IMPROVEMENT if plateau_min_improvement is None else plateau_min_improvement
+        ),
+        "initial_routes": _normalize_initial_routes(initial_routes),
+        "knn_k": DEFAULT_KNN_K if knn_k is None else knn_k,
+        "shared_matrix": shared_matrix,
+    }
+    if portfolio_size is None:
+        portfolio_size = DEFAULT_PORTFOLIO_SIZE
+    
+    if multi_depot_mode == "joint" and len(depot_tasks) > 1:
+        # Tek model: müşterisi olan tüm depolar, bütün filo; araç depoları talebe göre atanır
+        joint_depots = [depot for depot, _, _ in depot_tasks]
+        joint_customers = take_customers(customers, [
+            i for depot in joint_depots for i in customer_indices_by_depot[depot["id"]]
+        ])
+        vehicle_depots = _assign_vehicle_depots(vehicles, joint_depots, [depot_demands[d["id"]] for d in joint_depots])
+        print(f"[OR-Tools] Joint multi-depot solve: {len(joint_depots)} depots, {len(joint_customers)} customers, "
+              f"{len(vehicles)} vehicles")
+        if cancel_event is not None and cancel_event.is_set():
+            raise OptimizationCancelled("Optimization cancelled")
+        tasks = [(None, joint_customers, vehicles)]
+        task_clusters = [None]
+        workers = max_workers or DEFAULT_DEPOT_WORKERS
+        if plan_callback is not None:
+            plan_callback(_search_plan(tasks, workers, solve_kwargs["time_limit_seconds"], portfolio_size))
+        task_results = _solve_tasks(
+            tasks, joint_depots, fuel_price, {**solve_kwargs, "vehicle_depots": vehicle_depots},
+            workers, cancel_event, stop_event, progress_callback, portfolio_size
+        )
+        decomposition = {}
+    else:
+        tasks, task_clusters, task_results, decomposition = _solve_per_depot(
+            depot_tasks, depots, fuel_price, solve_kwargs, max_workers, decomposition_threshold,
+            cluster_method, cancel_event, stop_event, progress_callback, portfolio_size, plan_callback
+        )
+    
+    # Merge depot routes in depot order
+    all_routes = []
+    search_stats = []
+    for (depot, _, _), cluster_index, depot_result in zip(tasks, task_clusters, task_results):
+        all_routes.extend(depot_result["routes"])
+        task_stats = {"depot_id": depot["id"] if depot is not None else None}
+        if cluster_index is not None:
+            task_stats["cluster"] = cluster_index
+        search_stats.append({**task_stats, **depot_result["summary"]["search"]})
     
     # Calculate summary statistics
     total_distance = sum(route["distance_km"] for route in all_routes)
     
+    # Faz süreleri: depo fazları toplanır (paralel çözümde toplam, total_s'yi aşabilir)
+    for stats in search_stats:
+        for phase, seconds in stats.get("timings", {}).items():
+            timings[phase] = timings.get(phase, 0.0) + seconds
+    timings["total_s"] = time.perf_counter() - request_start
+    
+    matrix_summary = {}
+    for stats in search_stats:
+        for key, value in stats.get("matrix", {}).items():
+            matrix_summary[key] = matrix_summary.get(key, 0) + value
+    if matrix_summary.get("pairs"):
+        matrix_summary["cache_hit_ratio"] = round(matrix_summary["cache_hits"] / matrix_summary["pairs"], 4)
+    
     return {
         "routes": all_routes,
         "summary": {
             "total_routes": len(all_routes),
             "total_distance_km": round(total_distance, 2),
             "total_vehicles_used": len(all_routes),
-            "algorithm": "OR-Tools"
+            "algorithm": "OR-Tools",
+            "multi_depot_mode": multi_depot_mode,
+            "depot_assignment": assignment_stats,  # Customers without depot_id: method, assigned, elapsed_ms
+            "timings": {phase: round(seconds, 3) for phase, seconds in timings.items()},
+            "matrix": matrix_summary,  # Pairs from cache / OSRM / Haversine fallback, OSRM tiles
+            "decomposition": decomposition,  # Per decomposed depot: method, clusters, boundary repair
+            "search": search_stats  # Per depot (or cluster): strategy, stop_reason, best_solution_time_s, portfolio
         }
     }
 
-def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: list, vehicles: list, fuel_price: float) -> dict:
+def _solve_per_depot(depot_tasks: list, depots: list, fuel_price: float, solve_kwargs: dict, max_workers: int,
+                     decomposition_threshold: int, cluster_method: str, cancel_event=None, stop_event=None,
+                     progress_callback=None, portfolio_size: int = 0, plan_callback=None):
+    """
+    per_depot modu: her depo (ya da büyük depoların kümeleri) ayrı çözülür
+    Returns: (görevler, görev başına küme sırası, sonuçlar, decomposition özeti)
+    """
+    # Büyük depoları kümelere böl: her küme ayrı bir çözüm görevi olur
+    if decomposition_threshold is None:
+        decomposition_threshold = DEFAULT_DECOMPOSITION_THRESHOLD
+    cluster_method = cluster_method or DEFAULT_CLUSTER_METHOD
+    tasks = []
+    task_clusters = []  # Görev başına küme sırası (bölünmemiş depo için None)
+    decomposition = {}
+    for depot, depot_customers, depot_vehicles in depot_tasks:
+        if decomposition_threshold and len(depot_customers) > decomposition_threshold:
+            clusters = _cluster_customers(depot, depot_customers, DEFAULT_CLUSTER_SIZE, cluster_method)
+            fleets = _split_fleet(depot_vehicles, [sum(c.get("demand_pallets", 0) for c in cluster)
+                                                   for cluster in clusters])
+            print(f"[OR-Tools] Depot {depot['id']}: {len(depot_customers)} customers > {decomposition_threshold}, "
+                  f"decomposed into {len(clusters)} {cluster_method} clusters")
+            decomposition[depot["id"]] = {"method": cluster_method, "clusters": len(clusters)}
+            for cluster_index, (cluster, fleet) in enumerate(zip(clusters, fleets)):
+                tasks.append((depot, cluster, fleet))
+                task_clusters.append(cluster_index)
+        else:
+            tasks.append((depot, depot_customers, depot_vehicles))
+            task_clusters.append(None)
+    
+    workers = max_workers or DEFAULT_DEPOT_WORKERS
+    if plan_callback is not None:
+        plan = _search_plan(tasks, workers, solve_kwargs["time_limit_seconds"], portfolio_size)
+        # Sınır onarımı: depo başına komşu küme turları, her tur kısa bir _solve_tasks
+        repair_seconds = min(DEFAULT_BOUNDARY_REPAIR_SECONDS, solve_kwargs["time_limit_seconds"])
+        for depot_id in decomposition if repair_seconds > 0 else ():
+            cluster_tasks = [task for task in tasks if task[0]["id"] == depot_id]
+            for pairs in _cluster_neighbour_rounds(cluster_tasks):
+                repair_plan = _search_plan(pairs, min(workers, len(pairs)), repair_seconds, 0)
+                plan["search_budget_s"] += repair_plan["search_budget_s"]
+        plan_callback(plan)
+    task_results = _solve_tasks(tasks, depots, fuel_price, solve_kwargs, workers,
+                                cancel_event, stop_event, progress_callback, portfolio_size)
+    
+    # Komşu kümeler arasında sınır onarımı (kısa, önceki çözümden başlayan arama)
+    for depot_id, info in decomposition.items():
+        if stop_event is not None and stop_event.is_set():
+            break
+        positions = [i for i, (depot, _, _) in enumerate(tasks) if depot["id"] == depot_id]
+        repaired, repair_stats = _repair_cluster_boundaries(
+            [tasks[i] for i in positions], [task_results[i] for i in positions], depots, fuel_price,
+            solve_kwargs, max_workers or DEFAULT_DEPOT_WORKERS, cancel_event, stop_event
+        )
+        for i, (task, result) in zip(positions, repaired):
+            tasks[i] = task
+            task_results[i] = result
+        info.update(repair_stats)
+    
+    return tasks, task_clusters, task_results, decomposition
+
+def _normalize_initial_routes(initial_routes) -> dict:
+    """{vehicle_id: [customer_id, ...]} ya da /optimize "routes" çıktısı -> {str: [str, ...]}"""
+    if not initial_routes:
+        return None
+    if isinstance(initial_routes, dict):
+        return {str(vehicle_id): [str(c) for c in customer_ids] for vehicle_id, customer_ids in initial_routes.items()}
+    return {
+        str(route["vehicle_id"]): [str(stop["customer_id"]) for stop in route.get("stops", [])]
+        for route in initial_routes
+    }
+
+def _build_initial_assignment(routing, manager, search_parameters, initial_routes: dict, vehicles: list,
+                              node_customer_ids: list, distance_matrix, time_matrix, demands: list,
+                              vehicle_capacities: list, route_depots: list = None):
+    """
+    Önceki plandan başlangıç çözümü (ReadAssignmentFromRoutes)
+    Planda olmayan / kapasiteyi aşan müşteriler en ucuz uygun noktaya eklenir.
+    Plan kullanılamıyorsa None döner (normal ilk çözüm stratejisine düşülür).
+    route_depots: araç başına depo düğümü (joint multi-depot; verilmezse hepsi 0)
+    """
+    node_by_customer = {
+        customer_id: node for node, customer_id in enumerate(node_customer_ids) if customer_id is not None
+    }
+    
+    seen = set()
+    routes = []
+    for vehicle_id, vehicle in enumerate(vehicles):
+        route = []
+        for customer_id in initial_routes.get(str(vehicle["id"]), []):
+            node = node_by_customer.get(customer_id)
+            if node is not None and node not in seen:
+                route.append(node)
+                seen.add(node)
+        # Talep değiştiyse kapasiteye sığana kadar sondan çıkar (yeniden eklenecek)
+        while route and route_load(route, demands) > vehicle_capacities[vehicle_id]:
+            seen.discard(route.pop())
+        routes.append(route)
+    
+    if not seen:
+        print(f"[OR-Tools] Warm start: previous plan has no customers of this depot, using first solution strategy")
+        return None
+    
+    missing = [node for node in node_by_customer.values() if node not in seen]
+    routes, unplaced = cheapest_insertion(
+        routes, missing, distance_matrix, demands, vehicle_capacities,
+        time_matrix=time_matrix, max_route_minutes=1440, fixed_vehicle_cost=10000,
+        route_depots=route_depots
+    )
+    print(f"[OR-Tools] Warm start: {len(seen)} customers from previous plan, {len(missing) - len(unplaced)} inserted")
+    if unplaced:
+        print(f"[OR-Tools] Warm start: {len(unplaced)} customers could not be inserted, using first solution strategy")
+        return None
+    
+    routing.CloseModelWithParameters(search_parameters)
+    assignment = routing.ReadAssignmentFromRoutes(
+        [[manager.NodeToIndex(node) for node in route] for route in routes], True
+    )
+    if assignment is None:
+        print(f"[OR-Tools] Warm start: previous plan is infeasible for this model, using first solution strategy")
+    return assignment
+
+def _solve_task(depot: dict, all_depots: list, customers: list, vehicles: list, fuel_price: float,
+                **solve_kwargs) -> dict:
+    """Tek görev: depo verilmişse tek depolu çözüm, depo None ise all_depots üzerinde joint çözüm"""
+    if depot is None:
+        return _optimize_multi_depot(all_depots, customers, vehicles, fuel_price, **solve_kwargs)
+    return _optimize_single_depot(depot, all_depots, customers, vehicles, fuel_price, **solve_kwargs)
+
+def _solve_depot_task(depot: dict, all_depots: list, customers: list, vehicles: list, fuel_price: float,
+                      solve_kwargs: dict, cancel_event=None, stop_event=None, progress_queue=None) -> dict:
+    """Process pool entry point: tek bir görevin çözümü (alt süreçte çalışır)"""
+    progress_callback = progress_queue.put if progress_queue is not None else None
+    return _solve_task(depot, all_depots, customers, vehicles, fuel_price,
+                       cancel_event=cancel_event, stop_event=stop_event,
+                       progress_callback=progress_callback, **solve_kwargs)
+
+def _solve_depots_in_pool(depot_tasks: list, all_depots: list, fuel_price: float, solve_kwargs: dict,
+                          workers: int, cancel_event=None, stop_event=None, progress_callback=None,
+                          task_kwargs: list = None, return_exceptions: bool = False) -> list:
+    """
+    Görevleri ayrı süreçlerde paralel çöz; sonuçları görev sırasıyla döndür
+    task_kwargs: görev başına solve_kwargs üzerine yazılan ayarlar (ör. portföy stratejisi)
+    return_exceptions: True ise başarısız görevin hatası sonuç yerine döner, diğerleri sürer (iptal hariç)
+    """
+    print(f"[OR-Tools] Solving {len(depot_tasks)} tasks in parallel with {workers} worker processes")
+    
+    # spawn: uvicorn thread'leri varken fork güvenli değil
+    mp_context = multiprocessing.get_context("spawn")
+    
+    # İptal/durdurma sinyallerini alt süreçlere, ilerleme olaylarını ana sürece taşımak için
+    # paylaşılan Event/Queue nesneleri
+    needs_manager = cancel_event is not None or stop_event is not None or progress_callback is not None
+    manager = mp_context.Manager() if needs_manager else None
+    shared_cancel = manager.Event() if cancel_event is not None else None
+    shared_stop = manager.Event() if stop_event is not None else None
+    progress_queue = manager.Queue() if progress_callback is not None else None
+    
+    def drain_progress():
+        while progress_queue is not None and not progress_queue.empty():
+            progress_callback(progress_queue.get())
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            futures = [
+                executor.submit(_solve_depot_task, depot, all_depots, depot_customers, depot_vehicles,
+                                fuel_price, {**solve_kwargs, **(task_kwargs[i] if task_kwargs else {})},
+                                shared_cancel, shared_stop, progress_queue)
+                for i, (depot, depot_customers, depot_vehicles) in enumerate(depot_tasks)
+            ]
+            
+            def failed(future):
+                error = future.exception()
+                return error is not None and (not return_exceptions or isinstance(error, OptimizationCancelled))
+            
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+                drain_progress()
+                
+                for future in done:
+                    if failed(future):
+                        if shared_cancel is not None:
+                            shared_cancel.set()
+                        for other in pending:
+                            other.cancel()
+                        raise future.exception()
+                
+                if cancel_event is not None and cancel_event.is_set():
+                    shared_cancel.set()
+                    for other in pending:
+                        other.cancel()
+                if stop_event is not None and stop_event.is_set():
+                    shared_stop.set()
+            
+            drain_progress()
+            if return_exceptions:
+                return [future.exception() or future.result() for future in futures]
+            return [future.result() for future in futures]
+    finally:
+        if manager is not None:
+            manager.shutdown()
+
+def _search_plan(tasks: list, workers: int, time_limit_seconds: float, portfolio_size: int = 0) -> dict:
+    """
+    _solve_tasks'ın en kötü arama süresi: portföyde adaylar tek turda paralel, değilse
+    görevler min(workers, görev) süreçte ⌈görev / süreç⌉ tur (workers == 1: sırayla)
+    """
+    candidates = min(portfolio_size or 0, len(PORTFOLIO_CONFIGS), workers // max(len(tasks), 1))
+    if candidates > 1:
+        rounds = 1
+    else:
+        rounds = math.ceil(len(tasks) / max(1, min(workers, len(tasks))))
+    return {"tasks": len(tasks), "workers": workers, "search_budget_s": rounds * time_limit_seconds}
+
+def _solve_tasks(tasks: list, all_depots: list, fuel_price: float, solve_kwargs: dict, workers: int,
+                 cancel_event=None, stop_event=None, progress_callback=None, portfolio_size: int = 0) -> list:
+    """
+    (depo, müşteriler, araçlar) görevlerini çöz: workers > 1 ise süreç havuzunda, değilse sırayla
+    Depo None olan görev all_depots üzerinde joint çözülür.
+    portfolio_size > 1: her görev için bu kadar strateji yarışır (boştaki çekirdek kadar)
+    """
+    # Portföy: adaylar aynı anda çalışmalı, yoksa süre bütçesi katlanır
+    candidates = min(portfolio_size or 0, len(PORTFOLIO_CONFIGS), workers // max(len(tasks), 1))
+    if portfolio_size and portfolio_size > 1 and candidates < portfolio_size:
+        print(f"[OR-Tools] Portfolio size {portfolio_size} reduced to {max(candidates, 1)} "
+              f"({workers} workers, {len(tasks)} tasks)")
+    if candidates > 1:
+        return _solve_portfolio(tasks, all_depots, fuel_price, solve_kwargs, workers, PORTFOLIO_CONFIGS[:candidates],
+                                cancel_event, stop_event, progress_callback)
+    
+    workers = min(workers, len(tasks))
+    if workers > 1:
+        return _solve_depots_in_pool(tasks, all_depots, fuel_price, solve_kwargs, workers,
+                                     cancel_event, stop_event, progress_callback)
+    
+    results = []
+    for depot, depot_customers, depot_vehicles in tasks:
+        if cancel_event is not None and cancel_event.is_set():
+            raise OptimizationCancelled("Optimization cancelled")
+        
+        print(f"[OR-Tools] Optimizing depot {depot['id'] if depot is not None else 'joint'} "
+              f"({len(depot_customers)} customers)")
+        results.append(_solve_task(
+            depot, all_depots, depot_customers, depot_vehicles, fuel_price,
+            cancel_event=cancel_event, stop_event=stop_event, progress_callback=progress_callback,
+            **solve_kwargs
+        ))
+    return results
+
+def _solve_portfolio(tasks: list, all_depots: list, fuel_price: float, solve_kwargs: dict, workers: int,
+                     configs: list, cancel_event=None, stop_event=None, progress_callback=None) -> list:
+    """
+    Her görevi configs'teki (başlangıç stratejisi, metasezgisel) çiftleriyle paralel çöz,
+    görev başına amaç değeri en düşük sonucu döndür; adayların özeti summary.search.portfolio'da
+    Başarısız adaylar atlanır; bir görevin tüm adayları başarısızsa ilk hata fırlatılır.
+    """
+    candidate_tasks = [task for task in tasks for _ in configs]
+    candidate_kwargs = [
+        {"first_solution_strategy": first_solution, "local_search_metaheuristic": metaheuristic}
+        for _ in tasks for first_solution, metaheuristic in configs
+    ]
+    print(f"[OR-Tools] Portfolio: {len(configs)} strategies racing per task "
+          f"({', '.join(f'{fs}/{mh}' for fs, mh in configs)})")
+    outcomes = _solve_depots_in_pool(candidate_tasks, all_depots, fuel_price, solve_kwargs,
+                                     min(workers, len(candidate_tasks)), cancel_event, stop_event,
+                                     progress_callback, task_kwargs=candidate_kwargs, return_exceptions=True)
+    
+    results = []
+    for t in range(len(tasks)):
+        task_outcomes = outcomes[t * len(configs):(t + 1) * len(configs)]
+        summary = []
+        best = None
+        for (first_solution, metaheuristic), outcome in zip(configs, task_outcomes):
+            strategy = f"{first_solution}/{metaheuristic}"
+            if isinstance(outcome, Exception):
+                summary.append({"strategy": strategy, "error": str(outcome)})
+                continue
+            search = outcome["summary"]["search"]
+            objective = search.get("objective")
+            summary.append({
+                "strategy": strategy,
+                "objective": objective,
+                "total_distance_km": outcome["summary"]["total_distance_km"],
+                "best_solution_time_s": search.get("best_solution_time_s"),
+                "stop_reason": search.get("stop_reason"),
+            })
+            if objective is not None and (best is None or objective < best[0]):
+                best = (objective, strategy, outcome)
+        if best is None:
+            raise next(outcome for outcome in task_outcomes if isinstance(outcome, Exception))
+        
+        _, winner, result = best
+        print(f"[OR-Tools] Portfolio winner for task {t}: {winner} (objective {best[0]})")
+        result["summary"]["search"]["portfolio"] = {"winner": winner, "candidates": summary}
+        results.append(result)
+    return results
+
+def _cluster_customers(depot: dict, customers: list, cluster_size: int, method: str = "sweep") -> List[list]:
+    """
+    Depo müşterilerini talebe göre dengeli coğrafi kümelere böl
+    sweep: depo etrafındaki açıya göre sırala, en büyük açısal boşluktan başlayarak eşit talepli dilimlere kes
+    kmeans: düzlemsel izdüşümde k-means, ardından kapasite dengeli atama (pişmanlık sırasıyla)
+    """
+    num_clusters = max(1, math.ceil(len(customers) / max(cluster_size, 1)))
+    if num_clusters == 1:
+        return [take_customers(customers, range(len(customers)))]
+    
+    depot_lat = depot["location"]["lat"]
+    depot_lng = depot["location"]["lng"]
+    # Eşit mesafeli düzlemsel izdüşüm (derece; boylam enlem kosinüsüyle ölçeklenir)
+    lat, lng = customer_coordinates(customers)
+    points = np.column_stack([(lng - depot_lng) * math.cos(math.radians(depot_lat)), lat - depot_lat])
+    demands = np.array([c.get("demand_pallets", 0) for c in customers], dtype=float)
+    target = demands.sum() / num_clusters
+    
+    if method == "kmeans":
+        rng = np.random.RandomState(0)
+        # k-means++ başlangıcı
+        centroids = [points[rng.randint(len(points))]]
+        for _ in range(1, num_clusters):
+            d2 = np.min(((points[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2), axis=1)
+            centroids.append(points[rng.choice(len(points), p=d2 / d2.sum())] if d2.sum() > 0 else points[rng.randint(len(points))])
+        centroids = np.array(centroids)
+        for _ in range(25):
+            labels = np.argmin(((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2), axis=1)
+            updated = np.array([
+                points[labels == k].mean(axis=0) if np.any(labels == k) else centroids[k]
+                for k in range(num_clusters)
+            ])
+            if np.allclose(updated, centroids):
+                break
+            centroids = updated
+        
+        # Kapasite dengeli atama: en yakın iki merkez arası farkı (pişmanlık) büyük olan önce seçer
+        distances = np.sqrt(((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+        order = np.argsort(distances, axis=1)
+        regret = distances[np.arange(len(points)), order[:, 1]] - distances[np.arange(len(points)), order[:, 0]]
+        limit = target * 1.1 + demands.max()
+        loads = np.zeros(num_clusters)
+        clusters = [[] for _ in range(num_clusters)]
+        for i in np.argsort(-regret):
+            cluster = next((k for k in order[i] if loads[k] + demands[i] <= limit), order[i][0])
+            loads[cluster] += demands[i]
+            clusters[cluster].append(i)
+        return [take_customers(customers, cluster) for cluster in clusters if cluster]
+    
+    # Sweep: açıya göre sırala, dilimler en büyük açısal boşlukta başlasın
+    angles = np.arctan2(points[:, 1], points[:, 0])
+    order = np.argsort(angles)
+    sorted_angles = angles[order]
+    gaps = np.diff(np.concatenate([sorted_angles, [sorted_angles[0] + 2 * math.pi]]))
+    start = (int(np.argmax(gaps)) + 1) % len(order)
+    order = np.concatenate([order[start:], order[:start]])
+    
+    clusters = [[]]
+    load = 0.0
+    for i in order:
+        if load + demands[i] > target and clusters[-1] and len(clusters) < num_clusters:
+            clusters.append([])
+            load = 0.0
+        clusters[-1].append(i)
+        load += demands[i]
+    return [take_customers(customers, cluster) for cluster in clusters]
+
+def _split_fleet(vehicles: list, cluster_demands: List[int]) -> List[list]:
+    """Araçları kümelere talep oranında kapasite düşecek şekilde dağıt (büyük araçlar önce)"""
+    total_demand = sum(cluster_demands) or 1
+    total_capacity = sum(v.get("capacity_pallets", 26) for v in vehicles)
+    targets = [total_capacity * demand / total_demand for demand in cluster_demands]
+    assigned = [0.0] * len(cluster_demands)
+    fleets = [[] for _ in cluster_demands]
+    for vehicle in sorted(vehicles, key=lambda v: -v.get("capacity_pallets", 26)):
+        # En çok kapasite açığı olan küme (oransal olarak) aracı alır
+        k = max(range(len(fleets)), key=lambda i: (targets[i] - assigned[i]) / max(targets[i], 1))
+        fleets[k].append(vehicle)
+        assigned[k] += vehicle.get("capacity_pallets", 26)
+    return fleets
+
+def _cluster_neighbour_rounds(tasks: list) -> List[List[tuple]]:
+    """
+    Komşu küme çiftleri, birbiriyle çakışmayan turlara ayrılmış (her tur paralel onarılabilir)
+    Komşuluk: küme merkezleri arası en yakın iki küme
+    """
+    centroids = np.array([
+        [np.mean([c["location"]["lat"] for c in customers]), np.mean([c["location"]["lng"] for c in customers])]
+        for _, customers, _ in tasks
+    ])
+    pairs = set()
+    for i in range(len(tasks)):
+        distances = np.sqrt(((centroids - centroids[i]) ** 2).sum(axis=1))
+        distances[i] = np.inf
+        for j in np.argsort(distances)[:2]:
+            if np.isfinite(distances[j]):
+                pairs.add((min(i, int(j)), max(i, int(j))))
+    
+    rounds = []
+    remaining = sorted(pairs)
+    while remaining:
+        used, current, rest = set(), [], []
+        for i, j in remaining:
+            if i in used or j in used:
+                rest.append((i, j))
+            else:
+                current.append((i, j))
+                used.update((i, j))
+        rounds.append(current)
+        remaining = rest
+    return rounds
+
+def _repair_cluster_boundaries(tasks: list, results: list, all_depots: list, fuel_price: float,
+                               solve_kwargs: dict, max_workers: int, cancel_event=None, stop_event=None):
+    """
+    Sınır onarımı: komşu iki kümenin müşterileri ve araçları birlikte, mevcut rotalardan başlayarak
+    kısa süre yeniden çözülür; toplam mesafe azalırsa yeni rotalar kabul edilir.
+    Araçlar kümelerinde kalır, müşteriler kümeler arasında yer değiştirebilir.
+    Returns: ([(görev, sonuç), ...], onarım istatistikleri)
+    """
+    tasks, results = list(tasks), list(results)
+    repair_seconds = min(DEFAULT_BOUNDARY_REPAIR_SECONDS, solve_kwargs["time_limit_seconds"])
+    stats = {"repair_pairs": 0, "repair_accepted": 0, "repair_saved_km": 0.0}
+    if len(tasks) < 2 or repair_seconds <= 0:
+        return list(zip(tasks, results)), stats
+    
+    def cluster_km(index):
+        return sum(route["distance_km"] for route in results[index]["routes"])
+    
+    for pairs in _cluster_neighbour_rounds(tasks):
+        if stop_event is not None and stop_event.is_set():
+            break
+        current_routes = {
+            str(route["vehicle_id"]): [str(stop["customer_id"]) for stop in route["stops"]]
+            for result in results for route in result["routes"]
+        }
+        repair_kwargs = {**solve_kwargs, "time_limit_seconds": repair_seconds, "initial_routes": current_routes}
+        repair_tasks = [
+            (tasks[i][0], tasks[i][1] + tasks[j][1], tasks[i][2] + tasks[j][2])
+            for i, j in pairs
+        ]
+        try:
+            repaired = _solve_tasks(repair_tasks, all_depots, fuel_price, repair_kwargs,
+                                    min(max_workers, len(repair_tasks)), cancel_event, stop_event)
+        except OptimizationCancelled:
+            raise
+        except Exception as e:
+            print(f"[OR-Tools] Boundary repair round failed, keeping cluster routes: {e}")
+            continue
+        
+        for (i, j), result in zip(pairs, repaired):
+            stats["repair_pairs"] += 1
+            before = cluster_km(i) + cluster_km(j)
+            after = sum(route["distance_km"] for route in result["routes"])
+            if after >= before:
+                continue
+            
+            # Rotaları araçlarına göre kümelere geri dağıt
+            customers_by_id = {str(c["id"]): c for c in tasks[i][1] + tasks[j][1]}
+            for k in (i, j):
+                vehicle_ids = {str(v["id"]) for v in tasks[k][2]}
+                routes = [route for route in result["routes"] if str(route["vehicle_id"]) in vehicle_ids]
+                customers = [customers_by_id[str(stop["customer_id"])] for route in routes for stop in route["stops"]]
+                tasks[k] = (tasks[k][0], customers, tasks[k][2])
+                results[k] = {
+                    "routes": routes,
+                    "summary": {**results[k]["summary"], "total_routes": len(routes),
+                                "total_distance_km": round(sum(r["distance_km"] for r in routes), 2),
+                                "total_vehicles_used": len(routes)}
+                }
+            stats["repair_accepted"] += 1
+            stats["repair_saved_km"] = round(stats["repair_saved_km"] + before - after, 2)
+            print(f"[OR-Tools] Boundary repair clusters {i}+{j}: {before:.1f} km -> {after:.1f} km")
+    
+    return list(zip(tasks, results)), stats
+
+def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: list, vehicles: list, fuel_price: float,
+                           osrm_url: str = None, cancel_event=None,
+                           time_limit_seconds: int = DEFAULT_TIME_LIMIT_SECONDS,
+                           plateau_window_seconds: float = DEFAULT_PLATEAU_WINDOW_SECONDS,
+                           plateau_min_improvement: float = DEFAULT_PLATEAU_MIN_IMPROVEMENT,
+                           initial_routes: dict = None, stop_event=None, progress_callback=None,
+                           knn_k: int = 0, first_solution_strategy: str = DEFAULT_FIRST_SOLUTION_STRATEGY,
+                           local_search_metaheuristic: str = DEFAULT_LOCAL_SEARCH_METAHEURISTIC,
+                           shared_matrix=None) -> dict:
     """Single depot optimization (stable fallback)"""
     try:
         total_distance = 0
@@ -232,23 +1182,27 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         if not (-90 <= depot_lat <= 90) or not (-180 <= depot_lng <= 180):
             raise ValueError(f"Invalid depot coordinates: lat={depot_lat}, lng={depot_lng}")
         
-        # Locations: depot + customers
-        locations = [(depot_lat, depot_lng)]
+        # Locations: depot + customers (n×2 dizi, müşteri koordinat sütunlarından)
+        lat, lng = customer_coordinates(customers)
+        valid = _valid_coordinates(lat, lng)
+        locations = np.column_stack([np.append(depot_lat, lat[valid]), np.append(depot_lng, lng[valid])])
         demands = [0]
         service_times_list = [0]  # Store service times for each location
+        service_minutes = [0]  # Business type service time used by the Time dimension (0 for depot)
+        node_customer_ids = [None]  # Customer id per location (None for depot)
         
-        for customer in customers:
-            lat = customer["location"]["lat"]
-            lng = customer["location"]["lng"]
-            
-            if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
-                print(f"[OR-Tools] WARNING: Invalid customer coordinates: lat={lat}, lng={lng}")
+        for customer, is_valid in zip(customers, valid.tolist()):
+            if not is_valid:
+                print(f"[OR-Tools] WARNING: Invalid customer coordinates: lat={customer['location']['lat']}, "
+                      f"lng={customer['location']['lng']}")
                 continue
                 
-            locations.append((lat, lng))
             demands.append(customer.get("demand_pallets", 1))
             service_duration = customer.get("service_duration", 15)  # Default 15 minutes
             service_times_list.append(service_duration)
+            business_type = customer.get("business_type", "default")
+            service_minutes.append(SERVICE_TIMES.get(business_type, SERVICE_TIMES["default"]))
+            node_customer_ids.append(str(customer["id"]))
         
         num_locations = len(locations)
         num_vehicles = len(vehicles)
@@ -256,18 +1210,21 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         print(f"[OR-Tools] Locations: {num_locations} (1 depot + {num_locations-1} customers)")
         print(f"[OR-Tools] Total demand: {sum(demands)} pallets")
         
+        # Faz süreleri (saniye): matris, model kurulumu, arama, rota çıkarımı
+        timings = {}
+        phase_start = time.perf_counter()
+        
         # Distance matrix - OSRM Table API ile gerçek yol mesafesi
         print(f"[OR-Tools] ===== MESAFE MATRİSİ HESAPLANIYOR =====")
-        osrm_url = os.environ.get('OSRM_URL', 'https://router.project-osrm.org')
-        distance_matrix = get_osrm_distance_matrix(locations, osrm_url)
+        osrm_url = osrm_url or os.environ.get('OSRM_URL', 'https://router.project-osrm.org')
+        matrix_stats = {}
+        distance_matrix, durations = _distance_matrix(locations, osrm_url, matrix_stats, shared_matrix)
         
-        # Sanity check
-        for i, row in enumerate(distance_matrix):
-            for j, dist in enumerate(row):
-                if dist < 0:
-                    distance_matrix[i][j] = 0
-                elif dist > 20000000:  # 20,000 km üzeri
-                    distance_matrix[i][j] = 20000000
+        # Sanity check (0 - 20,000 km) + zaman matrisi (seyahat + varıştaki servis süresi)
+        distance_matrix = _clamp_distance_matrix(distance_matrix)
+        time_matrix = _build_time_matrix(distance_matrix, service_minutes, durations)
+        timings["matrix_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
         
         vehicle_capacities = [v.get("capacity_pallets", 26) for v in vehicles]
         total_capacity = sum(vehicle_capacities)
@@ -282,12 +1239,8 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         manager = pywrapcp.RoutingIndexManager(num_locations, num_vehicles, 0)
         routing = pywrapcp.RoutingModel(manager)
         
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return distance_matrix[from_node][to_node]
-        
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+        # Matrix-backed evaluators: arc costs are read in C++ without calling back into Python
+        transit_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
         # Add fixed cost per vehicle to minimize vehicle count
@@ -296,11 +1249,7 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         routing.SetFixedCostOfAllVehicles(10000)
         print(f"[OR-Tools] Fixed vehicle cost: 10000 (prioritizes fewer vehicles)")
         
-        def demand_callback(from_index):
-            from_node = manager.IndexToNode(from_index)
-            return demands[from_node]
-        
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        demand_callback_index = routing.RegisterUnaryTransitVector(demands)
         routing.AddDimensionWithVehicleCapacity(
             demand_callback_index,
             0,
@@ -345,32 +1294,8 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         # Add Time dimension for duration tracking
         print(f"[OR-Tools] ===== ADDING TIME DIMENSION =====")
         
-        def time_callback(from_index, to_index):
-            """Calculate travel + service time between nodes"""
-            try:
-                from_node = manager.IndexToNode(from_index)
-                to_node = manager.IndexToNode(to_index)
-                
-                # Travel time: distance in meters, average speed 60 km/h
-                # Formula: (distance_km / speed_kmh) * 60 minutes = travel time in minutes
-                distance_km = distance_matrix[from_node][to_node] / 1000.0
-                average_speed_kmh = 60.0
-                travel_time_minutes = (distance_km / average_speed_kmh) * 60.0
-                
-                # Service time at destination (0 for depot)
-                if to_node == 0:
-                    service_time_minutes = 0
-                else:
-                    customer = customers[to_node - 1]
-                    business_type = customer.get("business_type", "default")
-                    service_time_minutes = SERVICE_TIMES.get(business_type, SERVICE_TIMES["default"])
-                
-                return int(travel_time_minutes + service_time_minutes)
-            except Exception as e:
-                print(f"[OR-Tools] ERROR in time_callback: {e}")
-                return 999999
-        
-        time_callback_index = routing.RegisterTransitCallback(time_callback)
+        # Travel (precomputed OSRM durations or 60 km/h) + service time at destination, precomputed in time_matrix
+        time_callback_index = routing.RegisterTransitMatrix(time_matrix.tolist())
         
         # Time dimension: max 1440 minutes per route (24 hours)
         # fix_start_cumul_to_zero=False allows vehicles to wait for time windows
@@ -393,31 +1318,65 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
         
-        # Use PARALLEL_CHEAPEST_INSERTION - better for multi-depot and complex constraints
+        # Default: PARALLEL_CHEAPEST_INSERTION - better for multi-depot and complex constraints
         # (PATH_CHEAPEST_ARC is faster but less effective for complex problems)
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
-        )
-
-        # Use GUIDED_LOCAL_SEARCH - recommended as most efficient for VRP
+        # + GUIDED_LOCAL_SEARCH - recommended as most efficient for VRP
         # (see https://developers.google.com/optimization/routing/routing_options)
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-        )
+        # Portföy modunda diğer kombinasyonlar ayrı süreçlerde yarışır
+        strategy = _set_search_strategy(search_parameters, first_solution_strategy, local_search_metaheuristic)
 
         # Timeout for optimization - allows local search to improve solution
-        search_parameters.time_limit.seconds = 120  # 2 minutes for optimization
+        search_parameters.time_limit.seconds = time_limit_seconds  # Per-depot budget (default 120s)
         search_parameters.log_search = True
 
         # REMOVED: solution_limit = 1 was killing optimization!
         # Let the solver use the full time_limit to find better solutions
 
-        print(f"[OR-Tools] Solving with PARALLEL_CHEAPEST_INSERTION + GUIDED_LOCAL_SEARCH (120s limit)...")
+        # Her çözümde iptal ve plato kontrolü (iyileşme durunca süreyi beklemeden bitir)
+        depot_progress = None
+        if progress_callback is not None:
+            depot_progress = lambda event: progress_callback({"depot_id": primary_depot["id"], "strategy": strategy, **event})
+        monitor = _SearchMonitor(routing, cancel_event, plateau_window_seconds, plateau_min_improvement,
+                                 stop_event=stop_event, progress_callback=depot_progress,
+                                 fixed_vehicle_cost=10000)
+        monitor.attach()
+
+        print(f"[OR-Tools] Solving with {strategy} ({time_limit_seconds}s limit)...")
+        print(f"[OR-Tools] Plateau stop: {plateau_window_seconds}s window, {plateau_min_improvement:.2%} min improvement")
+        # Uzak müşteri arklarını buda (model kapanmadan önce)
+        pruning_stats = _apply_knn_pruning(routing, manager, search_parameters, distance_matrix, 1, knn_k)
+        
+        # Warm start: önceki plan verildiyse aramayı ondan başlat
+        initial_assignment = None
+        if initial_routes:
+            initial_assignment = _build_initial_assignment(
+                routing, manager, search_parameters, initial_routes, vehicles,
+                node_customer_ids, distance_matrix, time_matrix, demands, vehicle_capacities
+            )
+
         print(f"[OR-Tools] About to call SolveWithParameters()...")
+        timings["model_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
 
-        solution = routing.SolveWithParameters(search_parameters)
+        if initial_assignment is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial_assignment, search_parameters)
+        else:
+            solution = routing.SolveWithParameters(search_parameters)
+        timings["search_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
+        search_stats = monitor.stats(time_limit_seconds)
+        search_stats["strategy"] = strategy
+        search_stats["warm_start"] = initial_assignment is not None
+        search_stats["arc_pruning"] = pruning_stats
+        search_stats["timings"] = timings
+        search_stats["matrix"] = matrix_stats
 
         print(f"[OR-Tools] SolveWithParameters() returned, solution exists: {solution is not None}")
+        print(f"[OR-Tools] Search stopped: {search_stats['stop_reason']} after {search_stats['solve_time_s']}s (best at {search_stats['best_solution_time_s']}s)")
+
+        if search_stats["stop_reason"] == "cancelled":
+            print(f"[OR-Tools] Optimization cancelled")
+            raise OptimizationCancelled("Optimization cancelled")
 
         # Log solver status
         status = routing.status()
@@ -432,6 +1391,7 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
         }
         status_msg = status_messages.get(status, f"UNKNOWN({status})")
         print(f"[OR-Tools] Solver Status: {status_msg}")
+        search_stats["solver_status"] = status_msg
 
         if solution:
             objective = solution.ObjectiveValue()
@@ -457,9 +1417,11 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
             error_details += f"\nDiagnostics: {len(customers)} customers, {num_vehicles} vehicles"
             error_details += f"\nTotal demand: {total_demand} pallets, Total capacity: {total_capacity} pallets"
             error_details += f"\nDemand/Capacity ratio: {total_demand/total_capacity:.2f}" if total_capacity > 0 else "\nTotal capacity is 0!"
+            if pruning_stats.get("applied"):
+                error_details += f"\nKNN arc pruning (k={knn_k}) may be too tight, retry with a larger knn_k or 0"
             
             print(f"[OR-Tools] ERROR: {error_details}")
-            raise Exception(error_details)
+            raise NoSolutionFound(error_details, status_msg, matrix_stats)
         
         # Parse results
         routes = []
@@ -508,6 +1470,7 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
                         "customer_name": customer["name"],
                         "location": customer["location"],
                         "demand": customer["demand_pallets"],
+                        "service_time": service_minutes[node_index],  # Time dimension service minutes
                         "stopOrder": stop_order,  # Stop sequence number
                         "cumulativeLoad": cumulative_load,  # Total pallets loaded so far
                         "distanceFromPrev": round(distance_from_prev, 2)  # km from previous stop
@@ -522,7 +1485,6 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
             if len(route_stops) > 0:
                 route_distance_km = route_distance / 1000
                 vehicle = vehicles[vehicle_id]
-                fuel_consumption = VEHICLE_TYPES[vehicle["type"]]["fuel"]
                 
                 # Calculate route duration from time dimension or fallback
                 end_index = routing.End(vehicle_id)
@@ -544,11 +1506,7 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
                     print(f"[OR-Tools]   Distance: {route_distance_km:.2f} km")
                     print(f"[OR-Tools]   Stops: {len(route_stops)}")
                 
-                fuel_cost = (route_distance_km / 100) * fuel_consumption * fuel_price
-                distance_cost = route_distance_km * 2.5
-                fixed_cost = 500.0
-                toll_cost = route_distance_km * 0.5
-                total_cost = fuel_cost + distance_cost + fixed_cost + toll_cost
+                costs = route_cost_fields(route_distance_km, vehicle["type"], fuel_price)
                 
                 # Cap duration at 600 for display (even if slack was used)
                 display_duration = min(route_duration_min, 1440)
@@ -562,18 +1520,16 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
                     "stops": route_stops,
                     "distance_km": round(route_distance_km, 2),
                     "duration_minutes": round(display_duration, 2),  # Capped at 600 min
-                    "fuel_cost": round(fuel_cost, 2),
-                    "distance_cost": round(distance_cost, 2),
-                    "fixed_cost": round(fixed_cost, 2),
-                    "toll_cost": round(toll_cost, 2),
-                    "total_cost": round(total_cost, 2),
+                    **costs,
                     "total_pallets": sum(s["demand"] for s in route_stops)
                 })
                 
                 total_distance += route_distance_km
         
+        timings["extraction_s"] = round(time.perf_counter() - phase_start, 3)
         print(f"[OR-Tools] Generated {len(routes)} routes")
         print(f"[OR-Tools] Total distance: {round(total_distance, 2)} km")
+        print(f"[OR-Tools] Phase timings: {timings}")
         
         return {
             "routes": routes,
@@ -581,17 +1537,58 @@ def _optimize_single_depot(primary_depot: dict, all_depots: list, customers: lis
                 "total_routes": len(routes),
                 "total_distance_km": round(total_distance, 2),
                 "total_vehicles_used": len(routes),
-                "algorithm": "OR-Tools"
+                "algorithm": "OR-Tools",
+                "search": search_stats
             }
         }
     except Exception as e:
         print(f"[OR-Tools] ERROR during optimization: {e}")
         raise e
 
-def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_price: float) -> dict:
-    """True multi-depot optimization (experimental)"""
+def _assign_vehicle_depots(vehicles: list, depots: list, depot_demands: List[int]) -> List[int]:
+    """
+    Joint modda her aracın başlangıç/bitiş deposu (depots listesindeki sıra)
+    depot_id'si verilen araç kendi deposunda kalır; diğerleri depolara kalan talep
+    oranında dağıtılır (büyük araçlar önce, kapasite açığı en büyük depoya)
+    """
+    depot_index = {depot["id"]: i for i, depot in enumerate(depots)}
+    assignment = [None] * len(vehicles)
+    residual = list(depot_demands)
+    free_vehicles = []
+    for i, vehicle in enumerate(vehicles):
+        home = depot_index.get(vehicle.get("depot_id"))
+        if home is None:
+            free_vehicles.append(i)
+        else:
+            assignment[i] = home
+            residual[home] = max(0, residual[home] - vehicle.get("capacity_pallets", 26))
+    
+    if free_vehicles:
+        if not any(residual):
+            residual = list(depot_demands)
+        fleets = _split_fleet([dict(vehicles[i], _index=i) for i in free_vehicles], residual)
+        for depot, fleet in enumerate(fleets):
+            for vehicle in fleet:
+                assignment[vehicle["_index"]] = depot
+    return assignment
+
+def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_price: float,
+                          vehicle_depots: List[int] = None, osrm_url: str = None, cancel_event=None,
+                          time_limit_seconds: int = DEFAULT_TIME_LIMIT_SECONDS,
+                          plateau_window_seconds: float = DEFAULT_PLATEAU_WINDOW_SECONDS,
+                          plateau_min_improvement: float = DEFAULT_PLATEAU_MIN_IMPROVEMENT,
+                          initial_routes: dict = None, stop_event=None, progress_callback=None,
+                          knn_k: int = 0, first_solution_strategy: str = DEFAULT_FIRST_SOLUTION_STRATEGY,
+                          local_search_metaheuristic: str = DEFAULT_LOCAL_SEARCH_METAHEURISTIC,
+                          shared_matrix=None) -> dict:
+    """
+    Joint multi-depot optimization: tüm depolar, müşteriler ve araçlar tek modelde
+    vehicle_depots: araç başına başlangıç/bitiş depo sırası (verilmezse _assign_vehicle_depots)
+    Müşteriler herhangi bir deponun aracıyla servis edilebilir; filo depolar arasında paylaşılır.
+    depot_id'si verilen müşteriler yalnızca o deponun araçlarına atanır.
+    """
     try:
-        print(f"[OR-Tools] Starting optimization...")
+        print(f"[OR-Tools] Starting joint multi-depot optimization...")
         print(f"[OR-Tools] Depots: {len(depots)}")
         print(f"[OR-Tools] Customers: {len(customers)}")
         print(f"[OR-Tools] Vehicles: {len(vehicles)}")
@@ -605,40 +1602,49 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
             depot_locations.append((depot_lat, depot_lng))
             print(f"[OR-Tools] Depot {depot.get('name', depot.get('id', 'Unknown'))}: ({depot_lat}, {depot_lng})")
         
-        # Locations: depots + customers
-        locations = depot_locations.copy()
-        
+        # Locations: depots + customers (n×2 dizi, müşteri koordinat sütunlarından)
+        lat, lng = customer_coordinates(customers)
+        valid = _valid_coordinates(lat, lng)
+        locations = np.concatenate([np.array(depot_locations, dtype=np.float64).reshape(-1, 2),
+                                    np.column_stack([lat[valid], lng[valid]])])
         demands = [0] * len(depots)
-        
-        for i, customer in enumerate(customers):
-            lat = customer["location"]["lat"]
-            lng = customer["location"]["lng"]
-            
-            if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
-                print(f"[OR-Tools] WARNING: Invalid customer {i} coordinates: lat={lat}, lng={lng}")
+        service_minutes = [0] * len(depots)  # No service time at depots
+        node_customers = [None] * len(depots)  # Customer per location (None for depots)
+        node_customer_ids = [None] * len(depots)
+        
+        for i, (customer, is_valid) in enumerate(zip(customers, valid.tolist())):
+            if not is_valid:
+                print(f"[OR-Tools] WARNING: Invalid customer {i} coordinates: lat={customer['location']['lat']}, "
+                      f"lng={customer['location']['lng']}")
                 continue
                 
-            locations.append((lat, lng))
             demands.append(customer.get("demand_pallets", 1))
+            business_type = customer.get("business_type", "default")
+            service_minutes.append(SERVICE_TIMES.get(business_type, SERVICE_TIMES["default"]))
+            node_customers.append(customer)
+            node_customer_ids.append(str(customer["id"]))
         
         num_locations = len(locations)
         num_vehicles = len(vehicles)
         
         print(f"[OR-Tools] Valid locations: {num_locations}")
         print(f"[OR-Tools] Total demand: {sum(demands)} pallets")
+        
+        # Faz süreleri (saniye): matris, model kurulumu, arama, rota çıkarımı
+        timings = {}
+        phase_start = time.perf_counter()
 
         # Distance matrix - OSRM Table API ile gerçek yol mesafesi (single-depot ile tutarlı)
         print(f"[OR-Tools] ===== MESAFE MATRİSİ HESAPLANIYOR =====")
-        osrm_url = os.environ.get('OSRM_URL', 'https://router.project-osrm.org')
-        distance_matrix = get_osrm_distance_matrix(locations, osrm_url)
+        osrm_url = osrm_url or os.environ.get('OSRM_URL', 'https://router.project-osrm.org')
+        matrix_stats = {}
+        distance_matrix, durations = _distance_matrix(locations, osrm_url, matrix_stats, shared_matrix)
 
-        # Sanity check
-        for i, row in enumerate(distance_matrix):
-            for j, dist in enumerate(row):
-                if dist < 0:
-                    distance_matrix[i][j] = 0
-                elif dist > 20000000:  # 20,000 km üzeri
-                    distance_matrix[i][j] = 20000000
+        # Sanity check (0 - 20,000 km) + zaman matrisi (seyahat + varıştaki servis süresi)
+        distance_matrix = _clamp_distance_matrix(distance_matrix)
+        time_matrix = _build_time_matrix(distance_matrix, service_minutes, durations)
+        timings["matrix_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
 
         print(f"[OR-Tools] Distance matrix size: {len(distance_matrix)}x{len(distance_matrix[0])}")
         
@@ -657,17 +1663,37 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
         print(f"[OR-Tools] Demand/Capacity ratio: {total_demand/total_capacity:.2f}")
         
         if total_demand > total_capacity:
-            raise ValueError(f"Total demand ({total_demand}) exceeds total capacity ({total_capacity})")
+            raise ValueError(f"Insufficient capacity: {total_demand} > {total_capacity}")
         
         print(f"[OR-Tools] Creating RoutingIndexManager...")
         
-        # 9 arac, 3 depo -> [0,1,2,0,1,2,0,1,2]
-        num_depots = len(depots)
-        starts = [i % num_depots for i in range(num_vehicles)]
+        # Araçlar kendi depolarından çıkar ve oraya döner (depo sırası = düğüm indexi)
+        if vehicle_depots is None:
+            vehicle_depots = _assign_vehicle_depots(vehicles, depots, [
+                sum(c.get("demand_pallets", 0) for c in customers if c.get("depot_id") == depot["id"])
+                for depot in depots
+            ])
+        starts = list(vehicle_depots)
         ends = starts  # Araclar basladiklarini depoya doner
         
-        print(f"[OR-Tools] Start depots: {starts}")
-        print(f"[OR-Tools] End depots: {ends}")
+        # depot_id'si verilen müşteriler o deponun araçlarına sabitlenir (diğerleri herhangi bir depodan)
+        depot_positions = {depot["id"]: i for i, depot in enumerate(depots)}
+        pinned_nodes = {}  # düğüm -> depo sırası
+        for node in range(len(depots), num_locations):
+            home = depot_positions.get(node_customers[node].get("depot_id"))
+            if home is not None:
+                pinned_nodes[node] = home
+        depot_fleets = []
+        for depot_index, depot in enumerate(depots):
+            depot_fleet = [v for v, d in enumerate(starts) if d == depot_index]
+            depot_fleets.append(depot_fleet)
+            fleet_capacity = sum(vehicle_capacities[v] for v in depot_fleet)
+            pinned_demand = sum(demands[node] for node, home in pinned_nodes.items() if home == depot_index)
+            print(f"[OR-Tools] Depot {depot['id']}: {len(depot_fleet)} vehicles, "
+                  f"{fleet_capacity} pallets capacity, {pinned_demand} pallets pinned")
+            if pinned_demand > fleet_capacity:
+                raise ValueError(f"Insufficient capacity at depot {depot['id']}: {pinned_demand} pallets of customers "
+                                 f"with depot_id > {fleet_capacity} ({len(depot_fleet)} vehicles)")
         
         manager = pywrapcp.RoutingIndexManager(
             num_locations,
@@ -675,38 +1701,19 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
             starts,  # Her arac icin baslangic depo indexi
             ends     # Her arac icin bitis depo indexi
         )
-        print(f"[OR-Tools] RoutingIndexManager created with {num_depots} depots")
+        print(f"[OR-Tools] RoutingIndexManager created with {len(depots)} depots")
         
-        print(f"[OR-Tools] Creating RoutingModel...")
         routing = pywrapcp.RoutingModel(manager)
-        print(f"[OR-Tools] RoutingModel created")
-        
-        def distance_callback(from_index, to_index):
-            try:
-                from_node = manager.IndexToNode(from_index)
-                to_node = manager.IndexToNode(to_index)
-                return distance_matrix[from_node][to_node]
-            except Exception as e:
-                print(f"[OR-Tools] ERROR in distance_callback: {e}")
-                return 1000000
-        
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+        
+        # Matrix-backed evaluators (see _optimize_single_depot)
+        transit_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-        print(f"[OR-Tools] Distance callback registered")
         
         # Add fixed cost per vehicle to minimize vehicle count
         routing.SetFixedCostOfAllVehicles(10000)
         print(f"[OR-Tools] Fixed vehicle cost: 10000 (prioritizes fewer vehicles)")
         
-        def demand_callback(from_index):
-            try:
-                from_node = manager.IndexToNode(from_index)
-                return demands[from_node]
-            except Exception as e:
-                print(f"[OR-Tools] ERROR in demand_callback: {e}")
-                return 0
-        
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        demand_callback_index = routing.RegisterUnaryTransitVector(demands)
         routing.AddDimensionWithVehicleCapacity(
             demand_callback_index,
             0,
@@ -716,40 +1723,8 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
         )
         print(f"[OR-Tools] Capacity dimension added")
         
-        # Time dimension: travel time + service time
-        def time_callback(from_index, to_index):
-            """Calculate travel + service time between nodes"""
-            try:
-                from_node = manager.IndexToNode(from_index)
-                to_node = manager.IndexToNode(to_index)
-
-                # Travel time: distance in meters, average speed 60 km/h
-                # Formula: (distance_km / speed_kmh) * 60 minutes = travel time in minutes
-                distance_km = distance_matrix[from_node][to_node] / 1000.0
-                average_speed_kmh = 60.0
-                travel_time_minutes = (distance_km / average_speed_kmh) * 60.0
-
-                # Service time at destination
-                if to_node < len(depots):
-                    # Destination is a depot - no service time
-                    service_time_minutes = 0
-                else:
-                    # Destination is a customer
-                    customer_index = to_node - len(depots)
-                    if customer_index < len(customers):
-                        customer = customers[customer_index]
-                        business_type = customer.get("business_type", "default")
-                        service_time_minutes = SERVICE_TIMES.get(business_type, SERVICE_TIMES["default"])
-                    else:
-                        print(f"[OR-Tools] WARNING: Invalid customer index {customer_index}")
-                        service_time_minutes = SERVICE_TIMES["default"]
-
-                return int(travel_time_minutes + service_time_minutes)
-            except Exception as e:
-                print(f"[OR-Tools] ERROR in time_callback: {e}, from={from_index}, to={to_index}")
-                return 999999
-        
-        time_callback_index = routing.RegisterTransitCallback(time_callback)
+        # Time dimension: travel time + service time (precomputed in time_matrix)
+        time_callback_index = routing.RegisterTransitMatrix(time_matrix.tolist())
         
         # Time dimension: max 1440 minutes per route (24 hours total including breaks)
         # fix_start_cumul_to_zero=False allows vehicles to wait for time windows
@@ -760,34 +1735,61 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
             False,  # FIXED: Was True, but VRPTW requires False
             'Time'
         )
-        routing.GetDimensionOrDie('Time')  # Verify dimension exists
+        time_dimension = routing.GetDimensionOrDie('Time')  # Verify dimension exists
 
         print(f"[OR-Tools] Time dimension added (max 24h per route, 2h slack)")
         
-        # Add time window constraints
-        # for location_idx, time_window in enumerate(time_windows):
-        #     if location_idx == 0:
-        #         continue  # Skip depot
-        #     index = manager.NodeToIndex(location_idx)
-        #     time_dimension.CumulVar(index).SetRange(time_window[0], time_window[1])
-        #     print(f"[OR-Tools] Set time window for location {location_idx}: [{time_window[0]}, {time_window[1]}]")
-        
-        print(f"[OR-Tools] Time window constraints DISABLED for testing - only using time dimension for route duration limit")
+        for node, home in pinned_nodes.items():
+            routing.SetAllowedVehiclesForIndex(depot_fleets[home], manager.NodeToIndex(node))
+        if pinned_nodes:
+            print(f"[OR-Tools] {len(pinned_nodes)} customers pinned to their depot's vehicles")
         
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        # Use PARALLEL_CHEAPEST_INSERTION - better for multi-depot and complex constraints
-        # (Same strategy as single-depot for consistency)
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
-        )
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH  # Better optimization
-        )
-        search_parameters.time_limit.seconds = 120  # Increased from 30 to 120 seconds
+        # Same default strategy as single-depot (PARALLEL_CHEAPEST_INSERTION + GUIDED_LOCAL_SEARCH)
+        strategy = _set_search_strategy(search_parameters, first_solution_strategy, local_search_metaheuristic)
+        search_parameters.time_limit.seconds = time_limit_seconds
         search_parameters.log_search = True
         
-        print(f"[OR-Tools] Starting solver with 120s timeout and guided local search...")
-        solution = routing.SolveWithParameters(search_parameters)
+        # İptal, erken bitirme, plato kontrolü ve ilerleme (single-depot ile aynı)
+        joint_progress = None
+        if progress_callback is not None:
+            joint_progress = lambda event: progress_callback({"depot_id": None, "strategy": strategy, **event})
+        monitor = _SearchMonitor(routing, cancel_event, plateau_window_seconds, plateau_min_improvement,
+                                 stop_event=stop_event, progress_callback=joint_progress,
+                                 fixed_vehicle_cost=10000)
+        monitor.attach()
+        
+        # Uzak müşteri arklarını buda (model kapanmadan önce)
+        pruning_stats = _apply_knn_pruning(routing, manager, search_parameters, distance_matrix, len(depots), knn_k)
+        
+        # Warm start: önceki plan verildiyse aramayı ondan başlat
+        initial_assignment = None
+        if initial_routes:
+            initial_assignment = _build_initial_assignment(
+                routing, manager, search_parameters, initial_routes, vehicles,
+                node_customer_ids, distance_matrix, time_matrix, demands, vehicle_capacities,
+                route_depots=starts
+            )
+        timings["model_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
+        
+        print(f"[OR-Tools] Starting solver with {time_limit_seconds}s timeout ({strategy})...")
+        if initial_assignment is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial_assignment, search_parameters)
+        else:
+            solution = routing.SolveWithParameters(search_parameters)
+        timings["search_s"] = round(time.perf_counter() - phase_start, 3)
+        phase_start = time.perf_counter()
+        search_stats = monitor.stats(time_limit_seconds)
+        search_stats["strategy"] = strategy
+        search_stats["warm_start"] = initial_assignment is not None
+        search_stats["arc_pruning"] = pruning_stats
+        search_stats["timings"] = timings
+        search_stats["matrix"] = matrix_stats
+        print(f"[OR-Tools] Search stopped: {search_stats['stop_reason']} after {search_stats['solve_time_s']}s (best at {search_stats['best_solution_time_s']}s)")
+        
+        if search_stats["stop_reason"] == "cancelled":
+            raise OptimizationCancelled("Optimization cancelled")
 
         # Log solver status
         status = routing.status()
@@ -802,37 +1804,22 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
         }
         status_msg = status_messages.get(status, f"UNKNOWN({status})")
         print(f"[OR-Tools] Solver Status: {status_msg}")
+        search_stats["solver_status"] = status_msg
 
         if solution:
             objective = solution.ObjectiveValue()
             print(f"[OR-Tools] ✓ Solution found! Objective value: {objective}")
 
         if not solution:
-            status = routing.status()
-            status_messages = {
-                0: "ROUTING_NOT_SOLVED",
-                1: "ROUTING_SUCCESS",
-                2: "ROUTING_FAIL",
-                3: "ROUTING_FAIL_TIMEOUT",
-                4: "ROUTING_INVALID",
-                5: "ROUTING_FAIL_NO_SOLUTION_FOUND",
-                6: "ROUTING_OPTIMAL"
-            }
-            status_msg = status_messages.get(status, f"UNKNOWN({status})")
-            print(f"[OR-Tools] No solution found. Status: {status_msg}")
-            
-            error_details = f"Model initialization failed. Status: {status_msg}"
+            error_details = f"No solution found. Status: {status_msg}"
             error_details += f"\nDiagnostics: Locations: {num_locations}; Vehicles: {num_vehicles}"
             error_details += f"\nTotal demand: {total_demand} pallets; Total capacity: {total_capacity} pallets"
             error_details += f"\nDemand/Capacity ratio: {total_demand/total_capacity:.2f}" if total_capacity > 0 else "\nTotal capacity is 0!"
+            if pruning_stats.get("applied"):
+                error_details += f"\nKNN arc pruning (k={knn_k}) may be too tight, retry with a larger knn_k or 0"
             
-            raise Exception(error_details)
-        
-        # Servis süreleri
-        service_times = [0] * len(depots)  # Depolar için servis süresi 0
-        for customer in customers:
-            business = customer.get("business_type", "default")
-            service_times.append(SERVICE_TIMES.get(business, SERVICE_TIMES["default"]))
+            print(f"[OR-Tools] ERROR: {error_details}")
+            raise NoSolutionFound(error_details, status_msg, matrix_stats)
         
         # Sonuçları parse et
         routes = []
@@ -843,12 +1830,9 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
             route_distance = 0
             route_stops = []
             stop_order = 1
-            cumulative_time = 0
             cumulative_load = 0
             
-            start_node = manager.IndexToNode(index)
-            vehicle_depot_index = start_node if start_node < len(depots) else 0
-            vehicle_depot = depots[vehicle_depot_index]
+            vehicle_depot = depots[starts[vehicle_id]]
             depot_lat = vehicle_depot["location"]["lat"]
             depot_lng = vehicle_depot["location"]["lng"]
             
@@ -856,7 +1840,7 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
                 node_index = manager.IndexToNode(index)
                 
                 if node_index >= len(depots):
-                    customer = customers[node_index - len(depots)]
+                    customer = node_customers[node_index]
                     
                     if route_stops:
                         prev_loc = route_stops[-1]["location"]
@@ -864,17 +1848,13 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
                             prev_loc["lat"], prev_loc["lng"],
                             customer["location"]["lat"], customer["location"]["lng"]
                         )
-                        travel_time = (distance_from_prev / 60) * 60
                     else:
                         # First stop - distance from depot
                         distance_from_prev = haversine_distance(
                             depot_lat, depot_lng,
                             customer["location"]["lat"], customer["location"]["lng"]
                         )
-                        travel_time = (distance_from_prev / 60) * 60
                     
-                    cumulative_time += travel_time
-                    service_time_min = service_times[node_index]
                     cumulative_load += customer["demand_pallets"]
                     
                     route_stops.append({
@@ -882,14 +1862,12 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
                         "customer_name": customer["name"],
                         "location": customer["location"],
                         "demand": customer["demand_pallets"],
-                        "service_time": service_time_min,
+                        "service_time": service_minutes[node_index],  # Time dimension service minutes
                         "stopOrder": stop_order,  # Stop sequence number
-                        "arrivalTime": round(cumulative_time, 1),  # Cumulative minutes from depot
                         "cumulativeLoad": cumulative_load,  # Total pallets loaded
                         "distanceFromPrev": round(distance_from_prev, 2)  # km from previous
                     })
                     
-                    cumulative_time += service_time_min
                     stop_order += 1
                 
                 previous_index = index
@@ -899,17 +1877,11 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
             if len(route_stops) > 0:
                 route_distance_km = route_distance / 1000
                 vehicle = vehicles[vehicle_id]
-                fuel_consumption = VEHICLE_TYPES[vehicle["type"]]["fuel"]
                 
-                # Calculate route duration: (distance_km / speed_kmh) * 60 = minutes
-                route_duration_minutes = (route_distance_km / 60.0) * 60.0
-                route_duration_minutes += sum(s["service_time"] for s in route_stops)
+                # Route duration from the Time dimension (capped at 24h for display)
+                route_duration_min = solution.Min(time_dimension.CumulVar(routing.End(vehicle_id)))
                 
-                fuel_cost = (route_distance_km / 100) * fuel_consumption * fuel_price
-                distance_cost = route_distance_km * 2.5
-                fixed_cost = 500.0
-                toll_cost = route_distance_km * 0.5
-                total_cost = fuel_cost + distance_cost + fixed_cost + toll_cost
+                costs = route_cost_fields(route_distance_km, vehicle["type"], fuel_price)
                 
                 routes.append({
                     "vehicle_id": vehicle["id"],
@@ -919,19 +1891,17 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
                     "depot_name": vehicle_depot.get("name", vehicle_depot["id"]),
                     "stops": route_stops,
                     "distance_km": round(route_distance_km, 2),
-                    "duration_minutes": round(route_duration_minutes, 2),
-                    "fuel_cost": round(fuel_cost, 2),
-                    "distance_cost": round(distance_cost, 2),
-                    "fixed_cost": round(fixed_cost, 2),
-                    "toll_cost": round(toll_cost, 2),
-                    "total_cost": round(total_cost, 2),
+                    "duration_minutes": round(min(route_duration_min, 1440), 2),
+                    **costs,
                     "total_pallets": sum(s["demand"] for s in route_stops)
                 })
                 
                 total_distance += route_distance_km
         
+        timings["extraction_s"] = round(time.perf_counter() - phase_start, 3)
         print(f"[OR-Tools] Generated {len(routes)} routes")
         print(f"[OR-Tools] Total distance: {round(total_distance, 2)} km")
+        print(f"[OR-Tools] Phase timings: {timings}")
         
         return {
             "routes": routes,
@@ -939,7 +1909,8 @@ def _optimize_multi_depot(depots: list, customers: list, vehicles: list, fuel_pr
                 "total_routes": len(routes),
                 "total_distance_km": round(total_distance, 2),
                 "total_vehicles_used": len(routes),
-                "algorithm": "OR-Tools"
+                "algorithm": "OR-Tools",
+                "search": search_stats
             }
         }
     except Exception as e:
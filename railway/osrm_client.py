@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# OSRM Table API istemcisi
+# Büyük matrisler kaynak×hedef karolarına bölünür (sources/destinations parametreleri);
+# karolar ortak bir bağlantı havuzu üzerinden eşzamanlı çekilir ve ayrı ayrı yeniden denenir
+TILE_SIZE = int(os.environ.get("VRP_OSRM_TILE_SIZE", 100))  # osrm-routed --max-table-size varsayılanı
+CONCURRENCY = int(os.environ.get("VRP_OSRM_CONCURRENCY", 8))
+RETRIES = int(os.environ.get("VRP_OSRM_RETRIES", 2))
+TIMEOUT_SECONDS = float(os.environ.get("VRP_OSRM_TIMEOUT_SECONDS", 30))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Süreç başına paylaşılan, bağlantı havuzlu HTTP oturumu (ilk çağrıda, kilit altında kurulur)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=CONCURRENCY, pool_maxsize=CONCURRENCY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def fetch_table_tile(locations: List[tuple], osrm_url: str, sources: List[int],
+                     destinations: List[int], annotation: str = "distance") -> List[List[Optional[float]]]:
+    """
+    Tek bir karo: yalnızca karodaki noktalar URL'ye yazılır
+    annotation: distance (metre) | duration (saniye)
+    Returns: len(sources) × len(destinations) değer; OSRM'in ulaşamadığı çiftler None
+    """
+    tile_indices = list(dict.fromkeys(sources + destinations))
+    position = {index: pos for pos, index in enumerate(tile_indices)}
+
+    # Koordinatları OSRM formatına çevir: lng,lat
+    coords_str = ';'.join(f"{locations[i][1]},{locations[i][0]}" for i in tile_indices)
+    url = (
+        f"{osrm_url}/table/v1/driving/{coords_str}?annotations={annotation}"
+        f"&sources={';'.join(str(position[i]) for i in sources)}"
+        f"&destinations={';'.join(str(position[j]) for j in destinations)}"
+    )
+
+    last_error = None
+    for attempt in range(RETRIES + 1):
+        if attempt > 0:
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        try:
+            response = get_session().get(url, timeout=TIMEOUT_SECONDS)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('code') != 'Ok':
+                raise Exception(f"OSRM error: {data.get('code')}")
+            return data[f'{annotation}s']
+        except Exception as e:
+            last_error = e
+            print(f"[OSRM] Karo hatası ({len(sources)}×{len(destinations)}, deneme {attempt + 1}/{RETRIES + 1}): {str(e)[:200]}")
+
+    raise last_error
+
+
+def fetch_table(locations: List[tuple], osrm_url: str, sources: List[int],
+                destinations: List[int], stats: Optional[dict] = None,
+                annotation: str = "distance") -> List[List[Optional[int]]]:
+    """
+    sources × destinations alt matrisini karolar halinde eşzamanlı çek
+    stats: verilirse osrm_tiles / osrm_failed_tiles sayaçları bu sözlükte artırılır
+    annotation: distance (metre, varsayılan) | duration (saniye)
+    Returns: alt matris; başarısız karolardaki ve ulaşılamayan çiftler None
+    """
+    tiles = [
+        (src_start, dst_start)
+        for src_start in range(0, len(sources), TILE_SIZE)
+        for dst_start in range(0, len(destinations), TILE_SIZE)
+    ]
+    result: List[List[Optional[int]]] = [[None] * len(destinations) for _ in sources]
+
+    def run_tile(tile):
+        src_start, dst_start = tile
+        tile_sources = sources[src_start:src_start + TILE_SIZE]
+        tile_destinations = destinations[dst_start:dst_start + TILE_SIZE]
+        return fetch_table_tile(locations, osrm_url, tile_sources, tile_destinations, annotation)
+
+    failed_tiles = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(CONCURRENCY, len(tiles)))) as executor:
+        futures = [(tile, executor.submit(run_tile, tile)) for tile in tiles]
+        for (src_start, dst_start), future in futures:
+            try:
+                distances = future.result()
+            except Exception:
+                failed_tiles += 1
+                continue
+            for si, row in enumerate(distances):
+                target = result[src_start + si]
+                for dj, d in enumerate(row):
+                    target[dst_start + dj] = int(d) if d is not None else None
+
+    print(f"[OSRM] {len(tiles)} karo çekildi ({len(sources)}×{len(destinations)}), başarısız: {failed_tiles}")
+    if stats is not None:
+        stats["osrm_tiles"] = stats.get("osrm_tiles", 0) + len(tiles)
+        stats["osrm_failed_tiles"] = stats.get("osrm_failed_tiles", 0) + failed_tiles
+    return result
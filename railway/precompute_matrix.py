@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Gece matris ön hesabı: bir bölgenin tüm depo + müşteri konumları için yol mesafesi (metre) ve
+süre (saniye) matrislerini OSRM'den çekip memory-mapped int32 .npy dosyalarına yazar.
+Sunucu VRP_PRECOMPUTED_MATRIX_DIR ile aynı dizini okur; istek alt matrisleri OSRM yerine
+buradan NumPy indekslemeyle alınır (bkz. location_matrix.py).
+
+Girdi: /optimize gövdesiyle aynı biçimde {"depots": [...], "customers": [...]} (satır ya da sütunlu)
+
+Kullanım:
+  python3 precompute_matrix.py --input adana.json --region adana --output-dir /data/matrices
+  python3 precompute_matrix.py --input - --region izmir < izmir.json      # stdin
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from columnar import customers_from_columns
+from location_matrix import PRECOMPUTED_MATRIX_DIR, UNKNOWN, matrix_file, publish_location_matrix
+from matrix_cache import coord_key
+from osrm_client import TILE_SIZE, fetch_table
+
+# Aynı anda bellekte tutulan satır bloğu (blok × N hücre); dosyaya blok blok yazılır
+BLOCK_ROWS = int(os.environ.get("VRP_PRECOMPUTE_BLOCK_ROWS", TILE_SIZE * 5))
+
+
+def _load_sites(path: str):
+    """Depo + müşteri listesi → (konumlar, id → satır); aynı koordinat tek satır"""
+    with (sys.stdin if path == "-" else open(path)) as f:
+        data = json.load(f)
+    customers = data.get("customers", [])
+    if isinstance(customers, dict):
+        customers = customers_from_columns(customers)
+
+    locations, ids, rows_by_key = [], {}, {}
+    for site in data.get("depots", []) + customers:
+        lat, lng = site["location"]["lat"], site["location"]["lng"]
+        if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+            print(f"[Precompute] Skipping {site.get('id')}: invalid coordinates {lat}, {lng}")
+            continue
+        key = coord_key(lat, lng)
+        if key not in rows_by_key:
+            rows_by_key[key] = len(locations)
+            locations.append((lat, lng))
+        ids[str(site["id"])] = rows_by_key[key]
+    return locations, ids
+
+
+def _fill(array: np.memmap, locations: list, osrm_url: str, annotation: str, stats: dict):
+    """Matrisi satır blokları halinde OSRM'den doldur; bilinmeyen çiftler UNKNOWN"""
+    n = len(locations)
+    destinations = list(range(n))
+    for start in range(0, n, BLOCK_ROWS):
+        sources = list(range(start, min(start + BLOCK_ROWS, n)))
+        block = fetch_table(locations, osrm_url, sources, destinations, stats=stats, annotation=annotation)
+        array[start:start + len(sources)] = np.array(
+            [[UNKNOWN if value is None else value for value in row] for row in block], dtype=np.int32
+        )
+        print(f"[Precompute] {annotation}: {start + len(sources)}/{n} rows")
+    array.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bölge mesafe/süre matrisini memory-mapped dosyalara ön hesapla")
+    parser.add_argument('--input', required=True, help="Depo + müşteri JSON dosyası ('-' = stdin)")
+    parser.add_argument('--region', required=True, help="Bölge adı (dosya adı öneki), ör. adana")
+    parser.add_argument('--output-dir', default=PRECOMPUTED_MATRIX_DIR or None,
+                        help="Çıktı dizini (varsayılan VRP_PRECOMPUTED_MATRIX_DIR)")
+    parser.add_argument('--osrm-url', default=os.environ.get('OSRM_URL', 'https://router.project-osrm.org'))
+    parser.add_argument('--no-durations', action='store_true', help="Yalnızca mesafe matrisi")
+    args = parser.parse_args()
+    if not args.output_dir:
+        parser.error("--output-dir or VRP_PRECOMPUTED_MATRIX_DIR is required")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    locations, ids = _load_sites(args.input)
+    n = len(locations)
+    if n < 2:
+        parser.error("need at least two valid locations")
+    created_at = time.time()
+    version = str(int(created_at * 1000))
+    print(f"[Precompute] Region {args.region}: {len(ids)} sites, {n} unique locations, "
+          f"{n * n * 4 / 1e6:.1f} MB per matrix")
+
+    stats = {}
+    files = {}
+    annotations = ["distance"] if args.no_durations else ["distance", "duration"]
+    for annotation in annotations:
+        path = matrix_file(args.output_dir, args.region, version, f"{annotation}s")
+        array = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=(n, n))
+        _fill(array, locations, args.osrm_url, annotation, stats)
+        unknown = int((array == UNKNOWN).sum())
+        if unknown:
+            print(f"[Precompute] WARNING: {unknown}/{n * n} {annotation} pairs unknown (solver fetches them on demand)")
+        del array
+        files[f"{annotation}s"] = path
+
+    publish_location_matrix(args.output_dir, args.region, locations, files, ids,
+                            {"osrm_url": args.osrm_url, "created_at": created_at})
+    print(f"[Precompute] Published {args.region} in {time.perf_counter() - start:.1f}s "
+          f"({stats.get('osrm_tiles', 0)} tiles, {stats.get('osrm_failed_tiles', 0)} failed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from ortools_optimizer import OptimizationCancelled
+
+# Aynı optimizasyon isteği için sonuç önbelleği (içerik adresli)
+# Anahtar: normalize edilmiş isteğin SHA-256 özeti (müşteriler, araçlar, depolar, yakıt fiyatı,
+# OSRM ve çözücü ayarları). Aynı anda gelen özdeş istekler tek çözümü paylaşır.
+RESULT_CACHE_SIZE = int(os.environ.get("VRP_RESULT_CACHE_SIZE", 64))  # 0 = kapalı
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("VRP_RESULT_CACHE_TTL_SECONDS", 900))
+
+
+def request_cache_key(request: dict) -> str:
+    """
+    İsteğin kanonik özeti
+    Müşteri sırası sonucu değiştirmez (depo bazında gruplanır), id'ye göre sıralanır;
+    araç ve depo sırası korunur (araçlar depolara sırayla dağıtılır).
+    """
+    normalized = dict(request)
+    normalized["customers"] = sorted(request.get("customers", []), key=lambda c: str(c.get("id")))
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    """Çalışan bir çözüm: bekleyenler aynı sonucu ya da hatayı alır (erken bitirilen sonuç hariç)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """LRU + TTL sonuç önbelleği; özdeş eşzamanlı istekleri birleştirir"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (kayıt zamanı, sonuç)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict], cancel_event=None) -> dict:
+        """
+        Önbellekteki sonucu döndür; yoksa compute() çalıştır. Aynı anahtar için çalışan bir
+        çözüm varsa onun sonucunu bekle. Dönen sonucun summary.result_cache alanı
+        hit | shared | miss değerini taşır.
+        """
+        if self.max_entries <= 0:
+            result = compute()
+            result.setdefault("summary", {})["result_cache"] = "miss"
+            return result
+
+        while True:
+            with self._lock:
+                cached = self._get(key)
+                if cached is not None:
+                    print(f"[ResultCache] Hit {key[:12]}")
+                    return self._tagged(cached, "hit")
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    in_flight = _InFlight()
+                    self._in_flight[key] = in_flight
+                    break
+
+            print(f"[ResultCache] Waiting for identical request in flight {key[:12]}")
+            while not in_flight.done.wait(0.5):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OptimizationCancelled("Optimization cancelled")
+            if in_flight.error is None:
+                if self._cacheable(in_flight.result):
+                    return self._tagged(in_flight.result, "shared")
+                # Lider erken bitirildi (stop): kısmi sonuç paylaşılmaz, bu istek kendi aramasını yapar
+                print(f"[ResultCache] Leader stopped early, re-running {key[:12]}")
+                continue
+            if not isinstance(in_flight.error, OptimizationCancelled):
+                raise in_flight.error
+            # Lider iptal edildi: bu istek çözümü kendisi üstlenir
+
+        try:
+            result = compute()
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        else:
+            in_flight.result = result
+            if self._cacheable(result):
+                with self._lock:
+                    self._entries[key] = (time.monotonic(), result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return self._tagged(result, "miss")
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[dict]:
+        """Lock altında çağrılır; süresi dolan kayıt silinir"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    @staticmethod
+    def _cacheable(result: dict) -> bool:
+        """Kullanıcının erken bitirdiği (stop) aramalar tam sonuç sayılmaz"""
+        search = result.get("summary", {}).get("search", [])
+        return not any(stats.get("stop_reason") == "stopped" for stats in search)
+
+    @staticmethod
+    def _tagged(result: dict, status: str) -> dict:
+        """Önbellekteki nesne paylaşıldığı için kopya döndürülür"""
+        result = copy.deepcopy(result)
+        result.setdefault("summary", {})["result_cache"] = status
+        return result
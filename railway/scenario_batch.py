@@ -0,0 +1,183 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from cost_model import COST_FIELDS
+from location_matrix import LocationMatrix
+from matrix_cache import coord_key
+from ortools_optimizer import DEFAULT_DEPOT_WORKERS, get_osrm_distance_matrix, optimize_routes
+
+# Senaryo karşılaştırması (POST /optimize/batch)
+# Aynı temel problem üzerinde filo karışımı, yakıt fiyatı, depo alt kümesi gibi what-if
+# değişiklikleri: tüm depo + müşteri konumları için mesafe matrisi bir kez kurulur,
+# senaryolar ayrı süreçlerde paralel çözülür ve ilk senaryoya (baseline) göre farklar döner.
+# solve verilirse (ör. solver_pool.solve) senaryolar thread'lerden onunla paralel çözülür: süreç
+# yönetimi, kabul slotu, duvar saati / bellek sınırı ve çökme yalıtımı çağırana aittir.
+MAX_BATCH_SCENARIOS = int(os.environ.get("VRP_BATCH_MAX_SCENARIOS", 16))
+DEFAULT_BATCH_WORKERS = int(os.environ.get("VRP_BATCH_WORKERS", DEFAULT_DEPOT_WORKERS))
+
+# Senaryonun temel istekten ezebileceği çözücü ayarları (optimize_routes parametreleri)
+SCENARIO_SOLVE_OPTIONS = (
+    "time_limit_seconds", "plateau_window_seconds", "plateau_min_improvement", "decomposition_threshold",
+    "cluster_method", "multi_depot_mode", "knn_k", "depot_assignment", "portfolio_size",
+)
+
+
+def _scenario_inputs(scenario: dict, depots: list, vehicles: list, fuel_price: float, solve_options: dict):
+    """Senaryo değişikliklerini temel probleme uygula: (depolar, araçlar, yakıt fiyatı, çözücü ayarları)"""
+    scenario_depots = depots
+    if scenario.get("depot_ids") is not None:
+        depot_ids = set(scenario["depot_ids"])
+        unknown = depot_ids - {d["id"] for d in depots}
+        if unknown:
+            raise ValueError(f"Scenario '{scenario['name']}': unknown depot ids {', '.join(sorted(unknown))}")
+        # Kapatılan depoların müşterileri kalan en yakın depoya atanır (assign_depots)
+        scenario_depots = [d for d in depots if d["id"] in depot_ids]
+        if not scenario_depots:
+            raise ValueError(f"Scenario '{scenario['name']}': depot_ids must not be empty")
+    options = {**solve_options, **{
+        key: scenario[key] for key in SCENARIO_SOLVE_OPTIONS if scenario.get(key) is not None
+    }}
+    return (
+        scenario_depots,
+        scenario["vehicles"] if scenario.get("vehicles") is not None else vehicles,
+        fuel_price if scenario.get("fuel_price") is None else scenario["fuel_price"],
+        options,
+    )
+
+
+def build_shared_matrix(depots: list, customers: list, osrm_url: Optional[str] = None,
+                        stats: Optional[dict] = None) -> LocationMatrix:
+    """Tüm depo + müşteri konumları (tekilleştirilmiş) için tek mesafe matrisi"""
+    points = [(d["location"]["lat"], d["location"]["lng"]) for d in depots] + \
+             [(c["location"]["lat"], c["location"]["lng"]) for c in customers]
+    locations, seen = [], set()
+    for lat, lng in points:
+        key = coord_key(lat, lng)
+        if key not in seen:
+            seen.add(key)
+            locations.append((lat, lng))
+    distances = get_osrm_distance_matrix(locations, osrm_url, stats=stats)
+    return LocationMatrix(locations, distances)
+
+
+def _solve_scenario(depots: list, customers: list, vehicles: list, fuel_price: float, osrm_url: Optional[str],
+                    options: dict, shared_matrix: LocationMatrix, max_workers: Optional[int],
+                    solve=optimize_routes) -> dict:
+    """Process pool entry point: tek senaryonun çözümü"""
+    return solve(depots=depots, customers=customers, vehicles=vehicles, fuel_price=fuel_price, osrm_url=osrm_url,
+                 max_workers=max_workers, shared_matrix=shared_matrix, **options)
+
+
+def _scenario_totals(result: dict) -> dict:
+    totals = {
+        "total_distance_km": result["summary"]["total_distance_km"],
+        "total_routes": result["summary"]["total_routes"],
+    }
+    for field in COST_FIELDS:
+        totals[field] = round(sum(route.get(field, 0) for route in result["routes"]), 2)
+    return totals
+
+
+def optimize_batch(depots: list, customers: list, vehicles: list, scenarios: List[dict],
+                   fuel_price: float = 47.50, osrm_url: Optional[str] = None, solve_options: Optional[dict] = None,
+                   max_workers: Optional[int] = None, solve=None, on_failure=None) -> dict:
+    """
+    Senaryoları paylaşılan matrisle çöz
+    scenarios: [{"name", "fuel_price"?, "vehicles"?, "depot_ids"?, SCENARIO_SOLVE_OPTIONS...}];
+    verilmeyen alanlar temel problemden gelir. İlk senaryo baseline'dır.
+    Başarısız senaryo diğerlerini durdurmaz (success=False, error).
+    solve: optimize_routes ile aynı parametreli, thread-safe çözücü (ör. solver_pool.solve); verilirse
+    senaryolar en fazla max_workers thread'den eşzamanlı onunla çözülür, depo paralelliğini çözücü belirler
+    on_failure: başarısız senaryonun istisnasıyla çağrılır (ör. hata metrikleri)
+    """
+    if not scenarios:
+        raise ValueError("At least one scenario is required")
+    if len(scenarios) > MAX_BATCH_SCENARIOS:
+        raise ValueError(f"Too many scenarios: {len(scenarios)} > {MAX_BATCH_SCENARIOS}")
+    names = [scenario["name"] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("Scenario names must be unique")
+    inputs = [_scenario_inputs(scenario, depots, vehicles, fuel_price, solve_options or {}) for scenario in scenarios]
+
+    request_start = time.perf_counter()
+    matrix_stats = {}
+    shared_matrix = build_shared_matrix(depots, customers, osrm_url, stats=matrix_stats)
+    matrix_s = time.perf_counter() - request_start
+    print(f"[Batch] Shared matrix: {len(shared_matrix)} locations in {matrix_s:.2f}s, "
+          f"{len(scenarios)} scenarios")
+
+    # Boştaki çekirdekler senaryolara bölünür; senaryo başına kalan işçi depo/portföy paralelliğine gider
+    total_workers = max_workers or DEFAULT_BATCH_WORKERS
+    workers = min(total_workers, len(scenarios))
+    scenario_workers = max(1, total_workers // len(scenarios))
+    outcomes = []
+    if solve is not None:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vrp-batch") as executor:
+            futures = [
+                executor.submit(_solve_scenario, scenario_depots, customers, scenario_vehicles, scenario_fuel_price,
+                                osrm_url, options, shared_matrix, None, solve)
+                for scenario_depots, scenario_vehicles, scenario_fuel_price, options in inputs
+            ]
+            for future in futures:
+                outcomes.append(future.exception() or future.result())
+    elif workers > 1:
+        # spawn: uvicorn thread'leri varken fork güvenli değil
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_solve_scenario, scenario_depots, customers, scenario_vehicles, scenario_fuel_price,
+                                osrm_url, options, shared_matrix, scenario_workers)
+                for scenario_depots, scenario_vehicles, scenario_fuel_price, options in inputs
+            ]
+            for future in futures:
+                outcomes.append(future.exception() or future.result())
+    else:
+        for scenario_depots, scenario_vehicles, scenario_fuel_price, options in inputs:
+            try:
+                outcomes.append(_solve_scenario(scenario_depots, customers, scenario_vehicles, scenario_fuel_price,
+                                                osrm_url, options, shared_matrix, scenario_workers))
+            except Exception as e:
+                outcomes.append(e)
+
+    results = []
+    baseline = None
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"[Batch] Scenario '{name}' failed: {outcome}")
+            if on_failure is not None:
+                on_failure(outcome)
+            results.append({"name": name, "success": False, "error": str(outcome)})
+            continue
+        totals = _scenario_totals(outcome)
+        if name == names[0]:
+            baseline = totals
+        results.append({"name": name, "success": True, "routes": outcome["routes"],
+                        "summary": outcome["summary"], "totals": totals})
+
+    # Baseline'a (ilk senaryo) göre farklar; baseline başarısızsa fark verilmez
+    for result in results:
+        if baseline is not None and result["success"]:
+            result["delta"] = {key: round(value - baseline[key], 2) for key, value in result["totals"].items()}
+            if baseline["total_cost"]:
+                result["delta"]["total_cost_pct"] = round(
+                    (result["totals"]["total_cost"] - baseline["total_cost"]) / baseline["total_cost"] * 100, 2
+                )
+
+    solved = [result for result in results if result["success"]]
+    return {
+        "scenarios": results,
+        "summary": {
+            "baseline": names[0],
+            "best": min(solved, key=lambda r: r["totals"]["total_cost"])["name"] if solved else None,
+            "solved": len(solved),
+            "failed": len(results) - len(solved),
+            "matrix": {"locations": len(shared_matrix), **matrix_stats},
+            "timings": {
+                "matrix_s": round(matrix_s, 3),
+                "solve_s": round(time.perf_counter() - request_start - matrix_s, 3),
+                "total_s": round(time.perf_counter() - request_start, 3),
+            },
+        },
+    }
@@ -0,0 +1,266 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Optional
+
+from admission import MAX_CONCURRENT_SOLVES
+from columnar import pack_customers, unpack_customers
+from metrics import SOLVER_WORKER_RESTARTS
+from ortools_optimizer import (DEFAULT_DEPOT_WORKERS, DEFAULT_TIME_LIMIT_SECONDS, OptimizationCancelled,
+                               optimize_routes)
+
+# Yalıtılmış çözücü süreçleri
+# Çözümler uvicorn sürecinde değil, önceden başlatılmış (OR-Tools import edilmiş) işçi süreçlerinde
+# çalışır. Her çözümün bir duvar saati sınırı ve RSS sınırı (işçi + alt süreçleri) vardır: işçi
+# aramadan önce optimize_routes'un planladığı arama süresini (depo/küme turları, portföy, sınır
+# onarımı) bildirir, sınır bu süre + pay olur. Aşan ya da çöken işçi süreç grubuyla birlikte
+# öldürülüp yenisi başlatılır, API süreci ayakta kalır. Çekirdekler işçiler arasında bölünür: her
+# işçinin depo/portföy havuzu en fazla çekirdek // işçi süreç açar (iç içe havuzlar çekirdek²
+# süreç açmasın). Müşteriler NumPy tamponları olarak gönderilir (columnar.pack_customers).
+# Varsayılan: kabul kontrolünün slot sayısı kadar (kabul edilen her çözüme hazır bir işçi);
+# 0 = çözümler API sürecinde
+SOLVER_WORKERS = int(os.environ.get("VRP_SOLVER_WORKERS", MAX_CONCURRENT_SOLVES))
+SOLVER_DEADLINE_GRACE_SECONDS = float(os.environ.get("VRP_SOLVER_DEADLINE_GRACE_SECONDS", 60))
+SOLVER_MAX_RSS_MB = int(os.environ.get("VRP_SOLVER_MAX_RSS_MB", 4096))  # 0 = sınırsız
+# RSS ölçüm aralığı (/proc taraması)
+RSS_CHECK_INTERVAL_SECONDS = 1.0
+
+
+class SolverWorkerError(RuntimeError):
+    """İşçi süreci öldürüldü ya da çöktü"""
+
+    def __init__(self, reason: str, message: str):
+        self.reason = reason  # deadline | memory | crashed
+        super().__init__(message)
+
+
+def _process_group_rss(pgid: int) -> Optional[int]:
+    """Süreç grubunun toplam RSS'i (bayt); /proc yoksa None"""
+    if not os.path.isdir("/proc"):
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # comm parantez içinde boşluk içerebilir; alanlar son ')' sonrasından sayılır
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # fields[0] = state (3. alan) → pgrp 5. alan, rss 24. alan
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * page_size
+    return total
+
+
+def _worker_main(conn, stop_event):
+    """İşçi döngüsü: (options, paketlenmiş müşteriler) al, planı bildir, çöz, sonucu ya da hatayı gönder"""
+    if hasattr(os, "setpgrp"):
+        # Kendi süreç grubu: öldürülürken depo/portföy alt süreçleri de gider
+        os.setpgrp()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C ana süreçte ele alınır
+    send_lock = threading.Lock()  # İlerleme olayları depo havuzunun thread'inden de gelebilir
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        options, packed_customers = task
+        try:
+            result = optimize_routes(
+                customers=unpack_customers(packed_customers),
+                stop_event=stop_event,
+                progress_callback=lambda event: send(("progress", event)),
+                plan_callback=lambda plan: send(("plan", plan)),
+                **options
+            )
+            send(("result", result))
+        except Exception as e:
+            try:
+                send(("error", e))
+            except Exception:
+                send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.stop_event = context.Event()
+        self.conn, child_conn = context.Pipe()
+        # daemon=False: depo/portföy havuzu açabilmesi için (daemonic süreçler alt süreç açamaz)
+        self.process = context.Process(target=_worker_main, args=(child_conn, self.stop_event),
+                                       name="vrp-solver", daemon=False)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        """İşçiyi alt süreçleriyle birlikte öldür"""
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass  # setpgrp'den önce (hâlâ başlıyor)
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class SolverPool:
+    """Önceden başlatılmış çözücü süreçleri; boştaki işçiler bir kuyrukta bekler"""
+
+    def __init__(self, size: int = SOLVER_WORKERS, grace_seconds: float = SOLVER_DEADLINE_GRACE_SECONDS,
+                 max_rss_mb: int = SOLVER_MAX_RSS_MB):
+        self.size = size
+        self.grace_seconds = grace_seconds
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        # İşçi başına depo/portföy havuzu boyutu (VRP_DEPOT_WORKERS üst sınır)
+        self.depot_workers = min(DEFAULT_DEPOT_WORKERS, max(1, (os.cpu_count() or 1) // max(1, size)))
+        self._context = multiprocessing.get_context("spawn")  # uvicorn thread'leri varken fork güvenli değil
+        self._idle = queue.Queue()
+        self._workers = set()  # boşta + çalışan
+        self._lock = threading.RLock()
+        self._started = False
+        self.restarts = 0
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+            # daemon olmayan süreçler çıkışta beklenir; önce kapat
+            atexit.register(self.shutdown)
+        print(f"[SolverPool] {self.size} solver workers started")
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def shutdown(self):
+        """Boştaki işçileri durdur, çalışanları öldür"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            workers = list(self._workers)
+            self._workers.clear()
+        idle = set()
+        while True:
+            try:
+                idle.add(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            if worker in idle:
+                try:
+                    worker.conn.send(None)
+                    worker.process.join(5)
+                except OSError:
+                    pass
+            if worker.process.is_alive():
+                worker.kill()
+
+    def _provisional_deadline_seconds(self, options: dict) -> float:
+        """Plan bildirilene kadarki sınır (depo ataması, kümeleme): zaman limiti + pay"""
+        return (options.get("time_limit_seconds") or DEFAULT_TIME_LIMIT_SECONDS) + self.grace_seconds
+
+    def _replace(self, worker: _Worker, reason: str) -> _Worker:
+        """İşçiyi öldür ve yerine yenisini başlat"""
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+        self.restarts += 1
+        SOLVER_WORKER_RESTARTS.labels(reason).inc()
+        print(f"[SolverPool] Worker {worker.process.pid} killed ({reason}, exit code {worker.process.exitcode}), "
+              f"respawning")
+        return self._spawn()
+
+    def solve(self, customers: list, cancel_event=None, stop_event=None, progress_callback=None, **options) -> dict:
+        """
+        optimize_routes'u bir işçide çalıştır (aynı parametreler)
+        cancel_event: işçi öldürülür, OptimizationCancelled; stop_event: işçiye iletilir (en iyi çözüm döner)
+        Sınır aşımı ya da çökme SolverWorkerError
+        max_workers verilmezse işçinin payı (depot_workers) kullanılır
+        """
+        options["max_workers"] = options.get("max_workers") or self.depot_workers
+        self.start()
+        worker = self._idle.get()
+        if not worker.process.is_alive():
+            # Boştayken ölmüş (ör. OOM killer)
+            worker = self._replace(worker, "crashed")
+        started = time.monotonic()
+        deadline_seconds = self._provisional_deadline_seconds(options)
+        next_rss_check = started
+        in_flight = True  # işçi bu görev üzerinde çalışıyor (yanıt alınmadı)
+        try:
+            worker.stop_event.clear()
+            try:
+                worker.conn.send((options, pack_customers(customers)))
+            except OSError:
+                in_flight = False
+                worker = self._replace(worker, "crashed")
+                raise SolverWorkerError("crashed", "Solver worker unavailable")
+            while True:
+                if worker.conn.poll(0.2):
+                    try:
+                        kind, payload = worker.conn.recv()
+                    except (EOFError, OSError):
+                        in_flight = False
+                        worker = self._replace(worker, "crashed")
+                        raise SolverWorkerError("crashed", "Solver worker crashed")
+                    if kind == "progress":
+                        if progress_callback is not None:
+                            progress_callback(payload)
+                        continue
+                    if kind == "plan":
+                        # Arama şimdi başlıyor: sınır = geçen süre + planlanan arama süresi + pay
+                        deadline_seconds = time.monotonic() - started + payload["search_budget_s"] + self.grace_seconds
+                        continue
+                    in_flight = False
+                    if kind == "error":
+                        raise payload
+                    return payload
+
+                reason = None
+                if not worker.process.is_alive():
+                    reason, error = "crashed", SolverWorkerError(
+                        "crashed", f"Solver worker crashed (exit code {worker.process.exitcode})")
+                elif cancel_event is not None and cancel_event.is_set():
+                    reason, error = "cancelled", OptimizationCancelled("Optimization cancelled")
+                elif time.monotonic() - started > deadline_seconds:
+                    reason, error = "deadline", SolverWorkerError(
+                        "deadline", f"Solve exceeded wall-clock deadline of {deadline_seconds:.0f}s")
+                elif self.max_rss_bytes > 0 and time.monotonic() >= next_rss_check:
+                    next_rss_check = time.monotonic() + RSS_CHECK_INTERVAL_SECONDS
+                    rss = _process_group_rss(worker.process.pid)
+                    if rss is not None and rss > self.max_rss_bytes:
+                        reason, error = "memory", SolverWorkerError(
+                            "memory", f"Solve exceeded memory limit ({rss / 1e6:.0f} MB > "
+                                      f"{self.max_rss_bytes / 1e6:.0f} MB)")
+                if reason is not None:
+                    in_flight = False
+                    worker = self._replace(worker, reason)
+                    raise error
+                if stop_event is not None and stop_event.is_set():
+                    worker.stop_event.set()
+        finally:
+            if in_flight:
+                # Beklenmeyen hata (ör. progress_callback): görev hâlâ çalışıyor olabilir
+                worker = self._replace(worker, "abandoned")
+            self._idle.put(worker)
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+
+import pytest
+
+# Testler ağsız çalışır: OSRM ulaşılamaz (Haversine'e düşer), önbellekler ve işçi havuzu kapalı
+os.environ.setdefault("VRP_OSRM_RETRIES", "0")
+os.environ.setdefault("VRP_MATRIX_CACHE_PATH", "off")
+os.environ.setdefault("VRP_RESULT_CACHE_SIZE", "0")
+os.environ.setdefault("VRP_SOLVER_WORKERS", "0")
+os.environ.setdefault("OSRM_URL", "http://127.0.0.1:9")
+
+# main.py ile aynı: modüller railway/ altında düz import edilir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_problem(customers: int = 30, seed: int = 1, vehicles: int = None) -> dict:
+    """Tek depolu, Adana çevresinde rastgele müşterili /optimize gövdesi"""
+    rnd = random.Random(seed)
+    depot = {"id": "d0", "location": {"lat": 37.0, "lng": 35.32}}
+    return {
+        "depots": [depot],
+        "customers": [
+            {
+                "id": f"c{i}",
+                "name": f"Müşteri {i}",
+                "location": {"lat": 37.0 + rnd.uniform(-0.1, 0.1), "lng": 35.32 + rnd.uniform(-0.1, 0.1)},
+                "demand_pallets": rnd.randint(1, 6),
+                "business_type": rnd.choice(["MCD", "IKEA", "CHL", "OPT"]),
+                "service_duration": 30,
+            }
+            for i in range(customers)
+        ],
+        "vehicles": [
+            {"id": f"v{i}", "type": i % 5, "capacity_pallets": [10, 14, 18, 32, 36][i % 5], "fuel_consumption": 20}
+            for i in range(vehicles or max(2, customers // 4))
+        ],
+        "fuel_price": 47.5,
+        "osrm_url": "http://127.0.0.1:9",
+        "time_limit_seconds": 1,
+    }
+
+
+def to_columns(customers: list) -> dict:
+    """Satır müşterileri sütunlu gövdeye çevir"""
+    return {
+        "id": [c["id"] for c in customers],
+        "lat": [c["location"]["lat"] for c in customers],
+        "lng": [c["location"]["lng"] for c in customers],
+        "demand": [c["demand_pallets"] for c in customers],
+        "name": [c["name"] for c in customers],
+        "business_type": [c["business_type"] for c in customers],
+        "service_duration": [c["service_duration"] for c in customers],
+    }
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from conftest import make_problem
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _enqueue(controller: AdmissionController, name: str, order: list) -> threading.Thread:
+    """Slot isteyen thread başlat ve kuyruğa girene kadar bekle"""
+    depth = controller.queue_depth
+
+    def run():
+        with controller.slot():
+            order.append(name)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_until(lambda: controller.queue_depth == depth + 1)
+    return thread
+
+
+def test_queued_solves_run_in_fifo_order():
+    controller = AdmissionController(max_concurrent=1, max_queued=3, queue_timeout_seconds=30)
+    order = []
+
+    with controller.slot() as waited:
+        assert waited < 1
+        threads = [_enqueue(controller, name, order) for name in ("a", "b", "c")]
+        assert controller.snapshot()["queue_depth"] == 3
+        assert order == []
+
+    for thread in threads:
+        thread.join(5)
+    assert order == ["a", "b", "c"]
+    assert controller.running == 0 and controller.queue_depth == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    controller = AdmissionController(max_concurrent=1, max_queued=1, queue_timeout_seconds=30)
+    order = []
+
+    with controller.slot():
+        thread = _enqueue(controller, "queued", order)
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.slot():
+                pass
+    thread.join(5)
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.queue_depth == 1
+    assert rejected.value.retry_after >= 1
+    assert order == ["queued"]
+
+
+def test_queue_timeout_is_rejected_with_503_and_retry_after(client, monkeypatch):
+    import main
+
+    controller = AdmissionController(max_concurrent=1, max_queued=1, queue_timeout_seconds=0.2)
+    monkeypatch.setattr(main, "admission", controller)
+
+    with controller.slot():
+        with pytest.raises(AdmissionRejected) as rejected:
+            with controller.slot():
+                pass
+        assert rejected.value.status_code == 503
+        assert rejected.value.reason == "queue_timeout"
+        assert controller.queue_depth == 0
+
+        # HTTP katmanı aynı reddi Retry-After başlığıyla döner
+        response = client.post("/optimize", json=make_problem(customers=8, vehicles=2))
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert controller.running == 0
@@ -0,0 +1,85 @@
+import time
+
+from conftest import make_problem, to_columns
+
+
+def _wait_for_job(client, job_id: str, timeout: float = 60) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"Job {job_id} did not finish in {timeout}s")
+
+
+def test_optimize_accepts_columnar_customers(client):
+    problem = make_problem(customers=20, seed=1)
+    problem["customers"] = to_columns(problem["customers"])
+
+    response = client.post("/optimize", json=problem)
+
+    assert response.status_code == 200, response.text
+    served = {stop["customer_id"] for route in response.json()["routes"] for stop in route["stops"]}
+    assert served == set(problem["customers"]["id"])
+
+
+def test_jobs_accepts_columnar_customers(client):
+    problem = make_problem(customers=20, seed=2)
+    problem["customers"] = to_columns(problem["customers"])
+
+    response = client.post("/jobs", json=problem)
+
+    assert response.status_code == 202, response.text
+    job = _wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed", job["error"]
+    assert job["result"]["success"]
+
+
+def test_jobs_rejects_invalid_columns_before_queueing(client):
+    problem = make_problem(customers=5, seed=3)
+    columns = to_columns(problem["customers"])
+    columns["lat"] = columns["lat"][:-1]
+    problem["customers"] = columns
+
+    response = client.post("/jobs", json=problem)
+
+    assert response.status_code == 400
+    assert "lat" in response.json()["detail"]
+
+
+def test_optimize_rejects_invalid_columns(client):
+    problem = make_problem(customers=5, seed=3)
+    columns = to_columns(problem["customers"])
+    problem["customers"] = {**columns, "demand": columns["demand"][:-1]}
+
+    response = client.post("/optimize", json=problem)
+    assert response.status_code == 400
+    assert "demand" in response.json()["detail"]
+
+    columns["lat"][2] = float("nan")
+    problem["customers"] = columns
+    response = client.post("/optimize", json=problem)
+    assert response.status_code == 400
+    assert "invalid coordinates" in response.json()["detail"]
+
+
+def test_matrix_builder_receives_columnar_coordinates(monkeypatch):
+    import numpy as np
+
+    import ortools_optimizer
+    from columnar import customers_from_columns
+
+    problem = make_problem(customers=20, seed=4)
+    customers = customers_from_columns(to_columns(problem["customers"]))
+    built = []
+    distance_matrix = ortools_optimizer._distance_matrix
+    monkeypatch.setattr(ortools_optimizer, "_distance_matrix",
+                        lambda locations, *args: built.append(locations) or distance_matrix(locations, *args))
+
+    ortools_optimizer.optimize_routes(depots=problem["depots"], customers=customers, vehicles=problem["vehicles"],
+                                      fuel_price=problem["fuel_price"], osrm_url=problem["osrm_url"],
+                                      time_limit_seconds=1, max_workers=1)
+    # Depo + müşteri koordinatları tek n×2 dizi; müşteri satırları doğrulanmış sütunların kendisi
+    assert isinstance(built[0], np.ndarray) and built[0].shape == (21, 2)
+    assert np.array_equal(built[0][1:, 0], customers.lat)
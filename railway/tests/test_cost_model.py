@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from cost_model import COST_FIELDS, VEHICLE_TYPES, apply_route_costs, route_cost_fields, route_costs
+
+FUEL_PRICES = [0.0, 42.35, 47.50, 61.99]
+
+
+def _baseline_costs(route_distance_km: float, vehicle_type: int, fuel_price: float) -> dict:
+    """cost_model öncesi optimizer'daki rota başına hesap"""
+    fuel_consumption = VEHICLE_TYPES[vehicle_type]["fuel"]
+    fuel_cost = (route_distance_km / 100) * fuel_consumption * fuel_price
+    distance_cost = route_distance_km * 2.5
+    fixed_cost = 500.0
+    toll_cost = route_distance_km * 0.5
+    total_cost = fuel_cost + distance_cost + fixed_cost + toll_cost
+    return {
+        "fuel_cost": round(fuel_cost, 2),
+        "distance_cost": round(distance_cost, 2),
+        "fixed_cost": round(fixed_cost, 2),
+        "toll_cost": round(toll_cost, 2),
+        "total_cost": round(total_cost, 2),
+    }
+
+
+@pytest.mark.parametrize("fuel_price", FUEL_PRICES)
+def test_route_costs_match_baseline_per_route(fuel_price):
+    rng = np.random.default_rng(21)
+    vehicle_types = np.repeat(sorted(VEHICLE_TYPES), 50)
+    distances = np.round(rng.uniform(0, 1500, len(vehicle_types)), 2)
+
+    routes = [{"distance_km": float(d), "vehicle_type": int(t)} for d, t in zip(distances, vehicle_types)]
+    apply_route_costs(routes, fuel_price)
+    costs = route_costs(distances, vehicle_types, fuel_price)
+
+    for i, route in enumerate(routes):
+        expected = _baseline_costs(route["distance_km"], route["vehicle_type"], fuel_price)
+        assert {field: route[field] for field in COST_FIELDS} == expected
+        assert route_cost_fields(route["distance_km"], route["vehicle_type"], fuel_price) == expected
+        assert {field: round(float(costs[field][i]), 2) for field in COST_FIELDS} == expected
+
+
+def test_route_costs_rejects_unknown_vehicle_type():
+    with pytest.raises(ValueError, match=r"\[7\]"):
+        route_costs([10.0, 20.0], [0, 7], 47.50)
@@ -0,0 +1,132 @@
+import numpy as np
+
+from insertion import cheapest_insertion, relocate_and_insert
+
+# Düz bir hat üzerinde depo (0) ve müşteriler: mesafe = |x_i - x_j| km, süre 60 km/h ile dakika
+POSITIONS_KM = [0, 1, 2, 3, 4]
+DEPOT = {"id": "D1", "name": "Depo", "location": {"lat": 39.0, "lng": 32.0}}
+
+
+def _line_matrices(positions_km):
+    x = np.asarray(positions_km, dtype=np.int64)
+    distance_matrix = np.abs(x[:, None] - x[None, :]) * 1000
+    return distance_matrix, distance_matrix // 1000
+
+
+def test_cheapest_insertion_places_node_between_neighbours():
+    distance_matrix, time_matrix = _line_matrices(POSITIONS_KM)
+    routes, unplaced = cheapest_insertion(
+        [[1, 3], []], [2], distance_matrix, demands=[0, 1, 1, 1, 1], capacities=[10, 10],
+        time_matrix=time_matrix, max_route_minutes=1440, fixed_vehicle_cost=10000
+    )
+    assert routes == [[1, 2, 3], []]
+    assert unplaced == []
+
+
+def test_cheapest_insertion_respects_capacity():
+    distance_matrix, time_matrix = _line_matrices(POSITIONS_KM)
+    demands = [0, 1, 1, 1, 1]
+
+    # Dolu rota atlanır, boş araç sabit maliyetine rağmen açılır
+    routes, unplaced = cheapest_insertion(
+        [[1, 3], []], [2], distance_matrix, demands, capacities=[2, 10], fixed_vehicle_cost=10000
+    )
+    assert routes == [[1, 3], [2]]
+    assert unplaced == []
+
+    routes, unplaced = cheapest_insertion([[1, 3]], [2], distance_matrix, demands, capacities=[2])
+    assert routes == [[1, 3]]
+    assert unplaced == [2]
+
+
+def test_cheapest_insertion_rejects_routes_over_max_minutes():
+    # 4 numaralı müşteri 800 km uzakta: gidiş-dönüş 1600 dk > 1440
+    distance_matrix, time_matrix = _line_matrices([0, 1, 2, 3, 800])
+    routes, unplaced = cheapest_insertion(
+        [[1], []], [4], distance_matrix, demands=[0, 1, 1, 1, 1], capacities=[10, 10],
+        time_matrix=time_matrix, max_route_minutes=1440
+    )
+    assert routes == [[1], []]
+    assert unplaced == [4]
+
+
+def test_relocate_makes_room_for_node():
+    distance_matrix, time_matrix = _line_matrices(POSITIONS_KM)
+    demands = [0, 2, 2, 1, 0]
+    capacities = [3, 2]
+
+    # A=[1] (2/3) ve B=[3] (1/2): 2 numaralı düğüm (2 palet) hiçbir rotaya doğrudan sığmaz
+    routes, unplaced = cheapest_insertion([[1], [3]], [2], distance_matrix, demands, capacities)
+    assert unplaced == [2]
+
+    # 3 A'ya taşınınca B'de yer açılır
+    routes, placed = relocate_and_insert(
+        [[1], [3]], 2, distance_matrix, demands, capacities, time_matrix=time_matrix, max_route_minutes=1440
+    )
+    assert placed
+    assert sorted(routes[0]) == [1, 3]
+    assert routes[1] == [2]
+
+
+def _stop(customer_id, lng, demand):
+    return {"customer_id": customer_id, "customer_name": customer_id, "location": {"lat": 39.1, "lng": lng},
+            "demand": demand, "service_time": 10}
+
+
+def _customer(customer_id, lng, demand, lat=39.1):
+    return {"id": customer_id, "name": customer_id, "location": {"lat": lat, "lng": lng},
+            "demand_pallets": demand, "depot_id": "D1"}
+
+
+# Depo güneyde, duraklar doğu-batı hattında: C2 yalnızca C1 ile C3 arasına ek mesafesiz girer
+def _route():
+    return {"vehicle_id": "V1", "vehicle_type": 0, "depot_id": "D1",
+            "stops": [_stop("C1", 32.0, 4), _stop("C3", 32.2, 4)]}
+
+
+VEHICLES = [{"id": "V1", "type": 0, "capacity_pallets": 10}, {"id": "V2", "type": 0, "capacity_pallets": 10}]
+
+
+def test_insert_customers_fetches_only_new_rows_and_columns(monkeypatch):
+    import ortools_optimizer
+    from order_insertion import insert_customers
+
+    calls = []
+
+    def fetch_table(locations, osrm_url, sources, destinations, stats=None):
+        calls.append((list(sources), list(destinations)))
+        full = ortools_optimizer.haversine_matrix(locations)
+        return [[int(full[i, j]) for j in destinations] for i in sources]
+
+    monkeypatch.setattr(ortools_optimizer, "fetch_table", fetch_table)
+
+    result = insert_customers([_route()], [_customer("C2", 32.1, 2)], VEHICLES, [DEPOT])
+
+    # Düğümler: depo 0, mevcut duraklar 1-2, yeni müşteri 3
+    assert calls and all(sources == [3] or destinations == [3] for sources, destinations in calls)
+    assert result["inserted"] == [{"customer_id": "C2", "vehicle_id": "V1", "depot_id": "D1", "method": "insertion"}]
+    assert [stop["customer_id"] for stop in result["routes"][0]["stops"]] == ["C1", "C2", "C3"]
+    assert result["routes"][0]["total_pallets"] == 10
+    assert result["summary"]["opened_routes"] == 0
+
+
+def test_insert_customers_opens_new_vehicle_when_full():
+    from order_insertion import insert_customers
+
+    result = insert_customers([_route()], [_customer("C2", 32.1, 3)], VEHICLES, [DEPOT])
+
+    assert result["inserted"] == [{"customer_id": "C2", "vehicle_id": "V2", "depot_id": "D1", "method": "new_vehicle"}]
+    assert [stop["customer_id"] for stop in result["routes"][0]["stops"]] == ["C1", "C3"]
+    assert [stop["customer_id"] for stop in result["routes"][1]["stops"]] == ["C2"]
+    assert result["summary"]["opened_routes"] == 1
+
+
+def test_insert_customers_leaves_unreachable_customer_unplaced():
+    from order_insertion import insert_customers
+
+    # ~1500 km uzakta: tek yön bile 1440 dakikayı aşar; kapasite sorunu yok
+    result = insert_customers([_route()], [_customer("FAR", 32.0, 1, lat=52.5)], VEHICLES, [DEPOT])
+
+    assert result["inserted"] == []
+    assert result["unplaced"] == ["FAR"]
+    assert result["routes"] == [_route()]
@@ -0,0 +1,48 @@
+import numpy as np
+
+from conftest import make_problem
+
+
+def _locations(problem: dict) -> list:
+    return [(d["location"]["lat"], d["location"]["lng"]) for d in problem["depots"]] + \
+           [(c["location"]["lat"], c["location"]["lng"]) for c in problem["customers"]]
+
+
+def _shared_matrix(problem: dict, durations_factor: float = None):
+    from location_matrix import LocationMatrix
+    from ortools_optimizer import haversine_matrix
+
+    locations = _locations(problem)
+    distances = haversine_matrix(locations).astype(np.int64)
+    # 60 km/h = metre başına 0.06 sn; durations_factor kat daha yavaş yollar
+    durations = distances * 0.06 * durations_factor if durations_factor else None
+    return LocationMatrix(locations, distances, durations)
+
+
+def test_time_matrix_uses_known_durations():
+    from ortools_optimizer import _build_time_matrix
+
+    distances = np.array([[0, 60000], [60000, 0]])
+    durations = np.array([[0, 7200], [-1, 0]])  # 0 -> 1 OSRM'e göre 2 saat, 1 -> 0 bilinmiyor
+
+    # Servis süresi varış sütununa eklenir; bilinmeyen çift 60 km/h ile hesaplanır
+    assert _build_time_matrix(distances, [0, 15], durations).tolist() == [[0, 135], [60, 15]]
+    assert _build_time_matrix(distances, [0, 15]).tolist() == [[0, 75], [60, 15]]
+
+
+def test_solver_reads_precomputed_durations():
+    from ortools_optimizer import _distance_matrix, optimize_routes
+
+    problem = make_problem(customers=12, seed=8, vehicles=4)
+    problem.update({"plateau_window_seconds": 0, "max_workers": 1})
+    shared = _shared_matrix(problem, durations_factor=3)
+
+    stats = {}
+    _, durations = _distance_matrix(_locations(problem), problem["osrm_url"], stats, shared)
+    assert durations is not None and stats["duration_pairs"] == 13 * 13
+
+    baseline = optimize_routes(**problem, shared_matrix=_shared_matrix(problem))
+    slow = optimize_routes(**problem, shared_matrix=shared)
+    assert baseline["summary"]["matrix"]["osrm_pairs"] == slow["summary"]["matrix"]["osrm_pairs"] == 0
+    # Seyahat süreleri 3 katı: aynı mesafelerde rota süreleri uzar
+    assert sum(r["duration_minutes"] for r in slow["routes"]) > sum(r["duration_minutes"] for r in baseline["routes"])
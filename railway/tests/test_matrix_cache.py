@@ -0,0 +1,44 @@
+import pytest
+
+from matrix_cache import DistanceMatrixCache
+
+LOCATIONS = [(37.0 + i / 100, 35.3 + i / 100) for i in range(6)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DistanceMatrixCache(str(tmp_path / "matrix.sqlite3"), ttl_seconds=3600, max_entries=20)
+
+
+def _count(cache: DistanceMatrixCache) -> int:
+    return cache._conn.execute("SELECT COUNT(*) FROM distances").fetchone()[0]
+
+
+def test_evict_is_amortized_across_stores(cache, monkeypatch):
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: evictions.append(1) or evict())
+
+    # İlk yazım sayımı başlatır; sınırın altındaki sonraki yazımlar silme çalıştırmaz
+    cache.store("ns", LOCATIONS, [0, 1], [0, 1], [[0, 1], [1, 0]])
+    cache.store("ns", LOCATIONS, [2, 3], [2, 3], [[0, 1], [1, 0]])
+    cache.store("ns", LOCATIONS, [4], [4, 5], [[0, 1]])
+    assert len(evictions) == 1
+    assert cache._row_count == 10
+
+    # Sınırı aşan yazım silmeyi tetikler, en eskiler sınırın %90'ına kadar gider
+    cache.store("ns", LOCATIONS, [0, 1, 2, 3], [4, 5], [[1, 2], [3, 4], [5, 6], [7, 8]])
+    cache.store("ns", LOCATIONS, [4, 5], [0, 1, 2, 3], [[1, 2, 3, 4], [5, 6, 7, 8]])
+    assert len(evictions) == 2
+    assert _count(cache) == cache._row_count == 18
+
+
+def test_lookup_filters_destinations_in_sql(cache):
+    cache.store("ns", LOCATIONS, [0, 1, 2], [0, 1, 2, 3, 4, 5],
+                [[0, 1, 2, 3, 4, 5], [6, 0, 7, 8, 9, 10], [11, 12, 0, 13, 14, 15]])
+
+    assert cache.lookup("ns", LOCATIONS[:2] + [LOCATIONS[4]]) == [[0, 1, 4], [6, 0, 9], [None, None, None]]
+    assert cache.lookup_pairs("ns", LOCATIONS, [1, 3], [2, 5]) == {(1, 2): 7, (1, 5): 10}
+    assert cache.lookup("other", LOCATIONS[:2]) == [[None, None], [None, None]]
+    # Geçici anahtar tabloları sorgudan sonra boşalır
+    assert cache._conn.execute("SELECT COUNT(*) FROM lookup_src").fetchone()[0] == 0
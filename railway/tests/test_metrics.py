@@ -0,0 +1,37 @@
+import pickle
+
+from prometheus_client import REGISTRY
+
+from conftest import make_problem
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_failed_solve_records_reason(client):
+    before = _sample("vrp_solve_failures_total", reason="invalid_request")
+    problem = make_problem(customers=20, seed=2, vehicles=1)  # Kapasite yetersiz
+
+    response = client.post("/optimize", json=problem)
+    assert response.status_code == 400
+    assert _sample("vrp_solve_failures_total", reason="invalid_request") == before + 1
+
+
+def test_no_solution_records_solver_status_and_tiles():
+    import main
+    from ortools_optimizer import NoSolutionFound
+    from solver_pool import SolverWorkerError
+
+    statuses = _sample("vrp_solver_status_total", status="ROUTING_FAIL_TIMEOUT")
+    tiles = _sample("vrp_osrm_tile_failures_total")
+    deadlines = _sample("vrp_solve_failures_total", reason="deadline")
+
+    # Çözücü işçisinden pickle ile dönen hata durumunu ve matris istatistiklerini korur
+    error = pickle.loads(pickle.dumps(NoSolutionFound("No solution", "ROUTING_FAIL_TIMEOUT", {"osrm_failed_tiles": 2})))
+    main.record_solve_failure(error)
+    main.record_solve_failure(SolverWorkerError("deadline", "Solve exceeded wall-clock deadline"))
+
+    assert _sample("vrp_solver_status_total", status="ROUTING_FAIL_TIMEOUT") == statuses + 1
+    assert _sample("vrp_osrm_tile_failures_total") == tiles + 2
+    assert _sample("vrp_solve_failures_total", reason="deadline") == deadlines + 1
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import make_problem
+
+ADANA = {"id": "adana", "location": {"lat": 37.0, "lng": 35.32}}
+MERSIN = {"id": "mersin", "location": {"lat": 36.8, "lng": 34.63}}
+
+
+def _joint_problem(pinned: int) -> dict:
+    """Adana çevresinde müşteriler; ilk pinned müşteri Mersin'e sabitlenir"""
+    problem = make_problem(customers=12, seed=9, vehicles=6)
+    problem["depots"] = [ADANA, MERSIN]
+    for i, customer in enumerate(problem["customers"]):
+        customer["depot_id"] = "mersin" if i < pinned else None
+    problem.update({"multi_depot_mode": "joint", "plateau_window_seconds": 0})
+    return problem
+
+
+def test_joint_mode_keeps_customers_on_their_depot():
+    from ortools_optimizer import optimize_routes
+
+    problem = _joint_problem(pinned=2)
+    # Adana araçları Mersin müşterisine daha yakın olsa da sabitlenen müşteriler Mersin araçlarıyla gider
+    problem["vehicles"][0]["depot_id"] = "mersin"
+    result = optimize_routes(**problem)
+
+    served_from = {stop["customer_id"]: route["depot_id"] for route in result["routes"] for stop in route["stops"]}
+    assert served_from["c0"] == served_from["c1"] == "mersin"
+    assert len(served_from) == 12
+
+
+def test_joint_mode_rejects_pinned_demand_over_depot_fleet():
+    from ortools_optimizer import optimize_routes
+
+    problem = _joint_problem(pinned=6)
+    for vehicle in problem["vehicles"]:
+        vehicle["depot_id"] = "adana"
+    problem["vehicles"][0].update({"depot_id": "mersin", "capacity_pallets": 2})
+
+    with pytest.raises(ValueError, match="Insufficient capacity at depot mersin"):
+        optimize_routes(**problem)
@@ -0,0 +1,27 @@
+import threading
+import time
+
+
+def test_session_is_created_once_under_concurrency(monkeypatch):
+    import osrm_client
+
+    created = []
+    session_class = osrm_client.requests.Session
+
+    def slow_session():
+        created.append(1)
+        time.sleep(0.05)  # Yarış penceresini genişlet: kilitsiz kurulumda her thread kendi oturumunu açardı
+        return session_class()
+
+    monkeypatch.setattr(osrm_client, "_session", None)
+    monkeypatch.setattr(osrm_client.requests, "Session", slow_session)
+
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(osrm_client.get_session())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(created) == 1
+    assert len(sessions) == 8 and all(session is sessions[0] for session in sessions)
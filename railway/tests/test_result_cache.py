@@ -0,0 +1,58 @@
+import threading
+import time
+
+from result_cache import ResultCache
+
+
+def _result(stop_reason: str) -> dict:
+    return {"routes": [], "summary": {"search": [{"stop_reason": stop_reason}]}}
+
+
+def _run_with_follower(cache: ResultCache, leader_result: dict) -> tuple:
+    """Lider çözüm sürerken aynı anahtarla ikinci istek gelir; (lider, takipçi sonucu, takipçi compute sayısı)"""
+    release = threading.Event()
+    follower_calls = []
+    results = {}
+
+    def leader():
+        release.wait(5)
+        return leader_result
+
+    def follower():
+        follower_calls.append(1)
+        return _result("time_limit")
+
+    leader_thread = threading.Thread(target=lambda: results.update(leader=cache.get_or_compute("k", leader)))
+    leader_thread.start()
+    deadline = time.monotonic() + 5
+    while "k" not in cache._in_flight:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    follower_thread = threading.Thread(target=lambda: results.update(follower=cache.get_or_compute("k", follower)))
+    follower_thread.start()
+    time.sleep(0.1)
+    release.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+    return results["leader"], results["follower"], len(follower_calls)
+
+
+def test_follower_shares_complete_result():
+    leader, follower, calls = _run_with_follower(ResultCache(max_entries=4), _result("time_limit"))
+
+    assert leader["summary"]["result_cache"] == "miss"
+    assert follower["summary"]["result_cache"] == "shared"
+    assert calls == 0
+
+
+def test_follower_reruns_when_leader_was_stopped():
+    cache = ResultCache(max_entries=4)
+    leader, follower, calls = _run_with_follower(cache, _result("stopped"))
+
+    assert leader["summary"]["search"][0]["stop_reason"] == "stopped"
+    # Takipçi kısmi sonucu almaz, kendi aramasını yapar ve tam sonucu önbelleğe yazar
+    assert calls == 1
+    assert follower["summary"]["result_cache"] == "miss"
+    assert follower["summary"]["search"][0]["stop_reason"] == "time_limit"
+    assert cache.get_or_compute("k", lambda: _result("unused"))["summary"]["result_cache"] == "hit"
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from conftest import make_problem
+
+
+def test_limit_checks_events_and_plateau_without_new_solutions():
+    from ortools_optimizer import _SearchMonitor
+
+    cancel_event = threading.Event()
+    monitor = _SearchMonitor(None, cancel_event=cancel_event, plateau_window_seconds=1)
+    assert not monitor.should_stop()
+    cancel_event.set()
+    monitor._next_check = 0.0
+    assert monitor.should_stop() and monitor.stop_reason == "cancelled"
+
+    # Son iyileşmeden bu yana çözüm gelmese de plato süresi dolunca durur
+    monitor = _SearchMonitor(None, plateau_window_seconds=1)
+    monitor.best_objective, monitor.start_time = 1000, time.monotonic() - 2
+    assert monitor.should_stop() and monitor.stop_reason == "plateau"
+
+    # Erken bitirme ilk çözümü bekler
+    stop_event = threading.Event()
+    stop_event.set()
+    monitor = _SearchMonitor(None, stop_event=stop_event)
+    assert not monitor.should_stop()
+    monitor.best_objective, monitor._next_check = 1000, 0.0
+    assert monitor.should_stop() and monitor.stop_reason == "stopped"
+
+
+def test_stop_event_ends_search_before_time_limit():
+    from ortools_optimizer import optimize_routes
+
+    problem = make_problem(customers=40, seed=8)
+    stop_event = threading.Event()
+    threading.Timer(1.0, stop_event.set).start()
+    started = time.monotonic()
+    result = optimize_routes(depots=problem["depots"], customers=problem["customers"], vehicles=problem["vehicles"],
+                             fuel_price=problem["fuel_price"], osrm_url=problem["osrm_url"], time_limit_seconds=30,
+                             plateau_window_seconds=0, stop_event=stop_event, max_workers=1)
+    assert time.monotonic() - started < 10
+    assert result["summary"]["search"][0]["stop_reason"] == "stopped"
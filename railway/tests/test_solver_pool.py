@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import make_problem
+
+
+@pytest.fixture
+def pool():
+    from solver_pool import SolverPool
+
+    # Pay, kümelerin sıralı turları + sınır onarımından kısa: sınır yalnızca zaman limiti + pay olsaydı
+    # çözüm öldürülürdü
+    solver_pool = SolverPool(size=1, grace_seconds=3)
+    solver_pool.start()
+    yield solver_pool
+    solver_pool.shutdown()
+
+
+def test_deadline_covers_decomposed_clusters(pool):
+    from ortools_optimizer import _search_plan, optimize_routes
+
+    problem = make_problem(customers=200, seed=3)
+    customers = problem.pop("customers")
+    options = {**problem, "time_limit_seconds": 3, "decomposition_threshold": 40, "max_workers": 1,
+               "plateau_window_seconds": 0}
+
+    plans = []
+    optimize_routes(customers=customers, plan_callback=plans.append,
+                    **{**options, "time_limit_seconds": 1})
+    # 2 küme sırayla (tek işçi) + 1 onarım turu
+    assert plans == [{"tasks": 2, "workers": 1, "search_budget_s": 3}]
+    assert _search_plan([None] * 2, 4, 1, portfolio_size=2)["search_budget_s"] == 1
+
+    result = pool.solve(customers, **options)
+    assert result["summary"]["decomposition"]["d0"]["clusters"] == 2
+    assert pool.restarts == 0
+
+
+def test_depot_pool_shares_cores_between_workers(monkeypatch):
+    import solver_pool
+
+    monkeypatch.setattr(solver_pool.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(solver_pool, "DEFAULT_DEPOT_WORKERS", 8)
+    assert solver_pool.SolverPool(size=4).depot_workers == 2
+    assert solver_pool.SolverPool(size=16).depot_workers == 1
+
+
+def test_batch_scenarios_run_in_pool_workers(pool):
+    from scenario_batch import optimize_batch
+
+    problem = make_problem(customers=20, seed=5)
+    result = optimize_batch(
+        depots=problem["depots"], customers=problem["customers"], vehicles=problem["vehicles"],
+        scenarios=[{"name": "baseline"}, {"name": "diesel", "fuel_price": 55.0}],
+        fuel_price=problem["fuel_price"], osrm_url=problem["osrm_url"],
+        solve_options={"time_limit_seconds": 1}, solve=pool.solve,
+    )
+    assert result["summary"]["solved"] == 2
+    assert result["scenarios"][1]["delta"]["total_cost"] > 0
+    assert pool.restarts == 0
+
+
+def test_batch_scenarios_are_solved_concurrently():
+    import threading
+
+    from ortools_optimizer import optimize_routes
+    from scenario_batch import optimize_batch
+
+    # Her çözüm diğeri başlayana kadar bekler: senaryolar sırayla çözülseydi bariyer zaman aşımına düşerdi
+    barrier = threading.Barrier(2, timeout=30)
+
+    def solve(**kwargs):
+        barrier.wait()
+        if kwargs["fuel_price"] > 60:
+            raise RuntimeError("boom")
+        return optimize_routes(**kwargs)
+
+    problem = make_problem(customers=10, seed=6, vehicles=5)
+    result = optimize_batch(
+        depots=problem["depots"], customers=problem["customers"], vehicles=problem["vehicles"],
+        scenarios=[{"name": "baseline"}, {"name": "expensive", "fuel_price": 70.0}],
+        fuel_price=problem["fuel_price"], osrm_url=problem["osrm_url"],
+        solve_options={"time_limit_seconds": 1}, solve=solve, max_workers=2,
+    )
+    assert result["summary"]["solved"] == 1
+    assert result["scenarios"][1] == {"name": "expensive", "success": False, "error": "boom"}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Haversine fallback matrisi benchmark'ı
+Eski iç içe Python döngüsü ile NumPy vektörel sürümü karşılaştırır (süre + en büyük fark)
+
+Kullanım: python3 scripts/bench_haversine.py [nokta_sayısı ...]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'railway'))
+from ortools_optimizer import haversine_distance, haversine_matrix
+
+
+def loop_matrix(locations):
+    """Önceki fallback uygulaması (referans)"""
+    matrix = []
+    for i, loc1 in enumerate(locations):
+        row = []
+        for j, loc2 in enumerate(locations):
+            if i == j:
+                row.append(0)
+            else:
+                dist = haversine_distance(loc1[0], loc1[1], loc2[0], loc2[1])
+                row.append(int(dist * 1000))  # km'den metreye
+        matrix.append(row)
+    return matrix
+
+
+def random_locations(n, seed=42):
+    """Adana çevresinde rastgele noktalar"""
+    rng = random.Random(seed)
+    return [(37.0 + rng.uniform(-0.5, 0.5), 35.32 + rng.uniform(-0.5, 0.5)) for _ in range(n)]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500, 1000, 2000]
+    
+    print("=" * 60)
+    print("HAVERSINE MATRİS BENCHMARK")
+    print("=" * 60)
+    print(f"{'Nokta':>6} {'Döngü (s)':>12} {'NumPy (s)':>12} {'Hızlanma':>10} {'Maks fark (m)':>14}")
+    
+    for n in sizes:
+        locations = random_locations(n)
+        
+        start = time.perf_counter()
+        reference = loop_matrix(locations)
+        loop_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        vectorized = haversine_matrix(locations)
+        numpy_time = time.perf_counter() - start
+        
+        max_diff = max(
+            abs(reference[i][j] - int(vectorized[i, j]))
+            for i in range(n) for j in range(n)
+        )
+        print(f"{n:>6} {loop_time:>12.3f} {numpy_time:>12.4f} {loop_time / numpy_time:>9.0f}x {max_diff:>14}")
+
+
+if __name__ == '__main__':
+    main()
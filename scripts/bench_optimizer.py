@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+OR-Tools optimizer ölçekleme benchmark'ı
+Seed'li sentetik senaryolar (25 - 2.000 müşteri, 1 - 5 depo) Adana/İzmir kurulumlarına göre
+üretilir ve railway/ortools_optimizer.py ile çözülür. OSRM yerine yerel bir sahte Table API
+sunucusu kullanılır (çevrimdışı çalışır). Her senaryo ayrı bir süreçte koşar; faz süreleri
+(matris, model, arama, çıkarım), tepe RSS ve amaç değeri JSON olarak yazılır, böylece
+commit'ler arası karşılaştırılabilir.
+
+Kullanım:
+  python3 scripts/bench_optimizer.py                                # varsayılan set
+  python3 scripts/bench_optimizer.py --sizes 25,100 --depots 1,3    # kartezyen çarpım
+  python3 scripts/bench_optimizer.py --time-limit 5 --output bench.json
+  python3 scripts/bench_optimizer.py --depots 3,5 --sizes 250,500 --modes per_depot,joint
+                                                                    # çok depolu: ayrı çözüm vs tek model
+  python3 scripts/bench_optimizer.py --sizes 500,1000 --knn-k 0,10,20   # ark budaması karşılaştırması
+  python3 scripts/bench_optimizer.py --depots 1 --sizes 300 --portfolio 1,4 --workers 4
+                                                                    # tek strateji vs portföy yarışı
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+RAILWAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'railway')
+
+# Repo'daki depolar (030-create-adana-depot.sql, 021-update-izmir-coordinates.sql, 002-seed-depots.sql)
+DEPOTS = [
+    {"id": "adana", "name": "Adana Merkez Depo", "location": {"lat": 36.9932508, "lng": 35.3256885}},
+    {"id": "izmir", "name": "İzmir Ege Depo", "location": {"lat": 38.4650333, "lng": 27.3426415}},
+    {"id": "istanbul", "name": "İstanbul Ana Depo", "location": {"lat": 41.1082, "lng": 28.7292}},
+    {"id": "ankara", "name": "Ankara Merkez Depo", "location": {"lat": 39.9738, "lng": 32.7560}},
+    {"id": "mersin", "name": "Mersin Depo", "location": {"lat": 36.8121, "lng": 34.6415}},
+]
+
+# Seed senaryolarındaki işletme karışımı ve tipik palet talepleri
+BUSINESS_MIX = [("MCD", 0.35, (3, 8)), ("IKEA", 0.1, (4, 10)), ("CHL", 0.25, (1, 4)), ("OPT", 0.3, (1, 3))]
+FLEET_MIX = [0, 1, 2, 2, 3, 4]  # VEHICLE_TYPES anahtarları
+FLEET_CAPACITY = {0: 10, 1: 14, 2: 18, 3: 32, 4: 36}
+FLEET_FUEL = {0: 15, 1: 20, 2: 30, 3: 35, 4: 40}
+
+DEFAULT_SUITE = [(25, 1), (50, 1), (100, 2), (250, 2), (500, 3), (1000, 4), (2000, 5)]
+
+ROAD_FACTOR = 1.3  # Sahte OSRM: kuş uçuşu × yol katsayısı
+
+
+def build_instance(num_customers, num_depots, seed=42):
+    """Depo başına şehir yarıçapında (~15 km) dağılmış müşteriler + talebe göre filo"""
+    rng = random.Random(seed * 10007 + num_customers * 31 + num_depots)
+    depots = DEPOTS[:num_depots]
+    customers = []
+    for i in range(num_customers):
+        depot = depots[i % num_depots]
+        business_type, _, (low, high) = rng.choices(BUSINESS_MIX, weights=[b[1] for b in BUSINESS_MIX])[0]
+        customers.append({
+            "id": f"c{i}",
+            "name": f"{business_type} {depot['id']} {i}",
+            "location": {
+                "lat": depot["location"]["lat"] + rng.uniform(-0.15, 0.15),
+                "lng": depot["location"]["lng"] + rng.uniform(-0.15, 0.15),
+            },
+            "demand_pallets": rng.randint(low, high),
+            "business_type": business_type,
+            "service_duration": 15,
+            "depot_id": depot["id"],
+        })
+
+    # Depo başına filo (kapasite ≈ depo talebinin 1.5 katı), depo sırasıyla art arda:
+    # optimize_routes araçları listedeki sırayla ve talep oranında depolara dağıtır
+    vehicles = []
+    for depot in depots:
+        depot_demand = sum(c["demand_pallets"] for c in customers if c["depot_id"] == depot["id"])
+        capacity = 0
+        while capacity < depot_demand * 1.5 + FLEET_CAPACITY[4]:
+            vehicle_type = FLEET_MIX[len(vehicles) % len(FLEET_MIX)]
+            vehicles.append({
+                "id": f"v{len(vehicles)}",
+                "type": vehicle_type,
+                "capacity_pallets": FLEET_CAPACITY[vehicle_type],
+                "fuel_consumption": FLEET_FUEL[vehicle_type],
+            })
+            capacity += FLEET_CAPACITY[vehicle_type]
+    return {"depots": depots, "customers": customers, "vehicles": vehicles}
+
+
+class _StubOSRMHandler(BaseHTTPRequestHandler):
+    """OSRM Table API (sources/destinations destekli), Haversine × ROAD_FACTOR"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        coords = np.array([
+            [float(v) for v in c.split(',')] for c in url.path.rsplit('/', 1)[-1].split(';')
+        ])
+        query = urllib.parse.parse_qs(url.query)
+        all_indices = list(range(len(coords)))
+        sources = [int(x) for x in query['sources'][0].split(';')] if 'sources' in query else all_indices
+        destinations = [int(x) for x in query['destinations'][0].split(';')] if 'destinations' in query else all_indices
+
+        lng, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+        src_lat, src_lng = lat[sources][:, None], lng[sources][:, None]
+        dst_lat, dst_lng = lat[destinations][None, :], lng[destinations][None, :]
+        a = np.sin((dst_lat - src_lat) / 2) ** 2 + \
+            np.cos(src_lat) * np.cos(dst_lat) * np.sin((dst_lng - src_lng) / 2) ** 2
+        distances = 6371000 * 2 * np.arcsin(np.sqrt(a)) * ROAD_FACTOR
+
+        body = json.dumps({"code": "Ok", "distances": np.round(distances, 1).tolist()}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_osrm():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubOSRMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _peak_rss_mb():
+    """Bu süreç ve alt süreçlerinin tepe RSS'i (Linux: KB, macOS: byte)"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / scale, 1)
+
+
+@contextlib.contextmanager
+def _silenced_stdout():
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def run_instance(num_customers, num_depots, seed, osrm_url, time_limit, workers, mode="per_depot", knn_k=0,
+                 portfolio_size=0):
+    """Alt süreçte tek senaryo: optimizer'ın kendi faz süreleri + duvar saati + tepe RSS"""
+    sys.path.insert(0, RAILWAY_DIR)
+    from ortools_optimizer import optimize_routes
+
+    instance = build_instance(num_customers, num_depots, seed)
+    start = time.perf_counter()
+    # Optimizer logları tabloyu bozmasın (depo alt süreçleri fd 1'i devralır: fd düzeyinde yönlendir)
+    with _silenced_stdout():
+        result = optimize_routes(
+            instance["depots"], instance["customers"], instance["vehicles"],
+            osrm_url=osrm_url, time_limit_seconds=time_limit, max_workers=workers,
+            plateau_window_seconds=0,  # Süre limiti boyunca ara: commit'ler arası eşit bütçe
+            multi_depot_mode=mode,
+            knn_k=knn_k,
+            portfolio_size=portfolio_size
+        )
+    wall = time.perf_counter() - start
+
+    search = result["summary"]["search"]
+    phases = {}
+    for stats in search:
+        for phase, seconds in stats.get("timings", {}).items():
+            phases[phase] = round(phases.get(phase, 0) + seconds, 3)
+
+    return {
+        "customers": num_customers,
+        "depots": num_depots,
+        "mode": mode,
+        "knn_k": knn_k,
+        "portfolio_size": portfolio_size,
+        "vehicles": len(instance["vehicles"]),
+        "seed": seed,
+        "wall_s": round(wall, 3),
+        "phases_s": phases,  # Depolar toplamı
+        "peak_rss_mb": _peak_rss_mb(),
+        "objective": sum(stats.get("objective") or 0 for stats in search),
+        "solutions": sum(stats.get("solutions") or 0 for stats in search),  # Arama verimi
+        "total_distance_km": result["summary"]["total_distance_km"],
+        "routes": result["summary"]["total_routes"],
+        "stop_reasons": [stats["stop_reason"] for stats in search],
+        "strategies": [stats.get("portfolio", {}).get("winner", stats.get("strategy")) for stats in search],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAILWAY_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OR-Tools optimizer ölçekleme benchmark'ı")
+    parser.add_argument('--sizes', help="Müşteri sayıları, ör. 25,100,500 (--depots ile kartezyen)")
+    parser.add_argument('--depots', help="Depo sayıları (1-5), ör. 1,3")
+    parser.add_argument('--time-limit', type=int, default=10, help="Depo başına arama süresi (sn)")
+    parser.add_argument('--workers', type=int, default=1, help="Paralel depo süreç sayısı")
+    parser.add_argument('--modes', default='per_depot',
+                        help="Çok depolu çözüm modları, ör. per_depot,joint (her senaryo her modda koşar)")
+    parser.add_argument('--knn-k', default='0',
+                        help="K en yakın komşu ark budaması, ör. 0,10,20 (0 = kapalı; her senaryo her k ile koşar)")
+    parser.add_argument('--portfolio', default='0',
+                        help="Görev başına yarışan strateji sayısı, ör. 1,4 (--workers kadar aday aynı anda koşar)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_optimizer.json')
+    args = parser.parse_args()
+
+    if args.sizes or args.depots:
+        sizes = [int(s) for s in (args.sizes or "25,100,500").split(',')]
+        depot_counts = [int(d) for d in (args.depots or "1").split(',')]
+        suite = [(size, depots) for size in sizes for depots in depot_counts]
+    else:
+        suite = DEFAULT_SUITE
+    if any(not 1 <= depots <= len(DEPOTS) for _, depots in suite):
+        parser.error(f"depot count must be between 1 and {len(DEPOTS)}")
+    modes = args.modes.split(',')
+    knn_values = [int(k) for k in args.knn_k.split(',')]
+    portfolio_sizes = [int(p) for p in args.portfolio.split(',')]
+    if any(mode not in ('per_depot', 'joint') for mode in modes):
+        parser.error("modes must be per_depot and/or joint")
+
+    # Matris önbelleği kapalı: her senaryoda matris süresi gerçekten ölçülsün
+    os.environ['VRP_MATRIX_CACHE_PATH'] = 'off'
+    server, osrm_url = start_stub_osrm()
+
+    print("=" * 96)
+    print(f"OR-TOOLS OPTIMIZER BENCHMARK (arama {args.time_limit} sn/depo, seed {args.seed})")
+    print("=" * 96)
+    print(f"{'Müşteri':>8} {'Depo':>5} {'Mod':>10} {'k':>4} {'P':>3} {'Matris':>8} {'Model':>8} {'Arama':>8} {'Çıkarım':>8} "
+          f"{'Duvar':>8} {'RSS MB':>8} {'Çözüm':>7} {'Amaç':>12} {'km':>10}  Strateji")
+
+    results = []
+    # Her senaryo temiz bir süreçte: tepe RSS önceki senaryolardan etkilenmesin
+    mp_context = multiprocessing.get_context("spawn")
+    for num_customers, num_depots in suite:
+        for mode in modes:
+            for knn_k in knn_values:
+                for portfolio_size in portfolio_sizes:
+                    # ProcessPoolExecutor: işçi süreç daemon değil, --workers > 1 ile depo süreçleri açabilir
+                    with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as executor:
+                        r = executor.submit(run_instance, num_customers, num_depots, args.seed, osrm_url,
+                                            args.time_limit, args.workers, mode, knn_k, portfolio_size).result()
+                    results.append(r)
+                    p = r["phases_s"]
+                    print(f"{num_customers:>8} {num_depots:>5} {mode:>10} {knn_k:>4} {portfolio_size:>3} "
+                          f"{p.get('matrix_s', 0):>8.2f} {p.get('model_s', 0):>8.2f} {p.get('search_s', 0):>8.2f} "
+                          f"{p.get('extraction_s', 0):>8.2f} {r['wall_s']:>8.2f} {r['peak_rss_mb']:>8.1f} "
+                          f"{r['solutions']:>7} {r['objective']:>12} {r['total_distance_km']:>10.1f}  "
+                          f"{','.join(sorted(set(r['strategies'])))}")
+
+    server.shutdown()
+
+    # Çok depolu senaryolarda joint modun per_depot'a göre farkı
+    if 'per_depot' in modes and 'joint' in modes:
+        by_key = {(r["customers"], r["depots"], r["mode"]): r for r in results
+                  if r["knn_k"] == knn_values[0] and r["portfolio_size"] == portfolio_sizes[0]}
+        print(f"\n{'Müşteri':>8} {'Depo':>5} {'Duvar (per_depot → joint)':>28} {'km (per_depot → joint)':>28} {'Rota':>10}")
+        for num_customers, num_depots in suite:
+            if num_depots < 2:
+                continue
+            base = by_key[(num_customers, num_depots, 'per_depot')]
+            joint = by_key[(num_customers, num_depots, 'joint')]
+            km_change = (joint["total_distance_km"] - base["total_distance_km"]) / base["total_distance_km"] * 100
+            print(f"{num_customers:>8} {num_depots:>5} {base['wall_s']:>12.1f} → {joint['wall_s']:<12.1f} "
+                  f"{base['total_distance_km']:>10.1f} → {joint['total_distance_km']:<9.1f} ({km_change:+.1f}%) "
+                  f"{base['routes']:>4} → {joint['routes']:<4}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time_limit_seconds": args.time_limit,
+            "workers": args.workers,
+            "modes": modes,
+            "knn_k": knn_values,
+            "portfolio": portfolio_sizes,
+            "seed": args.seed,
+        },
+        "instances": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nSonuçlar: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
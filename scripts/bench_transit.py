@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Transit evaluator benchmark'ı
+Python callback'leri (eski) ile RegisterTransitMatrix/RegisterUnaryTransitVector (yeni)
+aynı model ve aynı süre limitiyle çözülür; saniyedeki çözüm/dal sayısı karşılaştırılır.
+
+Kullanım: python3 scripts/bench_transit.py [müşteri_sayısı] [süre_saniye]
+"""
+
+import os
+import random
+import sys
+import time
+
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'railway'))
+from ortools_optimizer import SERVICE_TIMES, _build_time_matrix, haversine_matrix
+
+
+def build_instance(num_customers, seed=42):
+    """Adana merkez depo çevresinde rastgele müşteriler"""
+    rng = random.Random(seed)
+    locations = [(37.0, 35.32)] + [
+        (37.0 + rng.uniform(-0.3, 0.3), 35.32 + rng.uniform(-0.3, 0.3))
+        for _ in range(num_customers)
+    ]
+    business_types = [rng.choice(["MCD", "IKEA", "CHL", "OPT"]) for _ in range(num_customers)]
+    demands = [0] + [rng.randint(1, 8) for _ in range(num_customers)]
+    num_vehicles = max(2, sum(demands) // 18 + 2)
+    return locations, business_types, demands, [18] * num_vehicles
+
+
+def solve(instance, use_matrix, time_limit):
+    locations, business_types, demands, capacities = instance
+    distance_matrix = haversine_matrix(locations).astype('int64')
+    service_minutes = [0] + [SERVICE_TIMES.get(b, SERVICE_TIMES["default"]) for b in business_types]
+
+    manager = pywrapcp.RoutingIndexManager(len(locations), len(capacities), 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    if use_matrix:
+        distance_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
+        demand_index = routing.RegisterUnaryTransitVector(demands)
+        time_index = routing.RegisterTransitMatrix(_build_time_matrix(distance_matrix, service_minutes).tolist())
+    else:
+        distances = distance_matrix.tolist()
+
+        def distance_callback(from_index, to_index):
+            return distances[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+        def demand_callback(from_index):
+            return demands[manager.IndexToNode(from_index)]
+
+        def time_callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            to_node = manager.IndexToNode(to_index)
+            travel_time_minutes = (distances[from_node][to_node] / 1000.0 / 60.0) * 60.0
+            if to_node == 0:
+                service_time_minutes = 0
+            else:
+                service_time_minutes = SERVICE_TIMES.get(business_types[to_node - 1], SERVICE_TIMES["default"])
+            return int(travel_time_minutes + service_time_minutes)
+
+        distance_index = routing.RegisterTransitCallback(distance_callback)
+        demand_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        time_index = routing.RegisterTransitCallback(time_callback)
+
+    routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+    routing.SetFixedCostOfAllVehicles(10000)
+    routing.AddDimensionWithVehicleCapacity(demand_index, 0, capacities, True, 'Capacity')
+    routing.AddDimension(time_index, 120, 1440, False, 'Time')
+
+    solutions = [0]
+    routing.AddAtSolutionCallback(lambda: solutions.__setitem__(0, solutions[0] + 1))
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = (
+        routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
+    )
+    search_parameters.local_search_metaheuristic = (
+        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    )
+    search_parameters.time_limit.seconds = time_limit
+
+    start = time.perf_counter()
+    solution = routing.SolveWithParameters(search_parameters)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "solutions_per_s": solutions[0] / elapsed,
+        "branches_per_s": routing.solver().Branches() / elapsed,
+        "objective": solution.ObjectiveValue() if solution else None,
+    }
+
+
+def main():
+    num_customers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    time_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    instance = build_instance(num_customers)
+
+    print("=" * 60)
+    print(f"TRANSIT EVALUATOR BENCHMARK ({num_customers} müşteri, {time_limit} sn)")
+    print("=" * 60)
+    print(f"{'Mod':<10} {'Çözüm/sn':>12} {'Dal/sn':>14} {'Amaç':>14}")
+
+    results = {}
+    for name, use_matrix in (("callback", False), ("matrix", True)):
+        results[name] = solve(instance, use_matrix, time_limit)
+        r = results[name]
+        print(f"{name:<10} {r['solutions_per_s']:>12.1f} {r['branches_per_s']:>14.0f} {r['objective']:>14}")
+
+    speedup = results["matrix"]["solutions_per_s"] / max(results["callback"]["solutions_per_s"], 1e-9)
+    print(f"\nÇözüm/sn hızlanma: {speedup:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,34 @@
 """
 Google OR-Tools VRP Optimizer
 Tüm kısıtları destekler: kapasite, zaman, mola, servis, araç tipi
+
+Kullanım:
+  python3 ortools_optimizer.py < input.json                 # tek istek: JSON girdi, JSON çıktı
+  python3 ortools_optimizer.py --serve                      # JSON-lines: stdin'den satır satır istek
+  python3 ortools_optimizer.py --serve --socket /tmp/vrp.sock  # JSON-lines: Unix socket üzerinden
+
+--serve modunda süreç (Python + OR-Tools import'u) açık kalır; her satır bir istektir ve her
+biri için tek satır yanıt yazılır. İstekte opsiyonel "id" (yanıta aynen kopyalanır) ve
+"time_limit_seconds" (varsayılan 30) alanları verilebilir.
 """
 
+import argparse
+import io
 import json
+import os
+import signal
+import socketserver
 import sys
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
+import numpy as np
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 
+# Arama süresi: 30 saniye (256 müşteri için yeterli); istekte time_limit_seconds ile ezilebilir
+DEFAULT_TIME_LIMIT_SECONDS = 30
+
 
 def parse_time_constraint(constraint_text: str) -> Dict[str, Any]:
     """
@@ -113,32 +132,24 @@ def create_data_model(input_data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def compute_distance_matrix(locations: List[List[float]]) -> List[List[float]]:
-    """Kuş uçuşu mesafe matrisi (km)"""
-    from math import radians, cos, sin, asin, sqrt
-    
-    def haversine(lat1, lon1, lat2, lon2):
-        R = 6371  # Dünya yarıçapı (km)
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return R * c
-    
-    n = len(locations)
-    matrix = [[0.0] * n for _ in range(n)]
-    
-    for i in range(n):
-        for j in range(n):
-            if i != j:
-                matrix[i][j] = haversine(
-                    locations[i][0], locations[i][1],
-                    locations[j][0], locations[j][1]
-                )
-    
-    return matrix
+    """Kuş uçuşu mesafe matrisi (km) - NumPy broadcast ile tüm çiftler tek seferde"""
+    R = 6371  # Dünya yarıçapı (km)
+    
+    coords = np.radians(np.asarray(locations, dtype=np.float64).reshape(-1, 2))
+    lat = coords[:, 0]
+    lng = coords[:, 1]
+    
+    dlat = lat[None, :] - lat[:, None]
+    dlng = lng[None, :] - lng[:, None]
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    matrix = R * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    np.fill_diagonal(matrix, 0.0)
+    
+    return matrix.tolist()
 
 
-def solve_vrp(data: Dict[str, Any]) -> Dict[str, Any]:
+def solve_vrp(data: Dict[str, Any], time_limit_seconds: float = DEFAULT_TIME_LIMIT_SECONDS) -> Dict[str, Any]:
     """OR-Tools ile VRP çöz"""
     
     # Routing model oluştur
@@ -248,8 +259,8 @@ def solve_vrp(data: Dict[str, Any]) -> Dict[str, Any]:
         routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
     )
     
-    # Zaman limiti: 30 saniye (256 müşteri için yeterli)
-    search_parameters.time_limit.seconds = 30
+    # Zaman limiti (varsayılan 30 saniye, istekte time_limit_seconds ile ezilebilir)
+    search_parameters.time_limit.FromMilliseconds(int(time_limit_seconds * 1000))
     
     # Solution limit: İlk 10 çözümü değerlendir
     search_parameters.solution_limit = 10
@@ -312,17 +323,103 @@ def solve_vrp(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def solve_request(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Tek istek: girdiyi hazırla ve çöz (time_limit_seconds opsiyonel)"""
+    time_limit_seconds = input_data.get('time_limit_seconds', DEFAULT_TIME_LIMIT_SECONDS)
+    if isinstance(time_limit_seconds, bool) or not isinstance(time_limit_seconds, (int, float)) \
+            or time_limit_seconds <= 0:
+        raise ValueError(f"time_limit_seconds must be a positive number, got {time_limit_seconds!r}")
+    
+    # Veriyi hazırla
+    data = create_data_model(input_data)
+    
+    # Çöz
+    return solve_vrp(data, time_limit_seconds)
+
+
+def serve_lines(infile, outfile):
+    """
+    JSON-lines döngüsü: her girdi satırı bir istek, her yanıt tek satır
+    Hatalı satır süreci durdurmaz; {"id", "error", "type"} döner
+    """
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        
+        start = time.perf_counter()
+        request_id = None
+        try:
+            input_data = json.loads(line)
+            if not isinstance(input_data, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = input_data.get('id')
+            result = solve_request(input_data)
+        except Exception as e:
+            result = {
+                'error': str(e),
+                'type': type(e).__name__
+            }
+        
+        if request_id is not None:
+            result = {'id': request_id, **result}
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        outfile.write(json.dumps(result, ensure_ascii=False) + "\n")
+        outfile.flush()
+
+
+class _LinesHandler(socketserver.StreamRequestHandler):
+    """Unix socket bağlantısı: bağlantı kapanana kadar JSON-lines"""
+    
+    def handle(self):
+        infile = io.TextIOWrapper(self.rfile, encoding='utf-8')
+        outfile = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+        try:
+            serve_lines(infile, outfile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve_socket(socket_path: str):
+    """Unix socket üzerinde JSON-lines; bağlantılar sırayla işlenir (çözüm CPU'yu zaten doldurur)"""
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Önceki çalıştırmadan kalan socket dosyası
+    with socketserver.UnixStreamServer(socket_path, _LinesHandler) as server:
+        print(f"[OR-Tools] Listening on {socket_path}", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+
 def main():
     """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description="OR-Tools VRP optimizer (stdin JSON → stdout JSON)")
+    parser.add_argument('--serve', action='store_true',
+                        help="Süreci açık tut: satır başına bir JSON istek oku, satır başına bir JSON yanıt yaz")
+    parser.add_argument('--socket', help="--serve için stdin yerine bu Unix socket'i dinle")
+    args = parser.parse_args()
+    if args.socket and not args.serve:
+        parser.error("--socket requires --serve")
+    
+    if args.serve:
+        # SIGTERM (ör. süreç yöneticisi) Ctrl+C gibi temiz çıkış yapsın; socket dosyası silinir
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        # stdout protokol kanalı; yanıtlar dışında bir şey yazılmaz
+        try:
+            if args.socket:
+                serve_socket(args.socket)
+            else:
+                serve_lines(sys.stdin, sys.stdout)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    
     try:
         # JSON girdiyi oku (stdin'den)
         input_data = json.loads(sys.stdin.read())
         
-        # Veriyi hazırla
-        data = create_data_model(input_data)
-        
-        # Çöz
-        result = solve_vrp(data)
+        result = solve_request(input_data)
         
         # JSON çıktı
         print(json.dumps(result, ensure_ascii=False, indent=2))